@@ -0,0 +1,82 @@
+"""
+Benchmark `kuberos lint` over a generated corpus, see gen_lint_corpus.py
+
+Compares validating the files one by one in a single process with the pure
+python yaml loader to `kuberos lint <corpus>` without cache, with a cold
+cache and with a warm cache. The lint cache is written to a temporary config
+directory, the cache of the user is not touched.
+
+Usage:
+    python benchmarks/bench_lint.py [--corpus DIR] [--files 10000]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import subprocess
+
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# pylint: disable=wrong-import-position
+from kuberoscli.manifest_validation import validate_manifest
+from gen_lint_corpus import generate
+
+
+def run_lint(corpus: str, env: dict, *args) -> tuple:
+    """
+    Run kuberos lint in a new process
+
+    Returns:
+        (float, str): seconds and the summary line of the output
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-m', 'kuberoscli.kuberoscli', 'lint', corpus, *args],
+                             capture_output=True, text=True, cwd=REPO_DIR, env=env, check=False)
+    elapsed = time.perf_counter() - start
+    lines = process.stdout.strip().splitlines()
+    return elapsed, lines[-1] if lines else process.stderr.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--corpus', default=None,
+                        help='Existing corpus, by default one is generated in a temporary directory')
+    parser.add_argument('--files', type=int, default=10000,
+                        help='Number of files of the generated corpus (default: 10000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(tmp_dir, 'corpus')
+            generate(corpus, args.files)
+
+        files = sorted(glob.glob(os.path.join(corpus, '**', 'm*.yaml'), recursive=True))
+        start = time.perf_counter()
+        for path in files:
+            with open(path, 'r', encoding='utf-8') as file:
+                for manifest in yaml.load_all(file, Loader=yaml.SafeLoader):
+                    validate_manifest(manifest)
+        print(f'sequential, SafeLoader: {time.perf_counter() - start:6.2f}s  {len(files)} files')
+
+        config_path = os.path.join(tmp_dir, 'config')
+        with open(config_path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump({'current-context': 'bench', 'contexts': [
+                {'name': 'bench', 'server': 'http://127.0.0.1:9', 'user': 'u', 'token': 't'}]},
+                file)
+        env = dict(os.environ, KUBEROS_CONFIG=config_path)
+        for label, lint_args in [('lint --no-cache', ['--no-cache']),
+                                 ('lint, cold cache', []),
+                                 ('lint, warm cache', [])]:
+            elapsed, summary = run_lint(corpus, env, *lint_args)
+            print(f'{label + ":":23s} {elapsed:6.2f}s  {summary}')
+
+
+if __name__ == '__main__':
+    main()
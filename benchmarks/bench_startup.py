@@ -0,0 +1,106 @@
+"""
+Benchmark the start up of quick kuberos commands
+
+Each command runs in a new process, as from the shell, against a config
+file in a temporary directory with a single context of an unreachable API
+server, the config of the user is not touched. Reports the median wall
+clock time of each command and the cumulative import time of the modules
+imported before the command runs (python -X importtime).
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import tempfile
+import subprocess
+
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ['config', 'list'],
+    ['config', 'use-context', 'bench'],
+    ['deploy', '--help'],
+    ['lint', os.path.join(REPO_DIR, 'manifest_templates', 'deploy_rosmodules.yaml')],
+]
+
+# modules whose import time is reported, with all the modules they import
+MODULES = [
+    'kuberoscli.command_group.base',
+    'kuberoscli.command_group.config',
+    'kuberoscli.command_group.deploy',
+]
+
+
+def run_command(args: list, env: dict) -> float:
+    """
+    Run a kuberos command in a new process
+
+    Returns:
+        float: seconds
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'kuberoscli.kuberoscli', *args],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   cwd=REPO_DIR, env=env, check=False)
+    return time.perf_counter() - start
+
+
+def get_import_time(module: str, env: dict) -> float:
+    """
+    Cumulative import time of a module in a new process
+
+    Returns:
+        float: seconds
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             capture_output=True, text=True, cwd=REPO_DIR, env=env, check=False)
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError(f'{module} was not imported:\n{process.stderr}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='runs of each command')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_path = os.path.join(config_dir, 'config')
+        with open(config_path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump({
+                'current-context': 'bench',
+                'contexts': [{'name': 'bench', 'server': 'http://127.0.0.1:9',
+                              'user': 'bench', 'token': 'bench'}],
+            }, file)
+        env = dict(os.environ, KUBEROS_CONFIG=config_path)
+
+        # the first run compiles the modules, not measured
+        run_command(['config', 'list'], env)
+
+        print(f'{"module":<40} {"import [ms]":>12}')
+        for module in MODULES:
+            seconds = statistics.median(get_import_time(module, env) for _ in range(args.runs))
+            print(f'{module:<40} {seconds * 1000:>12.1f}')
+
+        print()
+        print(f'{"command":<40} {"median [ms]":>12} {"min [ms]":>10}')
+        for command in COMMANDS:
+            times = [run_command(command, env) for _ in range(args.runs)]
+            name = ' '.join(os.path.basename(arg) for arg in command)
+            print(f'{name:<40} {statistics.median(times) * 1000:>12.1f} '
+                  f'{min(times) * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
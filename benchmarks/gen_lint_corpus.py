@@ -0,0 +1,88 @@
+"""
+Generate a tree of manifests to benchmark `kuberos lint`
+
+About 80% of the files are deployments with 1-7 ROS modules, 10% fleets,
+10% cluster inventories, each 20th file has a fleet and a registry token as
+separate documents. 5% of the deployments have a broken reference. Each
+fifth directory entry is accompanied by a ROS parameter file, which lint
+skips. The corpus is reproducible for a given size.
+
+Usage:
+    python benchmarks/gen_lint_corpus.py /tmp/lint-corpus 10000
+"""
+
+import os
+import sys
+import copy
+import random
+import argparse
+
+import yaml
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARAM_FILE = 'node:\n  ros__parameters:\n    a: 1\n'
+
+
+def load(path: str) -> dict:
+    with open(os.path.join(REPO_DIR, path), 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file)
+
+
+def generate(root: str, num_files: int, seed: int = 7):
+    """
+    Write num_files manifests to root/team<i>/app<j>/
+    """
+    rand = random.Random(seed)
+    deployment = load('examples/deploy_hello_world/hello_world.deployment.yaml')
+    fleet = load('manifest_templates/fleet_manifest.yaml')
+    inventory = load('manifest_templates/cluster_inventory.yaml')
+    token = load('manifest_templates/registry_token.yaml')
+
+    for i in range(num_files):
+        directory = os.path.join(root, f'team{i % 50}', f'app{i % 400}')
+        os.makedirs(directory, exist_ok=True)
+        value = rand.random()
+        if value < 0.8:
+            manifest = copy.deepcopy(deployment)
+            manifest['metadata']['name'] = f'app-{i}'
+            for k in range(rand.randint(0, 6)):
+                module = copy.deepcopy(manifest['rosModules'][0])
+                module['name'] = f'mod-{k}'
+                manifest['rosModules'].append(module)
+            if rand.random() < 0.05:
+                manifest['rosModules'][0]['preference'] = ['onbord']
+            if rand.random() < 0.05:
+                manifest['rosModules'][0]['rosParameters'][1]['valueFrom'] = 'missing.yaml'
+        elif value < 0.9:
+            manifest = copy.deepcopy(fleet)
+            manifest['metadata']['name'] = f'fleet-{i}'
+            manifest['robot'] = [{'name': f'bot-{j}'} for j in range(rand.randint(1, 50))]
+        else:
+            manifest = copy.deepcopy(inventory)
+            manifest['metadata']['clusterName'] = f'c{i}'
+
+        documents = [manifest]
+        if i % 20 == 0:
+            documents = [copy.deepcopy(token), manifest]
+        with open(os.path.join(directory, f'm{i}.yaml'), 'w', encoding='utf-8') as file:
+            yaml.safe_dump_all(documents, file, sort_keys=False)
+        if i % 5 == 0:
+            with open(os.path.join(directory, f'params{i}.yaml'), 'w', encoding='utf-8') as file:
+                file.write(PARAM_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('root', help='Directory of the corpus')
+    parser.add_argument('num_files', type=int, nargs='?', default=10000,
+                        help='Number of manifest files (default: 10000)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    generate(args.root, args.num_files, args.seed)
+    print(f'{args.num_files} manifest files written to {args.root}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
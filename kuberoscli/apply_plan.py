@@ -0,0 +1,182 @@
+"""
+Plan of the resources created by `kuberos apply`
+ - load_documents: read the manifests of files, directories and multi-document yaml
+ - Resource: a manifest with its identity and dependencies
+ - plan_levels: order the resources into levels of independent resources
+
+Dependencies between the resources of one apply, by manifest reference:
+
+    ClusterRegistration <- ClusterInventory   (metadata.clusterName)
+    ClusterRegistration,
+    ClusterInventory    <- Fleet              (metadata.mainCluster)
+    Fleet               <- ApplicationDeployment, BatchJob (metadata.targetFleet)
+    RegistryToken       <- ApplicationDeployment, BatchJob (containerRegistry.imagePullSecretName)
+
+A resource is created once all resources it references are created.
+References to resources that are not part of the apply are expected to
+exist on the API server already.
+"""
+
+import sys
+from collections import namedtuple
+
+import yaml
+
+from .manifest_lint import discover_manifests, is_manifest, YAML_LOADER
+
+
+# a yaml document of a manifest file
+#   path: file path, '-' for stdin
+#   index: position of the document in the file
+ManifestDocument = namedtuple('ManifestDocument', ['path', 'index', 'manifest'])
+
+
+class ManifestLoadError(Exception):
+    """
+    A manifest file can't be read or parsed
+    """
+
+
+def load_documents(paths: list) -> list:
+    """
+    Load the manifest documents of files, directories and glob patterns.
+    A file can contain several documents separated by '---', '-' reads stdin.
+    The yaml files found in directories and by glob patterns that are not
+    manifests of a supported kind, e.g. ROS parameter files, are skipped.
+
+    Returns:
+        list of ManifestDocument, empty documents are skipped
+
+    Raises:
+        ManifestLoadError: a path matches no file, or a file can't be read or parsed
+    """
+    files, missing = discover_manifests([path for path in paths if path != '-'])
+    if missing:
+        raise ManifestLoadError(f"Manifest file: {missing[0]} not found.")
+    sources = [('-', True)] if '-' in paths else []
+    sources += files
+
+    documents = []
+    for path, explicit in sources:
+        try:
+            if path == '-':
+                content = sys.stdin.read()
+            else:
+                with open(path, 'rb') as file:
+                    content = file.read()
+                if not explicit and not is_manifest(content):
+                    continue
+            manifests = list(yaml.load_all(content, Loader=YAML_LOADER))  # nosec: safe loader
+        except OSError as exc:
+            raise ManifestLoadError(f"Manifest file: {path} can't be read: {exc.strerror}") from exc
+        except yaml.YAMLError as exc:
+            raise ManifestLoadError(f"Manifest file: {path} is not valid yaml: {exc}") from exc
+        documents.extend(ManifestDocument(path, i, manifest)
+                         for i, manifest in enumerate(manifests) if manifest is not None)
+    return documents
+
+
+def get_document_name(document: ManifestDocument) -> str:
+    """
+    File path of a document, with its position in multi-document files
+    """
+    if document.index == 0:
+        return document.path
+    return f'{document.path}#{document.index}'
+
+
+class Resource:
+    """
+    A resource to create, identified by (kind, name)
+    """
+
+    def __init__(self, document: ManifestDocument) -> None:
+        self.document = document
+        self.manifest = document.manifest
+        self.kind = self.manifest.get('kind', None)
+        metadata = self.metadata
+        if self.kind == 'ClusterInventory':
+            self.name = metadata.get('clusterName', None)
+        else:
+            self.name = metadata.get('name', None)
+        self.level = 0
+        self.dependencies = []
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Metadata of the manifest, empty if it is not a mapping (--no-validate)
+        """
+        metadata = self.manifest.get('metadata', None)
+        return metadata if isinstance(metadata, dict) else {}
+
+    @property
+    def key(self) -> tuple:
+        """
+        Identity of the resource
+        """
+        return (self.kind, self.name)
+
+    def get_references(self) -> list:
+        """
+        Get the (kind, name) of the resources this resource references
+        """
+        metadata = self.metadata
+        if self.kind == 'ClusterInventory':
+            return [('ClusterRegistration', metadata.get('clusterName', None))]
+        if self.kind == 'Fleet':
+            return [('ClusterRegistration', metadata.get('mainCluster', None)),
+                    ('ClusterInventory', metadata.get('mainCluster', None))]
+        if self.kind in ('ApplicationDeployment', 'BatchJob'):
+            references = [('Fleet', metadata.get('targetFleet', None))]
+            for registry in self.manifest.get('containerRegistry', None) or []:
+                if isinstance(registry, dict):
+                    references.append(('RegistryToken',
+                                       registry.get('imagePullSecretName', None)))
+            return references
+        return []
+
+    def __repr__(self) -> str:
+        return f'{self.kind}/{self.name}'
+
+
+def plan_levels(resources: list) -> list:
+    """
+    Order the resources into levels. The resources of a level only depend on
+    resources of the previous levels and can be created in parallel.
+
+    Returns:
+        list of list of Resource
+
+    Raises:
+        ManifestLoadError: a resource is defined twice or the references form a cycle
+    """
+    by_key = {}
+    for resource in resources:
+        if resource.key in by_key:
+            raise ManifestLoadError(f"{resource} is defined twice: "
+                                    f"{by_key[resource.key].document.path} and "
+                                    f"{resource.document.path}")
+        by_key[resource.key] = resource
+    for resource in resources:
+        resource.dependencies = [by_key[reference] for reference in resource.get_references()
+                                 if reference in by_key and by_key[reference] is not resource]
+
+    # longest path from a resource without dependencies
+    levels = {}
+    remaining = list(resources)
+    while remaining:
+        ready = [resource for resource in remaining
+                 if all(dependency.key in levels for dependency in resource.dependencies)]
+        if not ready:
+            raise ManifestLoadError(f"Circular references between: {remaining}")
+        for resource in ready:
+            resource.level = max([levels[dependency.key] + 1
+                                  for dependency in resource.dependencies], default=0)
+            levels[resource.key] = resource.level
+        remaining = [resource for resource in remaining if resource.key not in levels]
+
+    planned = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for resource in resources:
+        planned[resource.level].append(resource)
+    return planned
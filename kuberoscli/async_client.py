@@ -0,0 +1,156 @@
+"""
+Asyncio API client for bulk calls to the KubeROS API server
+"""
+
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .transport import KuberosTransport, ApiCall, ApiResult, ApiError, CANCELLED_ERROR
+
+
+class AsyncApiClient:
+    """
+    Run many API calls concurrently with a concurrency limit and deadlines.
+
+    The calls are executed in a thread pool over the pooled sessions of
+    KuberosTransport. Failed calls do not abort the others, the errors
+    are collected in the results instead.
+
+    Example:
+        client = AsyncApiClient(concurrency=8, deadline=10)
+        results = client.run([
+            ApiCall('fleet-1', 'GET', url_1, {'headers': headers}),
+            ApiCall('fleet-2', 'GET', url_2, {'headers': headers}),
+        ])
+    """
+
+    DEFAULT_CONCURRENCY = 8
+
+    def __init__(self,
+                 concurrency: int = None,
+                 deadline: float = None,
+                 stop_when=None,
+                 rate: float = None,
+                 on_result=None) -> None:
+        """
+        Args:
+            concurrency (int, optional): max. number of calls in flight.
+            deadline (float, optional): default deadline of each call in seconds.
+            stop_when (callable, optional): called with each ApiResult, once it
+                returns True the calls not started yet are cancelled (fail fast)
+            rate (float, optional): max. number of calls started per second
+            on_result (callable, optional): called with the ApiResult of each call
+                sent as soon as it completes, before all the calls are done
+        """
+        self.concurrency = max(1, concurrency or self.DEFAULT_CONCURRENCY)
+        self.deadline = deadline
+        self.stop_when = stop_when
+        self.rate = rate
+        self.on_result = on_result
+        self._executor = None
+        self._semaphore = None
+        self._stopped = False
+        self._rate_lock = None
+        self._next_start = 0.0
+
+    async def call(self,
+                   call: ApiCall,
+                   deadline: float = None) -> ApiResult:
+        """
+        Execute a single call, waiting for a free slot first
+
+        Args:
+            call (ApiCall): the call to execute
+            deadline (float, optional): deadline in seconds, overrides the default
+
+        Returns:
+            ApiResult: result of the call, never raises
+        """
+        if deadline is None:
+            deadline = self.deadline
+
+        kwargs = dict(call.kwargs or {})
+        if deadline is not None:
+            # don't keep the worker thread busy longer than the deadline
+            kwargs.setdefault('timeout', deadline)
+
+        async with self._semaphore:
+            if self._stopped:
+                return ApiResult(call.key, False, None, CANCELLED_ERROR, 0.0)
+            await self._wait_for_rate()
+            if self._stopped:
+                return ApiResult(call.key, False, None, CANCELLED_ERROR, 0.0)
+            result = await self._execute(call, kwargs, deadline)
+            if self.on_result is not None:
+                self.on_result(result)
+            if self.stop_when is not None and self.stop_when(result):
+                self._stopped = True
+            return result
+
+    async def _wait_for_rate(self):
+        """
+        Delay the start of a call until the rate limit allows it
+        """
+        if not self.rate:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._rate_lock:
+            now = loop.time()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + 1 / self.rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _execute(self, call: ApiCall, kwargs: dict, deadline: float) -> ApiResult:
+        """
+        Execute the request of a call in the thread pool
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = loop.run_in_executor(
+            self._executor,
+            functools.partial(KuberosTransport.call_json,
+                              call.method,
+                              call.url,
+                              **kwargs))
+        try:
+            data = await asyncio.wait_for(future, timeout=deadline)
+            return ApiResult(call.key, True, data, None,
+                             time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            error = f'[Deadline Exceeded] No response within {deadline}s'
+        except ApiError as exc:
+            error = str(exc)
+        except Exception as exc:
+            error = f'[Unknown Error] {exc}'
+        return ApiResult(call.key, False, None, error,
+                         time.perf_counter() - start)
+
+    async def gather(self, calls: list) -> list:
+        """
+        Execute all calls concurrently
+
+        Args:
+            calls (list of ApiCall): calls to execute
+
+        Returns:
+            list of ApiResult: results in the same order as the calls
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._stopped = False
+        self._rate_lock = asyncio.Lock()
+        self._next_start = 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            self._executor = executor
+            try:
+                return await asyncio.gather(*[self.call(call) for call in calls])
+            finally:
+                self._executor = None
+
+    def run(self, calls: list) -> list:
+        """
+        Blocking wrapper of gather() for the synchronous command groups
+        """
+        return asyncio.run(self.gather(calls))
@@ -0,0 +1,164 @@
+"""
+Progress of a batch job, for `job info` and `job watch`
+ - count_jobs: job counts by execution cluster and state
+ - ProgressMonitor: rolling throughput and ETA from a ring buffer of samples
+
+The jobs of a batch job are listed in the 'batch_job_set' of the API
+response, each with its 'exec_cluster' and 'status'. The throughput is the
+number of jobs finished (succeeded or failed) per minute over the last
+samples. The samples are kept in a ring buffer, so a watch running for
+days uses constant memory.
+"""
+
+import time
+from collections import deque
+
+
+# job states shown in the progress, in display order
+STATES = ['succeeded', 'failed', 'running', 'pending']
+
+# job status (lower case) -> state, unknown status are pending
+STATUS_STATES = {
+    'succeeded': 'succeeded',
+    'success': 'succeeded',
+    'completed': 'succeeded',
+    'failed': 'failed',
+    'error': 'failed',
+    'running': 'running',
+    'deploying': 'running',
+}
+
+
+def count_jobs(jobs) -> dict:
+    """
+    Count the jobs by execution cluster and state
+
+    Args:
+        jobs (iterable of dict): the 'batch_job_set' of the batch job
+
+    Returns:
+        dict: {cluster name: {state: number of jobs}}, with all STATES
+    """
+    counts = {}
+    for job in jobs:
+        cluster = job.get('exec_cluster', None) or 'N/A'
+        state = STATUS_STATES.get(str(job.get('status', '')).lower(), 'pending')
+        cluster_counts = counts.setdefault(cluster, dict.fromkeys(STATES, 0))
+        cluster_counts[state] += 1
+    return counts
+
+
+def get_totals(counts: dict) -> dict:
+    """
+    Sum the job counts of all clusters
+
+    Returns:
+        dict: {state: number of jobs}
+    """
+    totals = dict.fromkeys(STATES, 0)
+    for cluster_counts in counts.values():
+        for state in STATES:
+            totals[state] += cluster_counts[state]
+    return totals
+
+
+class ProgressMonitor:
+    """
+    Throughput and ETA of a batch job from periodic samples of its job counts
+
+    Example:
+        monitor = ProgressMonitor(window=300)
+        monitor.add_sample(count_jobs(data['batch_job_set']))
+        monitor.get_throughput()   # jobs/min, all clusters
+        monitor.get_eta()          # seconds, None if unknown
+    """
+
+    # max. number of samples kept, the oldest are dropped
+    MAX_SAMPLES = 1024
+
+    def __init__(self, window: float = 300, max_samples: int = None) -> None:
+        """
+        Args:
+            window (float): seconds of samples the throughput is computed from
+            max_samples (int, optional): size of the ring buffer
+        """
+        self.window = window
+        # (time.monotonic(), {cluster: number of finished jobs})
+        self.samples = deque(maxlen=max_samples or self.MAX_SAMPLES)
+        self.counts = {}
+
+    def add_sample(self, counts: dict, now: float = None):
+        """
+        Add the job counts of a poll, unchanged counts are added too
+        """
+        if now is None:
+            now = time.monotonic()
+        self.counts = counts
+        self.samples.append((now, {cluster: cluster_counts['succeeded'] + cluster_counts['failed']
+                                   for cluster, cluster_counts in counts.items()}))
+
+    def get_throughput(self, cluster: str = None) -> float:
+        """
+        Finished jobs per minute within the window
+
+        Args:
+            cluster (str, optional): execution cluster, None for all clusters
+
+        Returns:
+            float: jobs/min, None if there are not enough samples
+        """
+        if len(self.samples) < 2:
+            return None
+        end, last = self.samples[-1]
+        start, first = self.samples[-1]
+        for sample_time, finished in reversed(self.samples):
+            if end - sample_time > self.window:
+                break
+            start, first = sample_time, finished
+        if end <= start:
+            return None
+
+        def num_finished(finished):
+            if cluster is not None:
+                return finished.get(cluster, 0)
+            return sum(finished.values())
+
+        return max(0, num_finished(last) - num_finished(first)) * 60 / (end - start)
+
+    def get_eta(self) -> float:
+        """
+        Seconds until the running and pending jobs are finished at the current throughput
+
+        Returns:
+            float: seconds, 0 if all jobs are finished, None if unknown
+        """
+        totals = get_totals(self.counts)
+        remaining = totals['running'] + totals['pending']
+        if remaining == 0:
+            return 0.0
+        throughput = self.get_throughput()
+        if not throughput:
+            return None
+        return remaining * 60 / throughput
+
+    def is_finished(self) -> bool:
+        """
+        Check if all jobs of the batch job are finished, a batch job without
+        jobs is finished once it was sampled
+        """
+        totals = get_totals(self.counts)
+        return len(self.samples) > 0 and totals['running'] + totals['pending'] == 0
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format seconds as [Dd ]HH:MM:SS, '-' if unknown
+    """
+    if seconds is None:
+        return '-'
+    seconds = int(round(seconds))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    text = f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+    return f'{days}d {text}' if days else text
@@ -0,0 +1,266 @@
+"""
+Command group Apply
+"""
+
+import os
+import sys
+import time
+import yaml
+
+from ..endpoints import Endpoints
+from ..kuberos_config import KuberosConfig
+from ..transport import ApiCall
+from ..output import add_output_argument, write_records
+from ..table_stream import StreamingTable
+from ..manifest_validation import SUPPORTED_KINDS
+from ..apply_plan import (load_documents, get_document_name, Resource, plan_levels,
+                          ManifestLoadError)
+from ..param_files import ParamFileError
+from ..manifest_diff import LastApplied, get_param_digests
+from .base import CommandGroupBase
+
+
+APPLY_HELP = f'''
+KubeROS CLI [apply] command
+
+Usage:
+    kuberos apply -f <file|dir|glob> [-f ...] [-args]
+
+    Create the resources of one or more manifests. A file can contain several
+    yaml documents separated by '---', '-f -' reads them from stdin.
+    Supported kinds: {', '.join(SUPPORTED_KINDS)}
+
+    The resources are created in dependency order, the resources of each
+    level are created in parallel:
+        cluster -> inventory -> fleet -> deployment / batch job
+    A resource is skipped if a resource it references failed.
+
+    -p --parallel: max. number of concurrent requests per level
+    --dry-run:     print the plan, don't create the resources
+    --no-validate: don't validate the manifests before sending them
+    -o --output:   table (default), wide, name, json, jsonl, yaml, csv
+'''
+
+
+class ApplyCommandGroup(CommandGroupBase):
+    """
+    Command [apply], creates the resources of manifests of any supported kind.
+    It has no subcommands.
+    """
+
+    NAME_FIELD = 'name'
+
+    def __init__(self, subparsers) -> None:  # pylint: disable=super-init-not-called
+        self.parser = subparsers.add_parser('apply',
+                                            help="Create resources of any supported kind")
+        self.parser.add_argument('-f', '--file',
+                                 action='append',
+                                 default=[],
+                                 help='Manifest file, directory or glob pattern, - for stdin')
+        self.parser.add_argument('-p', '--parallel',
+                                 type=int,
+                                 default=None,
+                                 help='Max. number of resources created concurrently')
+        self.parser.add_argument('--dry-run', action='store_true',
+                                 help='Print the plan without creating the resources')
+        self.add_validation_argument(self.parser)
+        add_output_argument(self.parser)
+        self.commands = {}
+
+    def run(self, *args):
+        """
+        Create the resources level by level
+        """
+        parsed_args = self.parser.parse_args(args)
+        if not parsed_args.file:
+            self.print_help()
+            return
+
+        try:
+            documents = load_documents(parsed_args.file)
+            if not documents:
+                raise ManifestLoadError(f"No manifest found in {', '.join(parsed_args.file)}")
+            for document in documents:
+                self.check_manifest(document.manifest,
+                                    get_document_name(document),
+                                    expected_kinds=SUPPORTED_KINDS,
+                                    skip=parsed_args.no_validate)
+            for document in documents:
+                if not isinstance(document.manifest, dict) \
+                        or document.manifest.get('kind', None) not in SUPPORTED_KINDS:
+                    raise ManifestLoadError(f"{get_document_name(document)}: "
+                                            f"not a manifest of a supported kind")
+            levels = plan_levels([Resource(document) for document in documents])
+        except ManifestLoadError as exc:
+            print(exc)
+            sys.exit(1)
+
+        if parsed_args.dry_run:
+            self.print_plan(levels)
+            return
+
+        config = KuberosConfig.get_current_config()
+        results = {}
+        start = time.perf_counter()
+        for level in levels:
+            self.apply_level(level, config, results, parsed_args.parallel)
+        elapsed = time.perf_counter() - start
+
+        records = [{
+            'level': resource.level,
+            'kind': resource.kind,
+            'name': resource.name,
+            'file': get_document_name(resource.document),
+            **results[resource.key],
+        } for level in levels for resource in level]
+
+        if parsed_args.output != 'table':
+            write_records(records, parsed_args.output, name_field=self.NAME_FIELD)
+        else:
+            self.print_summary(records, len(levels), elapsed)
+
+        if any(record['result'] != 'created' for record in records):
+            sys.exit(1)
+
+    def apply_level(self, level: list, config: dict, results: dict, parallel: int):
+        """
+        Create the resources of a level concurrently.
+        The result of each resource is stored in results by resource key.
+        """
+        calls = []
+        for resource in level:
+            failed = [dependency for dependency in resource.dependencies
+                      if results[dependency.key]['result'] != 'created']
+            if failed:
+                results[resource.key] = {'result': 'skipped', 'seconds': None,
+                                         'message': f'{failed[0]} was not created'}
+                continue
+            try:
+                calls.append(self.get_create_call(resource, config))
+            except (OSError, KeyError, TypeError, ParamFileError) as exc:
+                results[resource.key] = {'result': 'failed', 'seconds': None,
+                                         'message': f"Can't prepare the request: {exc}"}
+
+        calls_by_key = {call.key: call for call in calls}
+        for res in self.call_api_bulk(calls, concurrency=parallel, auth_token=config['token']):
+            response_status = res.data.get('status', None) if isinstance(res.data, dict) else None
+            if not res.success:
+                result, message = 'failed', res.error
+            elif response_status in ('failed', 'error'):
+                result, message = 'failed', str(res.data.get('errors', res.data))
+            else:
+                result, message = 'created', str(res.data.get('msg', '')
+                                                 if isinstance(res.data, dict) else '')
+            results[res.key] = {'result': result,
+                                'seconds': round(res.elapsed, 3),
+                                'message': message}
+            if result == 'created' and res.key[0] == 'ApplicationDeployment':
+                # the base of a later `deploy upgrade`
+                body = calls_by_key[res.key].kwargs['json']
+                LastApplied.save(config['name'], body['deployment_manifest'],
+                                 get_param_digests(body['rosparam_yamls']))
+
+    def get_create_call(self, resource: Resource, config: dict) -> ApiCall:
+        """
+        Get the request that creates a resource, the same as its create command sends
+
+        Raises:
+            OSError: a file referenced by the manifest can't be read
+            ParamFileError: a parameter file of the manifest can't be loaded
+            KeyError: a field read by the request is missing
+            TypeError: a section read by the request is not a mapping
+        """
+        manifest = resource.manifest
+        metadata = manifest['metadata']
+        server = config['server']
+        manifest_path = None if resource.document.path == '-' else resource.document.path
+
+        if resource.kind in ('ApplicationDeployment', 'BatchJob'):
+            endpoint = Endpoints.DEPLOYING if resource.kind == 'ApplicationDeployment' \
+                else Endpoints.BATCH_JOB
+            rosparam_yamls = self.get_rosparam_yamls(manifest,
+                                                     manifest_path=manifest_path,
+                                                     config=config)
+            return ApiCall(resource.key, 'POST', f"{server}/{endpoint}", {
+                'json': {
+                    'deployment_manifest': manifest,
+                    'rosparam_yamls': rosparam_yamls,
+                },
+            })
+
+        if resource.kind == 'Fleet':
+            return ApiCall(resource.key, 'POST', f"{server}/{Endpoints.FLEET}", {
+                'files': {'fleet_manifest': ('fleet.yaml', yaml.safe_dump(manifest))},
+                'data': {'create': True},
+            })
+
+        if resource.kind == 'ClusterInventory':
+            return ApiCall(resource.key, 'POST', f"{server}/{Endpoints.CLUSTER_INVENTORY}", {
+                'files': {'inventory_description': ('inventory.yaml', yaml.safe_dump(manifest))},
+                'data': {'clean': 'False'},
+            })
+
+        if resource.kind == 'ClusterRegistration':
+            ca_cert = metadata['caCert']
+            if manifest_path is not None and not os.path.isabs(ca_cert):
+                ca_cert = os.path.join(os.path.dirname(manifest_path), ca_cert)
+            with open(ca_cert, 'r', encoding='utf-8') as file:
+                ca_content = file.read()
+            return ApiCall(resource.key, 'POST', f"{server}/{Endpoints.CLUSTER}", {
+                'files': {'ca_crt_file': (os.path.basename(ca_cert), ca_content)},
+                'data': {
+                    'cluster_name': metadata['name'],
+                    'distribution': metadata['distribution'],
+                    'host_url': metadata['apiServer'],
+                    'service_token_admin': metadata['serviceTokenAdmin'],
+                },
+            })
+
+        # RegistryToken
+        return ApiCall(resource.key, 'POST', f"{server}/{Endpoints.REGISTRY_TOKEN}", {
+            'data': {
+                'name': metadata['name'],
+                'user_name': metadata['userName'],
+                'registry_url': metadata['registryUrl'],
+                'token': metadata['token'],
+                'description': metadata['description'],
+            },
+        })
+
+    @staticmethod
+    def print_plan(levels: list):
+        """
+        Print the resources of each level and their dependencies
+        """
+        for i, level in enumerate(levels):
+            print(f'Level {i}:')
+            for resource in level:
+                depends = ''
+                if resource.dependencies:
+                    depends = f" (after {', '.join(map(str, resource.dependencies))})"
+                print(f'  {resource}{depends}')
+
+    @staticmethod
+    def print_summary(records: list, num_levels: int, elapsed: float):
+        """
+        Print the result and time of each resource
+        """
+        with StreamingTable(['Level', 'Kind', 'Name', 'Result', 'Time', 'Message']) as table:
+            for record in records:
+                table.add_row({
+                    'Level': record['level'],
+                    'Kind': record['kind'],
+                    'Name': record['name'],
+                    'Result': record['result'],
+                    'Time': f"{record['seconds']:.2f}s" if record['seconds'] is not None else '-',
+                    'Message': record['message'],
+                })
+        num_created = sum(1 for record in records if record['result'] == 'created')
+        print(f'\n{num_created} of {len(records)} resources created in {elapsed:.2f}s '
+              f'({num_levels} levels)')
+
+    def print_help(self):
+        """
+        Print help message
+        """
+        print(APPLY_HELP)
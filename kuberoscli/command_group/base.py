@@ -5,10 +5,19 @@ Base class for command group
 """
 
 import sys
-import requests
+import json
+import contextlib
 from argcomplete.completers import BaseCompleter
 
 from ..kuberos_config import KuberosConfig
+from ..transport import KuberosTransport, ApiCall, ApiError
+from ..output import add_output_argument, write_records, write_object
+
+# The modules used by a few commands only (tables, pagination, parameter
+# files, validation) are imported in the methods that use them: every
+# command group imports this module, also for quick commands like
+# 'kuberos config use-context'.
+# pylint: disable=import-outside-toplevel
 
 
 class KubeROSBaseCompleter(BaseCompleter):
@@ -16,6 +25,9 @@ class KubeROSBaseCompleter(BaseCompleter):
     Base class for autocompletion
     """
 
+    # key of the resource name in the items returned by the API server
+    NAME_FIELD = 'name'
+
     def __init__(self, resource_url: str) -> None:
         """Initialize the completer with resource url
 
@@ -25,21 +37,53 @@ class KubeROSBaseCompleter(BaseCompleter):
         super().__init__()
         self.token = ''
         self.url = resource_url
+        self._cache = None
+
+    @property
+    def cache(self):
+        """
+        Completion cache, created on the first completion
+        """
+        if self._cache is None:
+            from ..completion_cache import CompletionCache
+            self._cache = CompletionCache()
+        return self._cache
 
     def __call__(self, **kwargs):
-        return self.get_data_for_completion()
+        context = self.cache.get_current_context()
+        names, is_fresh = self.cache.get(context, self.url)
+        if names is not None:
+            if not is_fresh:
+                # serve stale names, refresh them for the next completion
+                self.cache.refresh_in_background(context, self.url, self.NAME_FIELD)
+            return names
+
+        names = self.get_data_for_completion()
+        self.cache_data(names)
+        return names
 
     def cache_data(self, data):
         """
         Cache the data for autocompletion
         """
-        pass
+        context = self.cache.get_current_context()
+        self.cache.put(context, self.url, data)
 
     def get_data_for_completion(self) -> list:
         """
-        Return the list of data for autocompletion
+        Return the list of data for autocompletion, all pages of the resource list
         """
-        return NotImplementedError
+        from ..pagination import Paginator
+        config = KuberosConfig.get_current_config()
+        paginator = Paginator(f"{config['server']}/{self.url}",
+                              headers={'Authorization': 'Token ' + config['token']},
+                              timeout=KuberosTransport.COMPLETION_TIMEOUT)
+        try:
+            return [item[self.NAME_FIELD] for item in paginator]
+
+        except ApiError as exc:
+            print(exc)
+            sys.exit(1)
 
     def call_api(self, url=None):
         """
@@ -51,41 +95,15 @@ class KubeROSBaseCompleter(BaseCompleter):
             url = self.url
 
         try:
-            resp = requests.request('GET',
-                                    f"{config['server']}/{url}",
-                                    headers={
-                                        'Authorization': 'Token ' + config['token']},
-                                    timeout=3)
-            resp.raise_for_status()
-            data = resp.json()
+            data = KuberosTransport.call_json('GET',
+                                              f"{config['server']}/{url}",
+                                              headers={
+                                                  'Authorization': 'Token ' + config['token']},
+                                              timeout=KuberosTransport.COMPLETION_TIMEOUT)
             return True, data
 
-        except requests.exceptions.HTTPError:
-            err_type = resp.status_code
-
-            if err_type == 400:
-                # Bad request
-                print("[Bad Request '400'] Please check the request parameters.")
-
-            if err_type == 401:
-                # Unauthorized
-                print(
-                    "[Unauthorized '401'] Login is required. The cached token is expired.")
-
-            if err_type == 404:
-                # Requested resource not found
-                print("[Not Found '404'] Check the resource name and try again.")
-
-            if err_type == 500:
-                print(
-                    "[Internal Server Error '500'] Please contact the administrator.")
-
-            sys.exit(1)
-
-        except requests.exceptions.RequestException:
-            # Connection error
-            print("[ConnectionError] Can not connect to the API server. \
-                    Please check your network and kuberos config.")
+        except ApiError as exc:
+            print(exc)
             sys.exit(1)
 
         except Exception as exc:
@@ -101,6 +119,12 @@ class CommandGroupBase:
 
     COMMAND_LIST = []
 
+    # commands with the -o --output argument, None for all commands
+    OUTPUT_COMMANDS = None
+
+    # key of the resource name in the API responses, used by '-o name'
+    NAME_FIELD = 'name'
+
     def __init__(self, subparsers, group_name) -> None:
         self.parser = subparsers.add_parser(group_name,
                                             help="Configure KubeROS CLI")
@@ -113,6 +137,12 @@ class CommandGroupBase:
                 command: self.subparsers.add_parser(command)
             })
 
+        output_commands = self.OUTPUT_COMMANDS
+        if output_commands is None:
+            output_commands = self.COMMAND_LIST
+        for command in output_commands:
+            add_output_argument(self.commands[command])
+
     def run(self, *args):
         """
         Run the subcommand
@@ -151,51 +181,484 @@ class CommandGroupBase:
         if auth_token is not None:
             headers['Authorization'] = 'Token ' + auth_token
         try:
-            resp = requests.request(method,
-                                    url,
-                                    data=data,
-                                    json=json_data,
-                                    files=files,
-                                    headers=headers,
-                                    timeout=5)
-            resp.raise_for_status()
-            data = resp.json()
+            data = KuberosTransport.call_json(method,
+                                              url,
+                                              data=data,
+                                              json=json_data,
+                                              files=files,
+                                              headers=headers)
             return True, data
 
-        except requests.exceptions.HTTPError:
-            err_type = resp.status_code
+        except ApiError as exc:
+            print(exc)
+            if exc.status_code == 401:
+                print("Login again by using command: kuberos config login")
+            sys.exit(1)
 
-            if err_type == 400:
-                # Bad request
-                print("[Bad Request '400'] Please check the request parameters.")
+        except Exception as exc:
+            # Unknown error
+            print("[Unknown Error]", exc)
+            sys.exit(1)
+
+    def stream_api(self,
+                   method: str,
+                   url: str,
+                   path: list,
+                   json_data=None,
+                   auth_token=None):
+        """
+        Call the API server and decode the response incrementally.
+        Same as call_api, but the array at the path of the response is decoded
+        element by element while it is iterated. Read the response within
+        stream_errors() to handle errors while it is received.
 
-            if err_type == 401:
-                # Unauthorized
-                print("[Unauthorized '401'] Login is required. \
-                    The cached token is expired.")
+        Args:
+            path (list of str): keys of the array to stream, e.g. ['data', 'cluster_node_set']
+
+        Returns:
+            success (bool): True if success, exits with error message if failed
+            data (StreamedObject): response data, decoded on access
+        """
+        headers = {}
+        if auth_token is not None:
+            headers['Authorization'] = 'Token ' + auth_token
+        try:
+            data = KuberosTransport.stream_json(method,
+                                                url,
+                                                path,
+                                                json=json_data,
+                                                headers=headers)
+            return True, data
+
+        except ApiError as exc:
+            print(exc)
+            if exc.status_code == 401:
                 print("Login again by using command: kuberos config login")
+            sys.exit(1)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def stream_errors():
+        """
+        Exit with an error message if a streamed response fails
+        """
+        try:
+            yield
+        except ApiError as exc:
+            print(f'\n{exc}', file=sys.stderr)
+            if exc.status_code == 401:
+                print("Login again by using command: kuberos config login", file=sys.stderr)
+            sys.exit(1)
+        except json.JSONDecodeError as exc:
+            print(f'\n[Invalid Response] {exc}', file=sys.stderr)
+            sys.exit(1)
+
+    def call_api_bulk(self,
+                      calls: list,
+                      concurrency: int = None,
+                      deadline: float = None,
+                      auth_token: str = None,
+                      stop_when=None,
+                      rate: float = None,
+                      on_result=None) -> list:
+        """
+        Call the API server concurrently for a list of resources.
+        Unlike call_api, failed calls don't exit, the errors are returned
+        in the results and can be printed with print_bulk_errors.
 
-            if err_type == 404:
-                # Requested resource not found
-                print("[Not Found '404'] Check the resource name and try again.")
+        Args:
+            calls (list of ApiCall): calls to execute
+            concurrency (int, optional): max. number of calls in flight
+            deadline (float, optional): deadline of each call in seconds
+            auth_token (str, optional): user token added to all calls
+            stop_when (callable, optional): once it returns True for a result,
+                the calls not started yet are cancelled, see AsyncApiClient
+            rate (float, optional): max. number of calls started per second
+            on_result (callable, optional): called with each ApiResult as soon as
+                the call completes, see AsyncApiClient
+
+        Returns:
+            list of ApiResult: results in the same order as the calls
+        """
+        if auth_token is not None:
+            calls = [call._replace(kwargs=self._with_auth_header(call.kwargs, auth_token))
+                     for call in calls]
+        # asyncio is only imported by the commands using bulk calls
+        from ..async_client import AsyncApiClient  # pylint: disable=import-outside-toplevel
+        client = AsyncApiClient(concurrency=concurrency,
+                                deadline=deadline,
+                                stop_when=stop_when,
+                                rate=rate,
+                                on_result=on_result)
+        return client.run(calls)
+
+    @staticmethod
+    def print_bulk_errors(results: list, stream=None) -> int:
+        """
+        Print the aggregated errors of a bulk call
 
-            if err_type == 500:
-                print(
-                    "[Internal Server Error '500'] Please contact the administrator.")
+        Returns:
+            int: number of failed calls
+        """
+        failed = [res for res in results if not res.success]
+        if failed:
+            print(f'[Error] {len(failed)} of {len(results)} requests failed:', file=stream)
+            for res in failed:
+                print(f'  {res.key}: {res.error}', file=stream)
+        return len(failed)
+
+    @staticmethod
+    def add_context_arguments(parser):
+        """
+        Add the arguments to run a command in several contexts
+        """
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('-A', '--all-contexts',
+                           action='store_true',
+                           default=False,
+                           help='Query all contexts in the config file')
+        group.add_argument('--contexts',
+                           default=None,
+                           help='Query the given contexts, comma-separated: ctx-1,ctx-2')
+
+    @staticmethod
+    def get_target_contexts(parsed_args) -> list:
+        """
+        Get the contexts selected with --all-contexts or --contexts
+
+        Returns:
+            list of dict: context configs, None if no context is selected
+        """
+        if parsed_args.all_contexts:
+            names = KuberosConfig.get_context_names()
+        elif parsed_args.contexts:
+            names = [name.strip() for name in parsed_args.contexts.split(',') if name.strip()]
+        else:
+            return None
+        return [KuberosConfig.get_context_by_name(name) for name in names]
 
+    @staticmethod
+    def add_page_arguments(parser):
+        """
+        Add the arguments to limit and page a resource list
+        """
+        from ..pagination import Paginator
+        parser.add_argument('--limit',
+                            type=int,
+                            default=None,
+                            help='Max. number of resources to list')
+        parser.add_argument('--page-size',
+                            type=int,
+                            default=None,
+                            help='Number of resources requested per page '
+                                 f'(default: {Paginator.DEFAULT_PAGE_SIZE})')
+
+    def list_resources(self,
+                       url: str,
+                       auth_token: str,
+                       get_rows,
+                       parsed_args):
+        """
+        Request a resource list page by page and print it while the next page
+        is requested. Uses the --limit, --page-size and --output arguments.
+
+        Args:
+            url (str): url of the list endpoint
+            auth_token (str): user token
+            get_rows (callable): converts a list of resources to the table rows
+            parsed_args: parsed arguments of the list command
+        """
+        from ..pagination import Paginator
+        paginator = Paginator(url,
+                              headers={'Authorization': 'Token ' + auth_token},
+                              page_size=parsed_args.page_size,
+                              limit=parsed_args.limit)
+        with self.stream_errors():
+            self.print_pages(paginator.pages(), get_rows, parsed_args.output)
+
+    def call_api_in_contexts(self,
+                             contexts: list,
+                             method: str,
+                             path: str,
+                             **kwargs) -> list:
+        """
+        Call the same endpoint in several contexts concurrently.
+        A slow or failing server doesn't affect the results of the others.
+
+        Args:
+            contexts (list of dict): context configs
+            method (str): http method
+            path (str): endpoint path, relative to the server address
+            kwargs: passed to KuberosTransport.request
+
+        Returns:
+            list of ApiResult: results keyed by context name. Responses with
+                a status other than 'success' are returned as failed results
+        """
+        calls = [ApiCall(ctx['name'],
+                         method,
+                         f"{ctx['server']}/{path}",
+                         self._with_auth_header(kwargs, ctx['token']))
+                 for ctx in contexts]
+        results = self.call_api_bulk(calls)
+
+        checked_results = []
+        for res in results:
+            if res.success and isinstance(res.data, dict) \
+                    and res.data.get('status', 'success') != 'success':
+                res = res._replace(success=False,
+                                   error=res.data.get('errors', res.data))
+            checked_results.append(res)
+        return checked_results
+
+    def list_in_contexts(self,
+                         contexts: list,
+                         path: str,
+                         get_rows,
+                         output_format: str = 'table',
+                         page_size: int = None,
+                         limit: int = None):
+        """
+        List the resources of several contexts in one table with a context column.
+        The first pages are requested concurrently, the following pages
+        context by context.
+
+        Args:
+            contexts (list of dict): context configs
+            path (str): endpoint path of the resource list
+            get_rows (callable): converts the response data to the table rows
+            output_format (str): table or one of the output formats,
+                the resources get an additional 'context' field
+            page_size (int, optional): number of resources requested per page
+            limit (int, optional): max. number of resources per context
+        """
+        from ..pagination import Paginator
+        from ..table_stream import StreamingTable
+        first_params = Paginator(path, page_size=page_size, limit=limit).get_first_params()
+        results = self.call_api_in_contexts(contexts, 'GET', path, params=first_params)
+        servers = {ctx['name']: ctx for ctx in contexts}
+
+        def iter_pages():
+            for i, res in enumerate(results):
+                if not res.success:
+                    continue
+                ctx = servers[res.key]
+                paginator = Paginator(f"{ctx['server']}/{path}",
+                                      headers={'Authorization': 'Token ' + ctx['token']},
+                                      page_size=page_size,
+                                      limit=limit,
+                                      first_page=res.data)
+                try:
+                    for items in paginator.pages():
+                        yield res.key, items
+                except ApiError as exc:
+                    # a failing context doesn't abort the others
+                    results[i] = res._replace(success=False, error=str(exc))
+
+        if output_format == 'table':
+            table = StreamingTable()
+            for ctx_name, items in iter_pages():
+                for row in get_rows(items):
+                    table.add_row({'Context': ctx_name, **row})
+            table.close()
+        else:
+            write_records(({'context': ctx_name, **item}
+                           for ctx_name, items in iter_pages()
+                           for item in items),
+                          output_format,
+                          name_field=self.NAME_FIELD)
+        self.print_context_summary(results, output_format)
+
+    def info_in_contexts(self,
+                         contexts: list,
+                         path: str,
+                         print_info,
+                         output_format: str = 'table',
+                         **kwargs):
+        """
+        Retrieve a resource from several contexts and print it per context
+
+        Args:
+            contexts (list of dict): context configs
+            path (str): endpoint path of the resource
+            print_info (callable): prints the response data of one context
+            output_format (str): table or one of the output formats,
+                the resources get an additional 'context' field
+            kwargs: passed to KuberosTransport.request
+        """
+        results = self.call_api_in_contexts(contexts, 'GET', path, **kwargs)
+        if output_format == 'table':
+            for res in results:
+                if res.success:
+                    print(f'Context: {res.key}')
+                    print('=' * 80)
+                    print_info(res.data['data'])
+                    print('\n')
+        else:
+            write_records(({'context': res.key, **res.data['data']}
+                           for res in results if res.success),
+                          output_format,
+                          name_field=self.NAME_FIELD)
+        self.print_context_summary(results, output_format)
+
+    @staticmethod
+    def print_context_summary(results: list, output_format: str = 'table'):
+        """
+        Print the latency and errors per context, exit with 1 if any context failed.
+        For machine readable output formats, the summary is printed to stderr.
+        """
+        from tabulate import tabulate
+        stream = sys.stdout if output_format == 'table' else sys.stderr
+        print('\n', file=stream)
+        data_to_display = [{
+            'Context': res.key,
+            'Status': 'ok' if res.success else 'failed',
+            'Latency': f'{res.elapsed * 1000:.0f} ms',
+            'Error': '' if res.success else res.error,
+        } for res in results]
+        table = tabulate(data_to_display, headers="keys", tablefmt='plain')
+        print(table, file=stream)
+
+        if not all(res.success for res in results):
             sys.exit(1)
 
-        except requests.exceptions.RequestException:
-            # Connection error
-            print("[ConnectionError] Can not connect to the API server. \
-                    Please check your network and kuberos config.")
+    def print_list(self,
+                   data: list,
+                   get_rows,
+                   output_format: str = 'table'):
+        """
+        Print a resource list as table or in the selected output format
+
+        Args:
+            data (list): resources from the API response
+            get_rows (callable): converts the resources to the table rows
+            output_format (str): value of the -o --output argument
+        """
+        self.print_pages([data], get_rows, output_format)
+
+    def print_pages(self,
+                    pages,
+                    get_rows,
+                    output_format: str = 'table'):
+        """
+        Print a resource list page by page, each page is printed when it is received
+
+        Args:
+            pages (iterable of list): resources from the API responses
+            get_rows (callable): converts the resources to the table rows
+            output_format (str): value of the -o --output argument
+        """
+        from ..table_stream import StreamingTable
+        if output_format == 'table':
+            table = StreamingTable()
+            for items in pages:
+                for row in get_rows(items):
+                    table.add_row(row)
+            table.close()
+        else:
+            write_records((item for items in pages for item in items),
+                          output_format,
+                          name_field=self.NAME_FIELD)
+
+    def print_response(self,
+                       response,
+                       output_format: str = 'table'):
+        """
+        Print the raw API response, formatted if an output format is selected
+        """
+        if output_format == 'table':
+            print(response)
+        else:
+            write_object(response, output_format, name_field=self.NAME_FIELD)
+
+    @staticmethod
+    def add_validation_argument(parser):
+        """
+        Add the argument to skip the offline validation of the manifest
+        """
+        parser.add_argument('--no-validate', action='store_true',
+                            help='Do not validate the manifest before sending it')
+
+    @staticmethod
+    def check_manifest(manifest,
+                       file_path: str,
+                       expected_kinds: list = None,
+                       skip: bool = False):
+        """
+        Validate a manifest offline before it is sent to the API server.
+        Warnings are printed, errors are printed and exit with 1.
+
+        Args:
+            manifest: the parsed yaml document
+            file_path (str): path of the manifest, shown in the messages
+            expected_kinds (list of str, optional): kinds accepted by the command
+            skip (bool): True to skip the validation, e.g. for --no-validate
+        """
+        if skip:
+            return
+        from ..manifest_validation import validate_manifest, has_errors, format_diagnostic
+        diagnostics = validate_manifest(manifest, expected_kinds=expected_kinds)
+        for diagnostic in diagnostics:
+            print(format_diagnostic(file_path, diagnostic), file=sys.stderr)
+        if has_errors(diagnostics):
+            print(f'Manifest {file_path} is invalid, use --no-validate to send it anyway.',
+                  file=sys.stderr)
             sys.exit(1)
 
-        except Exception as exc:
-            # Unknown error
-            print("[Unknown Error]", exc)
+    @staticmethod
+    def load_yaml_files_from_parammap(deploy_content: dict,
+                                      manifest_path: str = None,
+                                      config: dict = None) -> list:
+        """
+        Load the yaml files from the rosParamMap, see ParamFileLoader.
+        With the config of the API server, only the contents missing on the
+        server are uploaded and referenced by digest, see ParamBlobUploader.
+
+        Args:
+            deploy_content (dict): Deployment manifest
+            manifest_path (str, optional): relative paths are resolved against its directory
+            config (dict, optional): context of the API server the request is sent to
+        Returns:
+            list of dict: 'rosparam_yamls' of the request
+        """
+        from ..param_files import ParamFileError
+        try:
+            return CommandGroupBase.get_rosparam_yamls(deploy_content, manifest_path, config)
+        except ParamFileError as exc:
+            print(exc)
             sys.exit(1)
 
+    @staticmethod
+    def get_rosparam_yamls(deploy_content: dict,
+                           manifest_path: str = None,
+                           config: dict = None) -> list:
+        """
+        Same as load_yaml_files_from_parammap, but raises instead of exiting
+
+        Raises:
+            ParamFileError: a parameter file is missing or its path is not specified
+        """
+        from ..param_files import ParamFileLoader
+        from ..param_blobs import ParamBlobUploader
+        loader = ParamFileLoader()
+        param_files = loader.load(deploy_content, manifest_path=manifest_path)
+        if config is None:
+            return ParamFileLoader.to_rosparam_yamls(param_files)
+        uploader = ParamBlobUploader(config['server'], config['token'],
+                                     cache_dir=loader.cache_dir)
+        return uploader.get_rosparam_yamls(param_files)
+
+    @staticmethod
+    def _with_auth_header(kwargs: dict, auth_token: str) -> dict:
+        """
+        Return a copy of the request kwargs with the authorization header
+        """
+        kwargs = dict(kwargs or {})
+        headers = dict(kwargs.get('headers') or {})
+        headers['Authorization'] = 'Token ' + auth_token
+        kwargs['headers'] = headers
+        return kwargs
+
     def print_help(self):
         """
         Print the help message
@@ -2,12 +2,22 @@
 Command group BatchJob
 """
 
+import os
 import sys
+import time
+import posixpath
 import yaml
-from tabulate import tabulate
 
 from ..endpoints import Endpoints
 from ..kuberos_config import KuberosConfig
+from ..transport import ApiCall, ApiError
+from ..watch import ConditionalPoller, LiveView
+from ..table_stream import StreamingTable
+from ..batch_progress import (STATES, ProgressMonitor, count_jobs, get_totals,
+                              format_duration)
+from ..data_transfer import DataTransfer, TransferError, check_relative_path
+from ..output import add_output_argument, write_records
+from ..param_sweep import Sweep, SweepError, SweepProgress
 from .base import CommandGroupBase, KubeROSBaseCompleter
 
 
@@ -17,49 +27,140 @@ KubeROS CLI [job] command group
 Usage:
     kuberos job <command> [job_name] [-args]
     
+    All commands except data download/upload accept -o --output:
+    table (default), wide, name, json, jsonl, yaml, csv
+    
 Commands:
     create       Create a new BatchJob deployment
                  -f --file: cluster registration yaml file path
+                 --no-validate: don't validate the manifest before sending it
+                 a manifest with a sweep section is submitted as one batchjob
+                 per variant, recorded in a progress file to resume:
+                 -p --parallel: max. number of variants submitted concurrently
+                 --rate: max. number of variants submitted per second (default: 10)
+                 --progress: progress file (default: <file>.progress.json)
+                 --dry-run: list the variants without submitting them
 
     list         List all active BatchJobs
+                 --limit: max. number of listed resources
+                 --page-size: number of resources requested per page
+                 -A --all-contexts: list the BatchJobs of all contexts
+                 --contexts: list the BatchJobs of the given contexts (ctx-1,ctx-2)
     
-    info         Get batchjob by name
+    info         Get batchjob by name, with the job counts per execution cluster
+
+    data         Transfer the data files of a batchjob
+                 list <job>: list the files
+                 download <job> [path ...] [--all] [-d --dest dir]
+                 upload <job> <file> [file ...] [--prefix remote dir]
+                 -p --parallel: number of chunks transferred concurrently
+                 --chunk-size: chunk size in MiB (default: 8)
+                 chunks are verified by sha256, an interrupted transfer
+                 resumes with the missing chunks when run again
+
+    watch        Show the progress of a batchjob until all jobs are finished
+                 --interval: polling interval in seconds (default: 2.0)
+                 --window: seconds of samples the throughput is computed from
+                 shows the succeeded/failed/running/pending jobs, the jobs/min
+                 per execution cluster and the ETA (Ctrl+C to stop)
     
     stop         Stop the batchjob execution
     resume       Resume the batchjob execution
                  
-    delete       Delete a BatchJob (soft stop and archive)
+    delete       Delete BatchJobs (soft stop and archive)
+                 -p --parallel: max. number of concurrent requests
                  -force: delete BatchJob from DB (BE CAREFUL!!!)
 '''
 
 
+def format_size(num_bytes: int) -> str:
+    """
+    Format a size in bytes with a binary unit
+    """
+    size = float(num_bytes)
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{int(size)} B'
+        size /= 1024
+    return f'{size:.1f} TiB'
+
+
+class TransferProgress:
+    """
+    Progress line of a file transfer on stderr, only on a terminal
+    """
+
+    # min. seconds between two updates of the line
+    INTERVAL = 0.2
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start = time.monotonic()
+        self.is_tty = sys.stderr.isatty()
+        self._last = 0.0
+
+    def update(self, done: int, total: int):
+        """
+        Redraw the progress line, called from the transfer threads
+        """
+        now = time.monotonic()
+        if not self.is_tty or (now - self._last < self.INTERVAL and done < total):
+            return
+        self._last = now
+        percent = done * 100 / total if total else 100
+        sys.stderr.write(f'\r\x1b[2K{self.name}  {percent:5.1f}%  '
+                         f'{format_size(done)} / {format_size(total)}')
+        sys.stderr.flush()
+
+    def finish(self, target: str, num_bytes: int):
+        """
+        Print the transferred size and rate of the file
+        """
+        elapsed = time.monotonic() - self.start
+        if self.is_tty:
+            sys.stderr.write('\r\x1b[2K')
+        print(f'{self.name} -> {target}: {format_size(num_bytes)} in {elapsed:.1f}s '
+              f'({format_size(num_bytes / elapsed if elapsed > 0 else 0)}/s)')
+
+
 class BatchJobCompleter(KubeROSBaseCompleter):
     """
     Get the list of cluster names from the API server or cached data
     """
 
-    def get_data_for_completion(self):
-        _, data = self.call_api()
-        return [item['name'] for item in data]
-
 
 class BatchJobCommandGroup(CommandGroupBase):
     """
     Command group [job]
     """
 
-    COMMAND_LIST = ['list', 'create', 'delete', 'info', 'stop', 'resume']
+    COMMAND_LIST = ['list', 'create', 'delete', 'info', 'watch', 'stop', 'resume', 'data']
+
+    # the data subcommands add the output argument themselves
+    OUTPUT_COMMANDS = ['list', 'create', 'delete', 'info', 'watch', 'stop', 'resume']
+
+    # default max. number of sweep variants submitted per second
+    SWEEP_RATE = 10.0
+
+    # number of sweep variants submitted before the progress file is written
+    SWEEP_BATCH_SIZE = 32
 
     RESOURCE_URL = 'api/v1/batch_jobs/batchjobs_name_list'
 
+    # max. polling interval of watch in seconds, while no job finishes
+    WATCH_MAX_INTERVAL = 15.0
+
     def __init__(self, subparsers) -> None:
         super().__init__(subparsers, 'job')
 
         self.init_subcommand_create()
+        self.init_subcommand_list()
         self.init_subcommand_info()
+        self.init_subcommand_watch()
         self.init_subcommand_delete()
         self.init_subcommand_stop()
         self.init_subcommand_resume()
+        self.init_subcommand_data()
 
     def init_subcommand_create(self):
         """
@@ -68,6 +169,30 @@ class BatchJobCommandGroup(CommandGroupBase):
         parser = self.commands['create']
         parser.add_argument(
             '-f', '--file', help='File path of cluster registration')
+        self.add_validation_argument(parser)
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of sweep variants submitted concurrently')
+        parser.add_argument('--rate',
+                            type=float,
+                            default=self.SWEEP_RATE,
+                            help='Max. number of sweep variants submitted per second '
+                                 f'(default: {self.SWEEP_RATE})')
+        parser.add_argument('--progress',
+                            default=None,
+                            help='Progress file of the sweep (default: <file>.progress.json)')
+        parser.add_argument('--dry-run',
+                            action='store_true',
+                            help='List the sweep variants without submitting them')
+
+    def init_subcommand_list(self):
+        """
+        Initialize the subcommand <list>
+        """
+        parser = self.commands['list']
+        self.add_context_arguments(parser)
+        self.add_page_arguments(parser)
 
     def init_subcommand_info(self):
         """
@@ -78,6 +203,25 @@ class BatchJobCommandGroup(CommandGroupBase):
             resource_url=self.RESOURCE_URL
         )
 
+    def init_subcommand_watch(self):
+        """
+        Initialize the subcommand <watch>
+        """
+        parser = self.commands['watch']
+        parser.add_argument('batchjob_name', help="Batch job name").completer = BatchJobCompleter(
+            resource_url=self.RESOURCE_URL
+        )
+        parser.add_argument('--interval',
+                            type=float,
+                            default=2.0,
+                            help='Polling interval in seconds while jobs are finishing '
+                                 '(default: 2.0), slower otherwise')
+        parser.add_argument('--window',
+                            type=float,
+                            default=300,
+                            help='Seconds of samples the throughput is computed from '
+                                 '(default: 300)')
+
     def init_subcommand_stop(self):
         """
         Initialize the subcommand <stop>
@@ -102,14 +246,56 @@ class BatchJobCommandGroup(CommandGroupBase):
         """
         parser = self.commands['delete']
         parser.add_argument('batchjob_name',
-                            help="Batch job name").completer = BatchJobCompleter(
+                            nargs='+',
+                            help="Batch job name(s)").completer = BatchJobCompleter(
                                 resource_url=self.RESOURCE_URL)
-
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of batch jobs deleted concurrently')
         parser.add_argument('-force', '--force',
                             action='store_true',
                             default=False,
                             help="Delete Batch job from database. [BE CAREFUL!]")
 
+    def init_subcommand_data(self):
+        """
+        Initialize the subcommand <data> and its subcommands <list>, <download>, <upload>
+        """
+        data_commands = self.commands['data'].add_subparsers(dest='data_command')
+
+        parser = data_commands.add_parser('list')
+        parser.add_argument('batchjob_name', help="Batch job name").completer = BatchJobCompleter(
+            resource_url=self.RESOURCE_URL
+        )
+        add_output_argument(parser)
+
+        for command in ['download', 'upload']:
+            parser = data_commands.add_parser(command)
+            parser.add_argument('batchjob_name',
+                                help="Batch job name").completer = BatchJobCompleter(
+                                    resource_url=self.RESOURCE_URL)
+            if command == 'download':
+                parser.add_argument('paths', nargs='*', help='Paths of the files to download')
+                parser.add_argument('--all', action='store_true',
+                                    help='Download all files of the batch job')
+                parser.add_argument('-d', '--dest', default='.',
+                                    help='Destination directory (default: .)')
+            else:
+                parser.add_argument('files', nargs='+', help='Local files to upload')
+                parser.add_argument('--prefix', default='',
+                                    help='Remote directory of the uploaded files')
+            parser.add_argument('-p', '--parallel',
+                                type=int,
+                                default=None,
+                                help='Number of chunks transferred concurrently '
+                                     f'(default: {DataTransfer.MAX_WORKERS})')
+            parser.add_argument('--chunk-size',
+                                type=int,
+                                default=DataTransfer.CHUNK_SIZE // (1024 * 1024),
+                                help='Chunk size in MiB (default: '
+                                     f'{DataTransfer.CHUNK_SIZE // (1024 * 1024)})')
+
     def create(self, *args):
         """
         Create new BatchJob
@@ -123,8 +309,20 @@ class BatchJobCommandGroup(CommandGroupBase):
             with open(parsed_args.file, "r") as yaml_file:
 
                 deploy_content = yaml.safe_load(yaml_file)
+                self.check_manifest(deploy_content, parsed_args.file,
+                                    expected_kinds=['BatchJob'],
+                                    skip=parsed_args.no_validate)
+                if isinstance(deploy_content, dict) and 'sweep' in deploy_content:
+                    self.create_sweep(deploy_content, parsed_args, config)
+                    return
+                if parsed_args.dry_run:
+                    print('[Error] --dry-run requires a manifest with a sweep section')
+                    sys.exit(1)
+
                 rosparam_yamls = self.load_yaml_files_from_parammap(
-                    deploy_content)
+                    deploy_content,
+                    manifest_path=parsed_args.file,
+                    config=config)
 
                 # call api server
                 _, response = self.call_api(
@@ -136,145 +334,341 @@ class BatchJobCommandGroup(CommandGroupBase):
                     },
                     auth_token=config['token']
                 )
-                print(response)
+                self.print_response(response, parsed_args.output)
 
         except FileNotFoundError:
             print(
                 f'Deployment description file: {parsed_args.file} not found.')
             sys.exit(1)
 
-    @staticmethod
-    def load_yaml_files_from_parammap(deploy_content: dict):
-        """
-        Load the yaml files from the rosParamMap
-
-        Args:
-            deploy_content (dict): Deployment manifest
-        Returns:
-            list of dict: 
-                {
-                    'name': paramete map name,
-                    'type': 'yaml',
-                    'content': {
-                        'ros parameter file name': 'file content'
-                    }
-                }
-        """
-        parammap = deploy_content.get('rosParamMap', None)
-        if not parammap:
-            return []
-
-        param_files = []
-        for item in parammap:
-            if item['type'] == 'yaml':
-                try:
-                    with open(item['path'], 'r') as yaml_file:
-                        # read the file content, don't parse it to dict
-                        param_files.append({
-                            'name': item['name'],
-                            'type': 'yaml',
-                            'content': {
-                                item['name']: yaml_file.read()
-                            },
-                        })
-                except FileNotFoundError:
-                    print(f"Parameter file: {item['path']} not found.")
-                    sys.exit(1)
-                except KeyError:
-                    print(
-                        f"Parameter file path in {item['name']} is not specified.")
-                    sys.exit(1)
+    def create_sweep(self, manifest: dict, parsed_args, config: dict):
+        """
+        Submit each variant of the sweep section as its own batch job,
+        concurrently and rate limited. The variants are expanded batch by
+        batch. Each submitted variant is recorded as soon as the server
+        accepts it, the progress file is written after each batch and when
+        the campaign is interrupted, so a campaign started again skips them.
+        Exits with 1 if any variant was not submitted.
+        """
+        try:
+            sweep = Sweep(manifest)
+        except SweepError as exc:
+            print(f'{parsed_args.file}: {exc.path}: {exc}')
+            sys.exit(1)
 
-        return param_files
+        # a dry run reads the parameter files, but uploads nothing
+        rosparam_yamls = self.load_yaml_files_from_parammap(
+            manifest,
+            manifest_path=parsed_args.file,
+            config=None if parsed_args.dry_run else config)
+
+        progress = SweepProgress(parsed_args.progress
+                                 or SweepProgress.get_default_path(parsed_args.file))
+        progress.load()
+        url = f"{config['server']}/{Endpoints.BATCH_JOB}"
+        counts = {'submitted': 0, 'skipped': 0, 'failed': 0, 'pending': 0}
+        records = []
+        table = None
+        if parsed_args.output == 'table':
+            table = StreamingTable(['Batch Job', 'Parameters', 'Result', 'Latency', 'Message'])
+
+        def is_submitted(res):
+            return res.success and isinstance(res.data, dict) \
+                and res.data.get('status', None) == 'success'
+
+        # variants of the batch being submitted, by name
+        in_flight = {}
+
+        def on_result(res):
+            # recorded before the whole batch is done, kept if interrupted
+            if is_submitted(res):
+                counts['submitted'] += 1
+                progress.add(in_flight[res.key])
+
+        def add_record(variant, result, seconds=None, message=''):
+            record = {'name': variant.name, 'values': variant.values, 'result': result,
+                      'seconds': seconds, 'message': message}
+            if table is None:
+                records.append(record)
+                return
+            table.add_row({
+                'Batch Job': variant.name,
+                'Parameters': ', '.join(f"{parameter.split('.', 1)[1]}={value}"
+                                        for parameter, value in variant.values.items()),
+                'Result': result,
+                'Latency': f'{seconds:.2f}s' if seconds is not None else '-',
+                'Message': message,
+            })
+
+        start = time.perf_counter()
+        variants = iter(sweep)
+        try:
+            while True:
+                batch = []
+                for variant in variants:
+                    if progress.is_submitted(variant):
+                        counts['skipped'] += 1
+                        continue
+                    batch.append(variant)
+                    if len(batch) >= self.SWEEP_BATCH_SIZE:
+                        break
+                if not batch:
+                    break
+                if parsed_args.dry_run:
+                    for variant in batch:
+                        counts['pending'] += 1
+                        add_record(variant, 'pending')
+                    continue
+
+                in_flight = {variant.name: variant for variant in batch}
+                results = self.call_api_bulk(
+                    [ApiCall(variant.name, 'POST', url, {
+                        'json': {
+                            'deployment_manifest': variant.manifest,
+                            'rosparam_yamls': rosparam_yamls,
+                        },
+                    }) for variant in batch],
+                    concurrency=parsed_args.parallel,
+                    auth_token=config['token'],
+                    rate=parsed_args.rate,
+                    on_result=on_result)
+                for variant, res in zip(batch, results):
+                    seconds = round(res.elapsed, 3)
+                    if not res.success:
+                        counts['failed'] += 1
+                        add_record(variant, 'failed', seconds, str(res.error))
+                    elif not is_submitted(res):
+                        counts['failed'] += 1
+                        errors = res.data.get('errors', res.data) \
+                            if isinstance(res.data, dict) else res.data
+                        add_record(variant, 'failed', seconds, str(errors))
+                    else:
+                        add_record(variant, 'submitted', seconds,
+                                   str(res.data.get('msg', '')))
+                progress.save()
+        except OSError as exc:
+            print(f'[Error] Progress file {progress.path}: {exc}')
+            sys.exit(1)
+        except KeyboardInterrupt:
+            if not parsed_args.dry_run:
+                try:
+                    progress.save()
+                except OSError as exc:
+                    print(f'[Error] Progress file {progress.path}: {exc}', file=sys.stderr)
+            print(f"\nInterrupted after {counts['submitted']} variants, run the command "
+                  'again to continue the sweep', file=sys.stderr)
+            sys.exit(130)
+        finally:
+            if table is not None:
+                table.close()
+        elapsed = time.perf_counter() - start
+
+        if table is None:
+            write_records(records, parsed_args.output, name_field=self.NAME_FIELD)
+        else:
+            if parsed_args.dry_run:
+                summary = f"\n{counts['pending']} variants to submit"
+            else:
+                summary = f"\n{counts['submitted']} variants submitted in {elapsed:.2f}s"
+            print(summary
+                  + ''.join(f', {counts[key]} {text}' for key, text in [
+                      ('skipped', 'already submitted'), ('failed', 'failed')] if counts[key])
+                  + (f', {sweep.num_duplicates} duplicates skipped'
+                     if sweep.num_duplicates else '')
+                  + f'\nProgress: {progress.path}')
+        if counts['failed']:
+            sys.exit(1)
 
     def info(self, *args):
         """
-        Retrieve the status of a cluster by cluster name
-        Example: kuberos cluster info <cluster_name>
+        Retrieve the status and job counts of a batch job by name
+        Example: kuberos job info <batchjob_name>
         """
         parser = self.commands['info']
         parsed_args = parser.parse_args(args)
 
         config = KuberosConfig.get_current_config()
-        resource_url = f"{config['server']}/{Endpoints.DEPLOYMENT}{parsed_args.deployment_name}/"
-        success, res = self.call_api('GET',
+        resource_url = f"{config['server']}/{Endpoints.BATCH_JOB}{parsed_args.batchjob_name}/"
+        if parsed_args.output == 'table':
+            # the jobs are counted while the response is received
+            _, res = self.stream_api('GET',
                                      resource_url,
+                                     ['data', 'batch_job_set'],
                                      auth_token=config['token'])
-        if res['status'] == 'success':
-
-            data = res['data']
-
-            # meta info
-            print(f"Deployment Name: {data['name']}")
-            print(f"Status: {data['status']}")
-            print(f"Fleet: {data['fleet_name']}")
-            print(f"Running Since: {data['running_since']}")
-
-            # dep jobs summary
-            num_of_single_dash = 60
-            print('Deployment Jobs Summary')
-            print('-' * num_of_single_dash)
-            dep_job_set = data['deployment_job_set']
-            data_to_display = [{
-                'Robot Name': job['robot_name'],
-                'Job Phase': job['job_phase'],
-                'Pods': len(job['all_pods_status']),
-                'Services': len(job['all_svcs_status']),
-            } for job in dep_job_set]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-
-            # detailed job status
-            print('\n')
-            i = 0
-            for job in dep_job_set:
-                i += 1
-                print(f"Deployment Job Nr. {i}")
-                print(f"Robot Name: {job['robot_name']}")
-                print(f"Job Phase: {job['job_phase']}")
-                print('-' * num_of_single_dash)
-
-                data_to_display = [{
-                    'Resource Name': pod['name'],
-                    'Type': 'Pod',
-                    'Status': pod.get('status', 'N/A'),
-                } for pod in job['all_pods_status']]
-                data_to_display += [{
-                    'Resource Name': svc['name'],
-                    'Type': 'Service',
-                    'Status': svc.get('status', 'N/A'),
-                } for svc in job['all_svcs_status']]
-
-                table = tabulate(
-                    data_to_display, headers="keys", tablefmt='plain')
-                print(table)
-
         else:
-            print(res)
+            _, res = self.call_api('GET',
+                                   resource_url,
+                                   auth_token=config['token'])
+        with self.stream_errors():
+            if res['status'] == 'success' and parsed_args.output != 'table':
+                self.print_response(res['data'], parsed_args.output)
+            elif res['status'] == 'success':
+                self.print_batchjob_info(res['data'])
+            else:
+                print(res)
 
-    def list(self):
+    @staticmethod
+    def print_batchjob_info(data):
+        """
+        Print the batch job status and its job counts by execution cluster
+        """
+        print(f"Batch Job Name: {data['name']}")
+        print(f"Status: {data['status']}")
+        print(f"Exec. Clusters: {data['exec_clusters']}")
+        print(f"Started Since: {data['started_since']}")
+        print(f"Duration: {data['execution_time']}")
+
+        counts = count_jobs(data.get('batch_job_set', None) or [])
+        print('\nJobs Summary')
+        print('-' * 60)
+        with StreamingTable() as table:
+            for row in BatchJobCommandGroup.get_progress_rows(counts):
+                table.add_row(row)
+
+    @staticmethod
+    def get_progress_rows(counts: dict, monitor: ProgressMonitor = None) -> list:
+        """
+        Get the table rows of the job counts, one per cluster and the total.
+        With a monitor, the rows get the throughput of each cluster.
+        """
+        rows = []
+        for cluster, cluster_counts in sorted(counts.items()) + [('Total', get_totals(counts))]:
+            row = {'Exec. Cluster': cluster, 'Jobs': sum(cluster_counts.values())}
+            row.update({state.capitalize(): cluster_counts[state] for state in STATES})
+            if monitor is not None:
+                throughput = monitor.get_throughput(None if cluster == 'Total' else cluster)
+                row['Jobs/min'] = f'{throughput:.1f}' if throughput is not None else '-'
+            rows.append(row)
+        return rows
+
+    def watch(self, *args):
+        """
+        Poll a batch job and show its progress, throughput and ETA until all
+        jobs are finished
+        Example: kuberos job watch <batchjob_name>
+        """
+        parser = self.commands['watch']
+        parsed_args = parser.parse_args(args)
+
+        config = KuberosConfig.get_current_config()
+        poller = ConditionalPoller(
+            f"{config['server']}/{Endpoints.BATCH_JOB}{parsed_args.batchjob_name}/",
+            headers={'Authorization': 'Token ' + config['token']},
+            min_interval=parsed_args.interval,
+            max_interval=max(parsed_args.interval, self.WATCH_MAX_INTERVAL))
+        monitor = ProgressMonitor(window=parsed_args.window)
+        view = LiveView()
+        data = None
+        try:
+            while True:
+                error = ''
+                try:
+                    changed, response = poller.poll()
+                except ApiError as exc:
+                    if exc.status_code is not None:
+                        print(exc)
+                        sys.exit(1)
+                    changed, error = False, f'  {exc}'
+
+                if changed:
+                    if response['status'] != 'success':
+                        print(response)
+                        sys.exit(1)
+                    data = response['data']
+                if data is not None and not error:
+                    # unchanged polls are samples too, the throughput decays
+                    monitor.add_sample(count_jobs(data.get('batch_job_set', None) or []))
+
+                next_interval = poller.next_interval(changed)
+                status = (f"Updated {time.strftime('%H:%M:%S')}, next in {next_interval:.1f}s, "
+                          f"{poller.num_requests} requests{error}")
+                if data is not None and parsed_args.output == 'table':
+                    view.update(self.get_watch_lines(data, monitor, view), status)
+                elif changed:
+                    self.print_response(self.get_progress(data, monitor), parsed_args.output)
+                if monitor.is_finished():
+                    if not monitor.counts and parsed_args.output == 'table':
+                        print(f"Batch job '{parsed_args.batchjob_name}' has no jobs")
+                    return
+                time.sleep(next_interval)
+
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def get_progress(data: dict, monitor: ProgressMonitor) -> dict:
+        """
+        Get the progress of the watched batch job, for the machine readable output formats
+        """
+        throughput = monitor.get_throughput()
+        eta = monitor.get_eta()
+        return {
+            'name': data['name'],
+            'status': data['status'],
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'jobs': get_totals(monitor.counts),
+            'exec_clusters': monitor.counts,
+            'jobs_per_min': round(throughput, 3) if throughput is not None else None,
+            'eta_seconds': round(eta) if eta is not None else None,
+        }
+
+    def get_watch_lines(self, data: dict, monitor: ProgressMonitor, view: LiveView) -> list:
+        """
+        Get the output lines of the watched batch job
+        """
+        totals = get_totals(monitor.counts)
+        num_jobs = sum(totals.values())
+        num_finished = totals['succeeded'] + totals['failed']
+        throughput = monitor.get_throughput()
+        lines = [
+            f"Batch Job Name: {data['name']}",
+            f"Status: {data['status']}",
+            f"Started Since: {data['started_since']}",
+            f"Progress: {num_finished}/{num_jobs} "
+            f"({num_finished * 100 / num_jobs if num_jobs else 0:.1f}%), "
+            f"{f'{throughput:.1f}' if throughput is not None else '-'} jobs/min, "
+            f"ETA {format_duration(monitor.get_eta())}",
+            '',
+        ]
+        headers = ['Exec. Cluster', 'Jobs'] + [state.capitalize() for state in STATES] \
+            + ['Jobs/min']
+        return lines + view.format_table('jobs', headers,
+                                         self.get_progress_rows(monitor.counts, monitor))
+
+    def list(self, *args):
         """
         List all deployments
         Example: kuberos cluster list
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is not None:
+            self.list_in_contexts(contexts, Endpoints.BATCH_JOB, self.get_list_rows,
+                                  output_format=parsed_args.output,
+                                  page_size=parsed_args.page_size,
+                                  limit=parsed_args.limit)
+            return
+
         config = KuberosConfig.get_current_config()
-        success, response = self.call_api('GET',
-                                          f"{config['server']}/{Endpoints.BATCH_JOB}",
-                                          auth_token=config['token'])
-        if success:
-            data = response['data']
-            data_to_display = [{
-                'Name': item['name'],
-                'Status': item['status'],
-                'Exec. Clusters': item["exec_clusters"],
-                'Started Since': item['started_since'],
-                'Duration': item['execution_time']
-            } for item in data]
-
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print("[FATAL] Unknown error.")
+        self.list_resources(f"{config['server']}/{Endpoints.BATCH_JOB}",
+                            config['token'],
+                            self.get_list_rows,
+                            parsed_args)
+
+    @staticmethod
+    def get_list_rows(data: list) -> list:
+        """
+        Convert the batch job list to table rows
+        """
+        return [{
+            'Name': item['name'],
+            'Status': item['status'],
+            'Exec. Clusters': item["exec_clusters"],
+            'Started Since': item['started_since'],
+            'Duration': item['execution_time']
+        } for item in data]
 
     def stop(self, *args):
         """
@@ -291,7 +685,7 @@ class BatchJobCommandGroup(CommandGroupBase):
                                           },
                                           auth_token=config['token'])
         if success:
-            print(response)
+            self.print_response(response, parsed_args.output)
         else:
             print('[Error] Failed to stop a batchjob')
 
@@ -310,29 +704,101 @@ class BatchJobCommandGroup(CommandGroupBase):
                                           },
                                           auth_token=config['token'])
         if success:
-            print(response)
+            self.print_response(response, parsed_args.output)
         else:
             print('[Error] Failed to stop a batchjob')
 
     def delete(self, *args):
         """
-        Delete the cluster by cluster name
+        Delete one or more batch jobs by name
         """
         parser = self.commands['delete']
         parsed_args = parser.parse_args(args)
         config = KuberosConfig.get_current_config()
-        url = f"{config['server']}/{Endpoints.BATCH_JOB}{parsed_args.batchjob_name}/"
-        success, response = self.call_api('DELETE',
-                                          url,
-                                          data={
-                                              'hard_delete': str(parsed_args.force)
-                                          },
-                                          auth_token=config['token'])
-        if success:
-            print(response)
-            # print(f"Successfully delete cluster: {parsed_args.deployment_name}")
-        else:
-            print('[Error] Failed to delete batchjob')
+
+        calls = [ApiCall(batchjob_name,
+                         'DELETE',
+                         f"{config['server']}/{Endpoints.BATCH_JOB}{batchjob_name}/",
+                         {'data': {'hard_delete': str(parsed_args.force)}})
+                 for batchjob_name in parsed_args.batchjob_name]
+        results = self.call_api_bulk(calls,
+                                     concurrency=parsed_args.parallel,
+                                     auth_token=config['token'])
+        for res in results:
+            if res.success:
+                self.print_response(res.data, parsed_args.output)
+
+        error_stream = sys.stderr if parsed_args.output != 'table' else None
+        if self.print_bulk_errors(results, stream=error_stream) > 0:
+            sys.exit(1)
+
+    def data(self, *args):
+        """
+        List, download and upload the data files of a batch job
+        Example: kuberos job data download <batchjob_name> --all -d results/
+        """
+        parser = self.commands['data']
+        parsed_args = parser.parse_args(args)
+        if parsed_args.data_command is None:
+            self.print_help()
+            return
+
+        config = KuberosConfig.get_current_config()
+        if parsed_args.data_command == 'list':
+            transfer = DataTransfer(config['server'], config['token'], parsed_args.batchjob_name)
+            try:
+                files = transfer.list_files()
+            except ApiError as exc:
+                print(exc)
+                sys.exit(1)
+            self.print_list(files, self.get_data_rows, parsed_args.output)
+            return
+
+        transfer = DataTransfer(config['server'],
+                                config['token'],
+                                parsed_args.batchjob_name,
+                                parallel=parsed_args.parallel,
+                                chunk_size=parsed_args.chunk_size * 1024 * 1024)
+        try:
+            if parsed_args.data_command == 'download':
+                paths = parsed_args.paths
+                if parsed_args.all:
+                    paths = [item['path'] for item in transfer.list_files()]
+                transfers = [(path, os.path.join(parsed_args.dest, check_relative_path(path)))
+                             for path in paths]
+            else:
+                transfers = [(path, posixpath.join(parsed_args.prefix,
+                                                   os.path.basename(path)))
+                             for path in parsed_args.files]
+
+            for source, target in transfers:
+                progress = TransferProgress(source)
+                transfer.on_progress = progress.update
+                if parsed_args.data_command == 'download':
+                    num_bytes = transfer.download(source, target)
+                else:
+                    num_bytes = transfer.upload(source, target)
+                progress.finish(target, num_bytes)
+
+        except (ApiError, TransferError, OSError) as exc:
+            print(f'\n{exc}', file=sys.stderr)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print('\nInterrupted, run the command again to resume the transfer',
+                  file=sys.stderr)
+            sys.exit(130)
+
+    @staticmethod
+    def get_data_rows(data: list) -> list:
+        """
+        Convert the data file list to table rows
+        """
+        return [{
+            'Path': item['path'],
+            'Size': format_size(item['size']),
+            'SHA256': str(item.get('sha256', ''))[:12],
+            'Modified': item.get('modified', ''),
+        } for item in data]
 
     def print_help(self):
         """
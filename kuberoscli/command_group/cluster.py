@@ -4,10 +4,10 @@ Command group Cluster
 
 import sys
 import yaml
-from tabulate import tabulate
 
 from ..endpoints import Endpoints
 from ..kuberos_config import KuberosConfig
+from ..table_stream import StreamingTable, deferred_section, write_deferred_section, open_pager
 from .base import CommandGroupBase, KubeROSBaseCompleter
 
 
@@ -17,19 +17,29 @@ KubeROS CLI [cluster] command group
 Usage:
     kuberos cluster <command> [-args]
     
+    All commands accept -o --output: table (default), wide, name, json, jsonl, yaml, csv
+    
 Commands:
     create       Register a new cluster to Kuberos 
                  -f --file: cluster registration yaml file path
+                 --no-validate: don't validate the manifest before sending it
 
     list         List all clusters
+                 --limit: max. number of listed resources
+                 --page-size: number of resources requested per page
+                 -A --all-contexts: list the clusters of all contexts
+                 --contexts: list the clusters of the given contexts (ctx-1,ctx-2)
     
     info         Get cluster info by cluster name
                  -u --usage: get cluster resource utilization
                  -s --sync:  synchronize immediatelly
+                 --no-pager: don't pipe the output to a pager
+                 -A --all-contexts / --contexts: query several contexts
     
     update       Update a cluster inventory description
                  -f --file:  cluster inventory yaml file path
                  -c --clean: remove the legacy cluster inventory
+                 --no-validate: don't validate the manifest before sending it
 
     delete       Remove the cluster from KubeROS
 '''
@@ -40,9 +50,7 @@ class ClusterCompleter(KubeROSBaseCompleter):
     Get the list of cluster names from the API server or cached data
     """
 
-    def get_data_for_completion(self):
-        _, data = self.call_api()
-        return [item['cluster_name'] for item in data]
+    NAME_FIELD = 'cluster_name'
 
 
 class ClusterCommandGroup(CommandGroupBase):
@@ -54,10 +62,13 @@ class ClusterCommandGroup(CommandGroupBase):
 
     RESOURCE_URL = 'api/v1/cluster/clusters_name_list'
 
+    NAME_FIELD = 'cluster_name'
+
     def __init__(self, subparsers) -> None:
         super().__init__(subparsers, 'cluster')
 
         self.init_subcommand_create()
+        self.init_subcommand_list()
         self.init_subcommand_info()
         self.init_subcommand_update()
         self.init_subcommand_delete()
@@ -69,6 +80,15 @@ class ClusterCommandGroup(CommandGroupBase):
         parser = self.commands['create']
         parser.add_argument(
             '-f', '--file', help='File path of cluster registration')
+        self.add_validation_argument(parser)
+
+    def init_subcommand_list(self):
+        """
+        Initialize the subcommand <list>
+        """
+        parser = self.commands['list']
+        self.add_context_arguments(parser)
+        self.add_page_arguments(parser)
 
     def init_subcommand_info(self):
         """
@@ -82,6 +102,9 @@ class ClusterCommandGroup(CommandGroupBase):
                             help='Synchronize the cluster with Kuberos')
         parser.add_argument('-u', '--usage', action='store_true',
                             help='Get current resource usage')
+        parser.add_argument('--no-pager', action='store_true',
+                            help='Do not pipe the output to a pager')
+        self.add_context_arguments(parser)
 
     def init_subcommand_update(self):
         """
@@ -91,6 +114,7 @@ class ClusterCommandGroup(CommandGroupBase):
         parser.add_argument(
             '-f', '--file',
             help='File path of cluster registration')
+        self.add_validation_argument(parser)
         parser.add_argument(
             '-c', '--clean',
             default=False,
@@ -113,7 +137,8 @@ class ClusterCommandGroup(CommandGroupBase):
         parser = self.commands['create']
         parsed_args = parser.parse_args(args)
 
-        cluster_data = self.parse_cluster_registration_yaml(parsed_args.file)
+        cluster_data = self.parse_cluster_registration_yaml(parsed_args.file,
+                                                            validate=not parsed_args.no_validate)
         ca_file_path = cluster_data.pop('ca_cert')
 
         config = KuberosConfig.get_current_config()
@@ -128,7 +153,9 @@ class ClusterCommandGroup(CommandGroupBase):
                     data=cluster_data,
                     auth_token=config['token'],
                 )
-                if success:
+                if success and parsed_args.output != 'table':
+                    self.print_response(res, parsed_args.output)
+                elif success:
                     print("Successfully create cluster")
                 else:
                     print('ERROR')
@@ -137,18 +164,22 @@ class ClusterCommandGroup(CommandGroupBase):
             print(f'CA cert file: {ca_file_path} not found.')
             sys.exit(1)
 
-    @staticmethod
-    def parse_cluster_registration_yaml(yaml_file):
+    @classmethod
+    def parse_cluster_registration_yaml(cls, yaml_file, validate: bool = True):
         """
         Parse the cluster registration yaml file
         Args:
             yaml_file (str): path_to_yaml_file
+            validate (bool): validate the manifest offline first
         Returns:
             dict: cluster registreation dict
         """
         try:
             with open(yaml_file, 'r', encoding='utf-8') as file:
                 manifest = yaml.safe_load(file)
+                cls.check_manifest(manifest, yaml_file,
+                                   expected_kinds=['ClusterRegistration'],
+                                   skip=not validate)
                 meta_data = manifest['metadata']
                 cluster = {
                     'cluster_name': meta_data['name'],
@@ -175,6 +206,10 @@ class ClusterCommandGroup(CommandGroupBase):
 
         try:
             with open(parsed_args.file, 'r', encoding='utf-8') as file:
+                if not parsed_args.no_validate:
+                    self.check_manifest(yaml.safe_load(file), parsed_args.file,
+                                        expected_kinds=['ClusterInventory'])
+                    file.seek(0)
                 files = {'inventory_description': file}
                 data = {
                     'clean': str(parsed_args.clean)
@@ -187,10 +222,7 @@ class ClusterCommandGroup(CommandGroupBase):
                     data=data,
                     auth_token=config['token'],
                 )
-                if res['res'] == 'success':
-                    print(res)
-                else:
-                    print(res)
+                self.print_response(res, parsed_args.output)
         except FileNotFoundError:
             print(f'Inventory description file: {parsed_args.file} not found.')
             sys.exit(1)
@@ -204,166 +236,217 @@ class ClusterCommandGroup(CommandGroupBase):
         parser = self.commands['info']
         parsed_args = parser.parse_args(args)
 
+        request_data = {
+            'sync': str(parsed_args.sync),
+            'get_usage': str(parsed_args.usage),
+        }
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is not None:
+            self.info_in_contexts(contexts,
+                                  f"{Endpoints.CLUSTER}{parsed_args.cluster_name}/",
+                                  self.print_cluster_info,
+                                  output_format=parsed_args.output,
+                                  json=request_data)
+            return
+
         config = KuberosConfig.get_current_config()
         cluster_url = f"{config['server']}/{Endpoints.CLUSTER}{parsed_args.cluster_name}/"
-        success, response = self.call_api('GET',
-                                          cluster_url,
-                                          auth_token=config['token'],
-                                          json_data={
-                                              'sync': str(parsed_args.sync),
-                                              'get_usage': str(parsed_args.usage),
-                                          })
+        if parsed_args.output == 'table':
+            # the nodes are rendered while the response is received
+            success, response = self.stream_api('GET',
+                                                cluster_url,
+                                                ['data', 'cluster_node_set'],
+                                                auth_token=config['token'],
+                                                json_data=request_data)
+        else:
+            success, response = self.call_api('GET',
+                                              cluster_url,
+                                              auth_token=config['token'],
+                                              json_data=request_data)
         if success:
-            if response['status'] == 'failed':
-                print("Retrieve cluster status failed.")
-                print("Errors: ")
-                print(response['errors'])
-                sys.exit(1)
-
-            data = response['data']
-            print('\n')
-            print(f"Cluster Name: {data['cluster_name']}")
-            print(f"API Server: {data['host_url']}")
-            print(f'Alive Age: {data["alive_age"]}')
-            print(f'Since Last Sync: {data["last_sync_since"]}')
-            print('\n')
-            # display onboard device
-            onboard_devices = []
-            edge_nodes = []
-            control_plane_nodes = []
-            unassigned_nodes = []
-            resource_usage = []
-
-            for node in data['cluster_node_set']:
-                # onboard computers
-                if node['kuberos_role'] == 'onboard':
-                    fleet_name = node.get('assigned_fleet_name', 'Unknown')
-                    if not fleet_name:
-                        fleet_name = 'N/A'
-
-                    onboard_devices.append(
-                        {
-                            'ROBOT_NAME': node.get('robot_name', None),
-                            'HOSTNAME': node['hostname'],
-                            'DEVICE_GROUP': node['device_group'],
-                            'IS_ALIVE': node['is_alive'],
-                            'AVAILABLE': node['is_available'],
-                            'FLEET': fleet_name,
-                            'PERIPHERALS': node.get('peripheral_device_name_list', None), })
-
-                # Edge nodes (on-premise)
-                elif node['kuberos_role'] == 'edge':
-                    edge_nodes.append({
-                        'HOSTNAME': node['hostname'],
-                        'GROUP': node.get('resource_group', None),
-                        'SHARED': node.get('is_shared', None),
-                        'IS_ALIVE': node['is_alive'],
-                        'AVAILABLE': node['is_available'],
-                        'REACHABLE': node['is_alive']})
-
-                # unassigned nodes
-                elif node['kuberos_role'] == 'unassigned':
-                    unassigned_nodes.append({
-                        'HOSTNAME': node['hostname'],
-                        'ROLE': node['kuberos_role'],
-                        'REGISTERED': node['kuberos_registered'],
-                        'IS_ALIVE': node['is_alive'],
-                        'AVAILABLE': node['is_available'],
-                        'REACHABLE': node['is_alive'], })
-
-                # control plane nodes
-                elif node['kuberos_role'] == 'control_plane':
-                    control_plane_nodes.append({
-                        'HOSTNAME': node['hostname'],
-                        'ROLE': node['kuberos_role'],
-                        'REGISTERED': node['kuberos_registered'],
-                        'IS_ALIVE': node['is_alive'],
-                        'AVAILABLE': node['is_available'],
-                        'REACHABLE': node['is_alive'], })
-
-                # resoruce usage and capacity
-                use = node['get_usage']
-                cap = node['get_capacity']
-                display_usage_conditions = [
-                    use['cpu'] > 0,
-                    use['memory'] > 0,
-                    use['storage'] > 0,
-                ]
-                if all(display_usage_conditions):
-                    resource_usage.append({
-                        'HOSTNAME': node['hostname'],
-                        'CPU (Cores)': f"{use['cpu']:.2f}/{cap['cpu']} ({use['cpu']/cap['cpu']*100:.1f}%)",
-                        'Memory (Gb)': f"{use['memory']:.2f}/{cap['memory']:.1f} ({use['memory']/cap['memory']*100:.1f}%)",
-                        # 'Storage (Gb)': f"{use['storage']:.2f}/{cap['storage']:.1f} ({use['storage']/cap['storage']*100:.1f}%)"
-                        'Storage (Gb)': f"N/A/{cap['storage']:.1f}"
-                    })
-
-            # display data
-            num_of_single_dash = 80
-            if len(onboard_devices) > 0:
-                print('Robot Onboard Computers')
-                print('-' * num_of_single_dash)
-                table = tabulate(
-                    onboard_devices, headers="keys", tablefmt='plain')
-                print(table)
-                print('\n')
-            if len(edge_nodes) > 0:
-                print('Edge Nodes')
-                print('-' * num_of_single_dash)
-                table = tabulate(edge_nodes, headers="keys", tablefmt='plain')
-                print(table)
-                print('\n')
-            if len(unassigned_nodes) > 0:
-                print('Unassigned Nodes')
-                print('-' * num_of_single_dash)
-                table = tabulate(unassigned_nodes,
-                                 headers="keys", tablefmt='plain')
-                print(table)
-                print('\n')
-            if len(control_plane_nodes) > 0:
-                print('Control Plane Nodes')
-                print('-' * num_of_single_dash)
-                table = tabulate(control_plane_nodes,
-                                 headers="keys", tablefmt='plain')
-                print(table)
-                print('\n')
-
-            # print resource usages
-            if all(display_usage_conditions):
-                print('Resource Usages')
-                print('-' * num_of_single_dash)
-                table = tabulate(
-                    resource_usage, headers="keys", tablefmt='plain')
-                print(table)
-                print('\n')
+            with self.stream_errors():
+                if response['status'] == 'failed':
+                    print("Retrieve cluster status failed.")
+                    print("Errors: ")
+                    print(response['errors'])
+                    sys.exit(1)
+
+                if parsed_args.output == 'table':
+                    with open_pager(enabled=not parsed_args.no_pager) as stream:
+                        self.print_cluster_info(response['data'], stream=stream)
+                else:
+                    self.print_response(response['data'], parsed_args.output)
         else:
             print('error')
 
-    def list(self):
+    # sections of the cluster info, by kuberos role of the nodes
+    NODE_SECTIONS = [
+        ('onboard', 'Robot Onboard Computers',
+         ['ROBOT_NAME', 'HOSTNAME', 'DEVICE_GROUP', 'IS_ALIVE', 'AVAILABLE', 'FLEET', 'PERIPHERALS']),
+        ('edge', 'Edge Nodes',
+         ['HOSTNAME', 'GROUP', 'SHARED', 'IS_ALIVE', 'AVAILABLE', 'REACHABLE']),
+        ('unassigned', 'Unassigned Nodes',
+         ['HOSTNAME', 'ROLE', 'REGISTERED', 'IS_ALIVE', 'AVAILABLE', 'REACHABLE']),
+        ('control_plane', 'Control Plane Nodes',
+         ['HOSTNAME', 'ROLE', 'REGISTERED', 'IS_ALIVE', 'AVAILABLE', 'REACHABLE']),
+    ]
+
+    USAGE_HEADERS = ['HOSTNAME', 'CPU (Cores)', 'Memory (Gb)', 'Storage (Gb)']
+
+    @staticmethod
+    def get_node_row(node: dict) -> dict:
+        """
+        Convert a cluster node to the table row of its section
+        """
+        role = node['kuberos_role']
+        # onboard computers
+        if role == 'onboard':
+            fleet_name = node.get('assigned_fleet_name', 'Unknown')
+            if not fleet_name:
+                fleet_name = 'N/A'
+            return {
+                'ROBOT_NAME': node.get('robot_name', None),
+                'HOSTNAME': node['hostname'],
+                'DEVICE_GROUP': node['device_group'],
+                'IS_ALIVE': node['is_alive'],
+                'AVAILABLE': node['is_available'],
+                'FLEET': fleet_name,
+                'PERIPHERALS': node.get('peripheral_device_name_list', None), }
+
+        # Edge nodes (on-premise)
+        if role == 'edge':
+            return {
+                'HOSTNAME': node['hostname'],
+                'GROUP': node.get('resource_group', None),
+                'SHARED': node.get('is_shared', None),
+                'IS_ALIVE': node['is_alive'],
+                'AVAILABLE': node['is_available'],
+                'REACHABLE': node['is_alive']}
+
+        # unassigned and control plane nodes
+        return {
+            'HOSTNAME': node['hostname'],
+            'ROLE': role,
+            'REGISTERED': node['kuberos_registered'],
+            'IS_ALIVE': node['is_alive'],
+            'AVAILABLE': node['is_available'],
+            'REACHABLE': node['is_alive'], }
+
+    @staticmethod
+    def get_usage_row(node: dict) -> dict:
+        """
+        Convert the resource usage and capacity of a node to a table row,
+        None if the usage is not available
+        """
+        use = node['get_usage']
+        cap = node['get_capacity']
+        display_usage_conditions = [
+            use['cpu'] > 0,
+            use['memory'] > 0,
+            use['storage'] > 0,
+        ]
+        if not all(display_usage_conditions):
+            return None
+        return {
+            'HOSTNAME': node['hostname'],
+            'CPU (Cores)': f"{use['cpu']:.2f}/{cap['cpu']} ({use['cpu']/cap['cpu']*100:.1f}%)",
+            'Memory (Gb)': f"{use['memory']:.2f}/{cap['memory']:.1f} ({use['memory']/cap['memory']*100:.1f}%)",
+            # 'Storage (Gb)': f"{use['storage']:.2f}/{cap['storage']:.1f} ({use['storage']/cap['storage']*100:.1f}%)"
+            'Storage (Gb)': f"N/A/{cap['storage']:.1f}"
+        }
+
+    @classmethod
+    def print_cluster_info(cls, data: dict, stream=None):
+        """
+        Print the cluster status, nodes and resource usage.
+
+        The nodes are classified and rendered in a single pass: the onboard
+        computers are streamed to the output, the other sections are
+        rendered into deferred buffers and printed afterwards.
+
+        Args:
+            data (dict): cluster data, 'cluster_node_set' can be any iterable
+            stream (file, optional): defaults to sys.stdout
+        """
+        if stream is None:
+            stream = sys.stdout
+        stream.write('\n\n')
+        stream.write(f"Cluster Name: {data['cluster_name']}\n")
+        stream.write(f"API Server: {data['host_url']}\n")
+        stream.write(f'Alive Age: {data["alive_age"]}\n')
+        stream.write(f'Since Last Sync: {data["last_sync_since"]}\n')
+        stream.write('\n\n')
+        stream.flush()
+
+        num_of_single_dash = 80
+        sections = {}
+
+        def get_table(key, title, headers):
+            # sections are created with their first row, empty sections are not printed
+            if key not in sections:
+                section_stream = stream if key == 'onboard' else deferred_section()
+                section_stream.write(f"{title}\n{'-' * num_of_single_dash}\n")
+                sections[key] = StreamingTable(headers, stream=section_stream)
+            return sections[key]
+
+        node_sections = {key: (title, headers) for key, title, headers in cls.NODE_SECTIONS}
+
+        for node in data['cluster_node_set']:
+            key = node['kuberos_role']
+            if key in node_sections:
+                get_table(key, *node_sections[key]).add_row(cls.get_node_row(node))
+
+            # resoruce usage and capacity
+            usage = cls.get_usage_row(node)
+            if usage is not None:
+                get_table('usage', 'Resource Usages', cls.USAGE_HEADERS).add_row(usage)
+
+        # display data
+        for key in [key for key, _, _ in cls.NODE_SECTIONS] + ['usage']:
+            table = sections.get(key, None)
+            if table is None:
+                continue
+            table.close()
+            table.stream.write('\n\n')
+            if table.stream is not stream:
+                write_deferred_section(table.stream, stream)
+
+    def list(self, *args):
         """
         List all clusters that the user has access to
         Example: kuberos cluster list
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is not None:
+            self.list_in_contexts(contexts, Endpoints.CLUSTER, self.get_list_rows,
+                                  output_format=parsed_args.output,
+                                  page_size=parsed_args.page_size,
+                                  limit=parsed_args.limit)
+            return
+
         config = KuberosConfig.get_current_config()
-        success, response = self.call_api('GET',
-                                          f"{config['server']}/{Endpoints.CLUSTER}",
-                                          auth_token=config['token'])
-        if success:
-            data = response['data']
-            data_to_display = [{
-                'Cluster name': item['cluster_name'],
-                'Status': item['cluster_status'],
-                'Alive age': item["alive_age"],
-                'Last sync': item['last_sync_since'],
-                'Dist.': item['distribution'],
-                'Env.': item['env_type'],
-                'API server': item['host_url'],
-            } for item in data]
-
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print('[Error] Failed to list clusters')
+        self.list_resources(f"{config['server']}/{Endpoints.CLUSTER}",
+                            config['token'],
+                            self.get_list_rows,
+                            parsed_args)
+
+    @staticmethod
+    def get_list_rows(data: list) -> list:
+        """
+        Convert the cluster list to table rows
+        """
+        return [{
+            'Cluster name': item['cluster_name'],
+            'Status': item['cluster_status'],
+            'Alive age': item["alive_age"],
+            'Last sync': item['last_sync_since'],
+            'Dist.': item['distribution'],
+            'Env.': item['env_type'],
+            'API server': item['host_url'],
+        } for item in data]
 
     def delete(self, *args):
         """
@@ -377,7 +460,9 @@ class ClusterCommandGroup(CommandGroupBase):
         success, response = self.call_api('DELETE',
                                           url,
                                           auth_token=config['token'])
-        if success:
+        if success and parsed_args.output != 'table':
+            self.print_response(response, parsed_args.output)
+        elif success:
             print(response)
             print(f"Successfully delete cluster: {parsed_args.cluster_name}")
         else:
@@ -4,14 +4,14 @@ Command group Config
 
 import sys
 import getpass
-import requests
-from tabulate import tabulate
 
 from argcomplete.completers import BaseCompleter
 
 from ..endpoints import Endpoints
 from .base import CommandGroupBase
 from ..kuberos_config import KuberosConfig
+from ..output import write_records
+from ..transport import KuberosTransport
 
 
 CONFIG_HELP = '''
@@ -27,6 +27,7 @@ Commands:
                  --user: username in KubeROS
 
     list         List all contexts
+                 -o --output: table (default), wide, name, json, jsonl, yaml, csv
     
     switch       Switch the current context
     
@@ -56,6 +57,8 @@ class ConfigCommandGroup(CommandGroupBase):
 
     COMMAND_LIST = ['login', 'logout', 'switch', 'list', 'create', 'delete', 'update']
 
+    OUTPUT_COMMANDS = ['list']
+
     def __init__(self, subparsers) -> None:
         super().__init__(subparsers, 'config')
 
@@ -109,11 +112,25 @@ class ConfigCommandGroup(CommandGroupBase):
         parser.add_argument('context_name',
                             help="Name of the context").completer = ContextNameCompleter()
 
-    def list(self):
+    def list(self, *args):
         """
         List the contexts
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
         config = KuberosConfig.load_kuberos_config()
+        if parsed_args.output != 'table':
+            # never print the tokens
+            write_records(({
+                'name': item['name'],
+                'server': item['server'],
+                'user': item['user'],
+                'current': item['name'] == config['current-context'],
+            } for item in config['contexts']), parsed_args.output)
+            return
+
+        from tabulate import tabulate  # pylint: disable=import-outside-toplevel
         print("Current context: ", config['current-context'])
 
         data_to_display = [{
@@ -183,8 +200,8 @@ class ConfigCommandGroup(CommandGroupBase):
         """
         parser = self.commands['delete']
         args = parser.parse_args(args)
-        current_ctx = KuberosConfig.get_current_config()
-        if args.context_name == current_ctx['name']:
+        current_ctx_name = KuberosConfig.load_kuberos_config()['current-context']
+        if args.context_name == current_ctx_name:
             print("Please change the current context before deleting")
             sys.exit(0)
 
@@ -261,11 +278,10 @@ class ConfigCommandGroup(CommandGroupBase):
             headers['Authorization'] = 'Token ' + auth_token
 
         try:
-            resp = requests.request(method,
-                                    url,
-                                    json=json_data,
-                                    headers=headers,
-                                    timeout=2)
+            resp = KuberosTransport.request(method,
+                                            url,
+                                            json=json_data,
+                                            headers=headers)
 
             status_code = resp.status_code
 
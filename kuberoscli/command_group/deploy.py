@@ -4,11 +4,23 @@ Command group Deploy
 
 import os
 import sys
+import time
+import functools
+import threading
 import yaml
-from tabulate import tabulate
 
 from ..endpoints import Endpoints
 from ..kuberos_config import KuberosConfig
+from ..transport import ApiCall, ApiError, CANCELLED_ERROR
+from ..watch import ConditionalPoller, LiveView
+from ..rollout import READY_PHASES, wait_for_rollout
+from ..param_files import ParamFileLoader, ParamFileError
+from ..param_blobs import ParamBlobUploader
+from ..manifest_diff import LastApplied, DeploymentDiff, get_param_digests
+from ..wave_rollout import parse_waves, WaveRollout
+from ..apply_plan import load_documents, get_document_name, ManifestLoadError
+from ..output import write_records
+from ..table_stream import StreamingTable, deferred_section, write_deferred_section, open_pager
 from .base import CommandGroupBase, KubeROSBaseCompleter
 
 
@@ -18,17 +30,55 @@ KubeROS CLI [deploy] command group
 Usage:
     kuberos deploy <command> [deployment_name] [-args]
     
+    All commands accept -o --output: table (default), wide, name, json, jsonl, yaml, csv
+    
 Commands:
     create       Deploy an ROS2 application from manifest file
-                 -f --file: manifest file path
+                 -f --file: manifest file path, or a directory, glob pattern or
+                            multi-document yaml ('-' for stdin) to create
+                            one deployment per manifest concurrently
+                 -p --parallel: max. number of concurrent requests (several manifests)
+                 --fail-fast: don't send the remaining manifests after a failure
+                 --no-validate: don't validate the manifest before sending it
+                 --wait: wait until all jobs reached the target phase
+                 --until: target phase of --wait, running (default) or succeeded
+                 --timeout: max. seconds to wait (default: 300)
+                 exit codes of --wait: 0 ready, 1 request error, 2 job failed, 3 timeout
     
     list         List all deployments
+                 --limit: max. number of listed resources
+                 --page-size: number of resources requested per page
+                 -A --all-contexts: list the deployments of all contexts
+                 --contexts: list the deployments of the given contexts (ctx-1,ctx-2)
     
     info         Display the status of the deployment request
+                 --no-pager: don't pipe the output to a pager
+                 -w --watch: redraw the jobs when they change (Ctrl+C to stop)
+                 --interval: polling interval in seconds while the jobs are changing
+                 -A --all-contexts / --contexts: query several contexts
     
-    delete       Delete deployed application via deployment name
+    delete       Delete deployed applications via deployment names
+                 -p --parallel: max. number of concurrent requests
     
-    upgrade      Upgrade an existing deployment -> TODO
+    rollout      Roll out deployments in waves of robots
+                 -f --file: manifest file, directory, glob pattern or multi-document yaml
+                 --waves: robots after each wave, counts or percentages of
+                          the targetRobots (default: 1,10%,50%,100%)
+                 --until: phase of all jobs before the next wave, running (default)
+                          or succeeded
+                 --timeout: max. seconds to wait for each wave (default: 300)
+                 -p --parallel: max. number of fleets rolled out concurrently
+                 --no-validate: don't validate the manifests before sending them
+                 deployments of different fleets are rolled out in parallel,
+                 of the same fleet one after the other
+                 exit codes: 0 ready, 1 request error, 2 job failed, 3 timeout
+    
+    upgrade      Upgrade an existing deployment from its changed manifest
+                 -f --file: manifest file path
+                 --dry-run: print the plan, don't send the upgrade
+                 --no-validate: don't validate the manifest before sending it
+                 only the changed rosModules and rosParamMap entries are sent,
+                 compared to the manifest last applied from this machine
 '''
 
 
@@ -37,26 +87,38 @@ class DeployCompleter(KubeROSBaseCompleter):
     Get the list of deployment names from the API server or cached data
     """
 
-    def get_data_for_completion(self):
-        _, data = self.call_api()
-        return [item['name'] for item in data]
-
 
 class DeployCommandGroup(CommandGroupBase):
     """
     Command group [deploy]
     """
 
-    COMMAND_LIST = ['list', 'create', 'delete', 'info']
+    COMMAND_LIST = ['list', 'create', 'delete', 'info', 'upgrade', 'rollout']
 
     RESOURCE_URL = 'api/v1/deployment/deployments_name_list'
 
+    # job phases and pod status (lower case) that are not expected to change
+    STABLE_PHASES = {'running', 'succeeded', 'success', 'completed', 'failed', 'n/a'}
+
+    # max. polling interval of --watch in seconds, once the deployment is stable
+    WATCH_MAX_INTERVAL = 15.0
+
+    # exit codes of create --wait, request errors exit with 1
+    EXIT_JOB_FAILED = 2
+    EXIT_TIMEOUT = 3
+
+    # robots after each wave of rollout
+    DEFAULT_WAVES = '1,10%,50%,100%'
+
     def __init__(self, subparsers) -> None:
         super().__init__(subparsers, 'deploy')
 
         self.init_subcommand_create()
+        self.init_subcommand_list()
         self.init_subcommand_info()
         self.init_subcommand_delete()
+        self.init_subcommand_upgrade()
+        self.init_subcommand_rollout()
 
     def init_subcommand_create(self):
         """
@@ -64,7 +126,33 @@ class DeployCommandGroup(CommandGroupBase):
         """
         parser = self.commands['create']
         parser.add_argument(
-            '-f', '--file', help='File path of cluster registration')
+            '-f', '--file',
+            help='Manifest file, directory, glob pattern or - for multi-document stdin')
+        self.add_validation_argument(parser)
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of deployments created concurrently')
+        parser.add_argument('--fail-fast', action='store_true',
+                            help='Stop sending manifests after the first failed deployment')
+        parser.add_argument('--wait', action='store_true',
+                            help='Wait until all deployment jobs reached the target phase')
+        parser.add_argument('--until',
+                            choices=sorted(READY_PHASES),
+                            default='running',
+                            help='Target phase of the jobs with --wait (default: running)')
+        parser.add_argument('--timeout',
+                            type=float,
+                            default=300,
+                            help='Max. seconds to wait for the deployment (default: 300)')
+
+    def init_subcommand_list(self):
+        """
+        Initialize the subcommand <list>
+        """
+        parser = self.commands['list']
+        self.add_context_arguments(parser)
+        self.add_page_arguments(parser)
 
     def init_subcommand_info(self):
         """
@@ -74,6 +162,16 @@ class DeployCommandGroup(CommandGroupBase):
         parser.add_argument('deployment_name',
                             help="Name of the cluster").completer = DeployCompleter(
                                 resource_url=self.RESOURCE_URL)
+        parser.add_argument('--no-pager', action='store_true',
+                            help='Do not pipe the output to a pager')
+        parser.add_argument('-w', '--watch', action='store_true',
+                            help='Watch the deployment, redraw the jobs when they change')
+        parser.add_argument('--interval',
+                            type=float,
+                            default=1.0,
+                            help='Polling interval in seconds while the jobs are changing '
+                                 '(default: 1.0), slower once they are stable')
+        self.add_context_arguments(parser)
 
     def init_subcommand_delete(self):
         """
@@ -81,93 +179,527 @@ class DeployCommandGroup(CommandGroupBase):
         """
         parser = self.commands['delete']
         parser.add_argument('deployment_name',
-                            help="Name of the cluster").completer = DeployCompleter(
+                            nargs='+',
+                            help="Name(s) of the deployment").completer = DeployCompleter(
                                 resource_url=self.RESOURCE_URL)
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of deployments deleted concurrently')
+
+    def init_subcommand_upgrade(self):
+        """
+        Initialize the subcommand <upgrade>
+        """
+        parser = self.commands['upgrade']
+        parser.add_argument(
+            '-f', '--file', help='File path of the changed deployment manifest')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Print the upgrade plan without sending it')
+        self.add_validation_argument(parser)
+
+    def init_subcommand_rollout(self):
+        """
+        Initialize the subcommand <rollout>
+        """
+        parser = self.commands['rollout']
+        parser.add_argument(
+            '-f', '--file',
+            help='Manifest file, directory, glob pattern or - for multi-document stdin')
+        parser.add_argument('--waves',
+                            default=self.DEFAULT_WAVES,
+                            help='Robots after each wave, comma-separated counts or '
+                                 f'percentages (default: {self.DEFAULT_WAVES})')
+        parser.add_argument('--until',
+                            choices=sorted(READY_PHASES),
+                            default='running',
+                            help='Phase of the jobs before the next wave (default: running)')
+        parser.add_argument('--timeout',
+                            type=float,
+                            default=300,
+                            help='Max. seconds to wait for each wave (default: 300)')
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of fleets rolled out concurrently')
+        self.add_validation_argument(parser)
 
     def create(self, *args):
         """
-        Add new cluster to KubeROS
+        Create a deployment, or one deployment per manifest of a directory,
+        glob pattern or multi-document yaml
         """
         parser = self.commands['create']
         parsed_args = parser.parse_args(args)
 
+        if not parsed_args.file:
+            print('[Error] The manifest file is required: -f --file')
+            sys.exit(1)
         config = KuberosConfig.get_current_config()
 
         try:
-            with open(parsed_args.file, "r", encoding="utf-8") as yaml_file:
+            documents = load_documents([parsed_args.file])
+        except ManifestLoadError as exc:
+            print(exc)
+            sys.exit(1)
+        if not documents:
+            print(f'No manifest found in {parsed_args.file}')
+            sys.exit(1)
+        if len(documents) > 1 or not os.path.isfile(parsed_args.file):
+            self.create_bulk(documents, parsed_args, config)
+            return
+
+        deploy_content = documents[0].manifest
+        self.check_manifest(deploy_content, parsed_args.file,
+                            expected_kinds=['ApplicationDeployment'],
+                            skip=parsed_args.no_validate)
+        rosparam_yamls = self.load_yaml_files_from_parammap(
+            deploy_content,
+            manifest_path=parsed_args.file,
+            config=config)
+
+        # call api server
+        start = time.monotonic()
+        _, response = self.call_api(
+            'POST',
+            f"{config['server']}/{Endpoints.DEPLOYING}",
+            json_data={
+                'deployment_manifest': deploy_content,
+                'rosparam_yamls': rosparam_yamls
+            },
+            auth_token=config['token']
+        )
+
+        if response.get('status', None) == 'success':
+            LastApplied.save(config['name'], deploy_content, get_param_digests(rosparam_yamls))
+
+        if not parsed_args.wait:
+            self.print_response(response, parsed_args.output)
+            return
+
+        if response.get('status', None) != 'success':
+            self.print_response(response, parsed_args.output)
+            sys.exit(1)
+        self.wait(deploy_content['metadata']['name'], response, parsed_args, start)
 
-                deploy_content = yaml.safe_load(yaml_file)
-                rosparam_yamls = self.load_yaml_files_from_parammap(
-                    deploy_content,
-                    manifest_path=parsed_args.file)
-
-                # call api server
-                _, response = self.call_api(
-                    'POST',
-                    f"{config['server']}/{Endpoints.DEPLOYING}",
-                    json_data={
-                        'deployment_manifest': deploy_content,
-                        'rosparam_yamls': rosparam_yamls
-                    },
-                    auth_token=config['token']
-                )
-                print(response)
+    def create_bulk(self, documents: list, parsed_args, config: dict):
+        """
+        Create one deployment per manifest document, concurrently over the
+        pooled session. Prints one report with the latency of each manifest,
+        exits with 1 if any deployment was not created.
+        """
+        if parsed_args.wait:
+            print('[Error] --wait supports a single manifest file')
+            sys.exit(1)
 
-        except FileNotFoundError:
-            print(
-                f'Deployment description file: {parsed_args.file} not found.')
+        # all manifests are checked before the first one is sent
+        names = {}
+        for document in documents:
+            document_name = get_document_name(document)
+            self.check_manifest(document.manifest, document_name,
+                                expected_kinds=['ApplicationDeployment'],
+                                skip=parsed_args.no_validate)
+            deployment_name = self.get_deployment_name(document.manifest, document_name)
+            if deployment_name in names:
+                print(f"Deployment '{deployment_name}' is defined twice: "
+                      f"{names[deployment_name]} and {document_name}")
+                sys.exit(1)
+            names[deployment_name] = document_name
+
+        records = {}
+        calls = []
+        for document in documents:
+            deployment_name = document.manifest['metadata']['name']
+            try:
+                rosparam_yamls = self.get_rosparam_yamls(
+                    document.manifest,
+                    manifest_path=None if document.path == '-' else document.path,
+                    config=config)
+            except ParamFileError as exc:
+                if parsed_args.fail_fast:
+                    print(f'{names[deployment_name]}: {exc}')
+                    sys.exit(1)
+                records[deployment_name] = {'result': 'failed', 'seconds': None,
+                                            'message': str(exc)}
+                continue
+            calls.append(ApiCall(deployment_name, 'POST',
+                                 f"{config['server']}/{Endpoints.DEPLOYING}", {
+                                     'json': {
+                                         'deployment_manifest': document.manifest,
+                                         'rosparam_yamls': rosparam_yamls,
+                                     },
+                                 }))
+
+        def is_failed(res):
+            return not res.success or not isinstance(res.data, dict) \
+                or res.data.get('status', None) != 'success'
+
+        start = time.perf_counter()
+        results = self.call_api_bulk(calls,
+                                     concurrency=parsed_args.parallel,
+                                     auth_token=config['token'],
+                                     stop_when=is_failed if parsed_args.fail_fast else None)
+        elapsed = time.perf_counter() - start
+
+        for call, res in zip(calls, results):
+            if res.error == CANCELLED_ERROR:
+                record = {'result': 'cancelled', 'seconds': None, 'message': ''}
+            elif is_failed(res):
+                error = res.error
+                if res.success:
+                    error = res.data.get('errors', res.data) \
+                        if isinstance(res.data, dict) else res.data
+                record = {'result': 'failed', 'seconds': round(res.elapsed, 3),
+                          'message': str(error)}
+            else:
+                record = {'result': 'created', 'seconds': round(res.elapsed, 3),
+                          'message': str(res.data.get('msg', ''))}
+                body = call.kwargs['json']
+                LastApplied.save(config['name'], body['deployment_manifest'],
+                                 get_param_digests(body['rosparam_yamls']))
+            records[res.key] = record
+
+        records = [{'name': name, 'file': names[name], **records[name]} for name in names]
+        if parsed_args.output != 'table':
+            write_records(records, parsed_args.output, name_field=self.NAME_FIELD)
+        else:
+            self.print_bulk_report(records, elapsed)
+        if any(record['result'] != 'created' for record in records):
             sys.exit(1)
 
     @staticmethod
-    def load_yaml_files_from_parammap(deploy_content: dict,
-                                      manifest_path: str):
+    def get_deployment_name(manifest, file_name: str) -> str:
+        """
+        Get the metadata.name of a deployment manifest, exits if it is missing,
+        e.g. in a manifest not validated with --no-validate
         """
-        Load the yaml files from the rosParamMap
+        metadata = manifest.get('metadata', None) if isinstance(manifest, dict) else None
+        deployment_name = metadata.get('name', None) if isinstance(metadata, dict) else None
+        if not isinstance(deployment_name, str) or not deployment_name:
+            print(f'{file_name}: metadata.name is missing')
+            sys.exit(1)
+        return deployment_name
 
-        Args:
-            deploy_content (dict): Deployment manifest
-        Returns:
-            list of dict: 
-                {
-                    'name': paramete map name,
-                    'type': 'yaml',
-                    'content': {
-                        'ros parameter file name': 'file content'
-                    }
-                }
-        """
-        parammap = deploy_content.get('rosParamMap', None)
-        if not parammap:
-            return []
-
-        param_files = []
-        for item in parammap:
-            if item['type'] == 'yaml':
-                try:
-                    yaml_path = item['path']
-                    if not yaml_path.startswith('/'):
-                        # use relative path
-                        manifest_path_parent = manifest_path.split('/')[:-1]
-                        yaml_path = os.path.join(os.getcwd(), *manifest_path_parent, yaml_path)
-
-                    with open(yaml_path, 'r', encoding="utf-8") as yaml_file:
-                        # read the file content, don't parse it to dict
-                        param_files.append({
-                            'name': item['name'],
-                            'type': 'yaml',
-                            'content': {
-                                item['name']: yaml_file.read()
-                            },
-                        })
-                except FileNotFoundError:
-                    print(f"Parameter file: {item['path']} not found.")
-                    sys.exit(1)
-                except KeyError:
-                    print(
-                        f"Parameter file path in {item['name']} is not specified.")
-                    sys.exit(1)
+    @staticmethod
+    def print_bulk_report(records: list, elapsed: float):
+        """
+        Print the result and latency of each manifest and the latency percentiles
+        """
+        with StreamingTable(['Deployment', 'File', 'Result', 'Latency', 'Message']) as table:
+            for record in records:
+                table.add_row({
+                    'Deployment': record['name'],
+                    'File': record['file'],
+                    'Result': record['result'],
+                    'Latency': (f"{record['seconds']:.2f}s"
+                                if record['seconds'] is not None else '-'),
+                    'Message': record['message'],
+                })
+
+        counts = {}
+        for record in records:
+            counts[record['result']] = counts.get(record['result'], 0) + 1
+        print(f"\n{counts.get('created', 0)} of {len(records)} deployments created "
+              f"in {elapsed:.2f}s"
+              + ''.join(f', {counts[result]} {result}' for result in ('failed', 'cancelled')
+                        if result in counts))
+        latencies = sorted(record['seconds'] for record in records
+                           if record['seconds'] is not None)
+        if latencies:
+            print(f'Latency: p50 {latencies[len(latencies) // 2]:.2f}s, '
+                  f'p95 {latencies[min(len(latencies) - 1, len(latencies) * 95 // 100)]:.2f}s, '
+                  f'max {latencies[-1]:.2f}s')
+
+    def wait(self, deployment_name: str, response: dict, parsed_args, start: float):
+        """
+        Wait until all jobs of the created deployment reached the target phase,
+        print the phase changes and the time of each robot to get ready.
+        Exits with EXIT_JOB_FAILED if a job failed and EXIT_TIMEOUT on timeout.
+        """
+        config = KuberosConfig.get_current_config()
+        is_table = parsed_args.output == 'table'
+
+        def print_change(robot_name, old_phase, new_phase, elapsed):
+            print(f"[{elapsed:7.1f}s] {robot_name}: {old_phase or '-'} -> {new_phase}",
+                  flush=True)
 
-        return param_files
+        if is_table:
+            self.print_response(response, parsed_args.output)
+            print(f"Waiting for deployment '{deployment_name}' to be {parsed_args.until} "
+                  f"(timeout {parsed_args.timeout:g}s)", flush=True)
+        try:
+            tracker = wait_for_rollout(
+                f"{config['server']}/{Endpoints.DEPLOYMENT}{deployment_name}/",
+                headers={'Authorization': 'Token ' + config['token']},
+                until=parsed_args.until,
+                timeout=parsed_args.timeout,
+                start=start,
+                on_change=print_change if is_table else None)
+        except ApiError as exc:
+            print(exc, file=sys.stderr)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            sys.exit(130)
+
+        report = tracker.get_report()
+        if not is_table:
+            self.print_response({'deployment': response, 'rollout': report},
+                                parsed_args.output)
+        else:
+            self.print_rollout_report(deployment_name, report)
+
+        if report['result'] == 'failed':
+            sys.exit(self.EXIT_JOB_FAILED)
+        if report['result'] == 'timeout':
+            sys.exit(self.EXIT_TIMEOUT)
+
+    @staticmethod
+    def print_rollout_report(deployment_name: str, report: dict):
+        """
+        Print the result of the rollout and the timing of each robot
+        """
+        print()
+        if report['result'] == 'ready':
+            print(f"Deployment '{deployment_name}' is {report['until']}, "
+                  f"time to ready: {report['time_to_ready']:.1f}s")
+        elif report['result'] == 'failed':
+            print(f"Deployment '{deployment_name}' failed after {report['elapsed']:.1f}s")
+        else:
+            print(f"Deployment '{deployment_name}' is not {report['until']} "
+                  f"after {report['elapsed']:.1f}s (timeout)")
+        print()
+        with StreamingTable(['Robot Name', 'Job Phase', 'Ready After', 'Phases']) as table:
+            for job in report['jobs']:
+                table.add_row({
+                    'Robot Name': job['robot_name'],
+                    'Job Phase': job['phase'],
+                    'Ready After': (f"{job['ready_after']:.1f}s"
+                                    if job['ready_after'] is not None else '-'),
+                    'Phases': ' -> '.join(f"{item['phase']} ({item['after']:.1f}s)"
+                                          for item in job['phases']),
+                })
+
+    def rollout(self, *args):
+        """
+        Roll out deployments wave by wave, the fleets in parallel
+        Example: kuberos deploy rollout -f deployments/ --waves 1,10%,100%
+        """
+        parser = self.commands['rollout']
+        parsed_args = parser.parse_args(args)
+
+        if not parsed_args.file:
+            print('[Error] The manifest file is required: -f --file')
+            sys.exit(1)
+        try:
+            waves = parse_waves(parsed_args.waves)
+            documents = load_documents([parsed_args.file])
+        except (ValueError, ManifestLoadError) as exc:
+            print(exc)
+            sys.exit(1)
+        if not documents:
+            print(f'No manifest found in {parsed_args.file}')
+            sys.exit(1)
+        config = KuberosConfig.get_current_config()
+        is_table = parsed_args.output == 'table'
+        lock = threading.Lock()
+
+        def print_event(deployment_name, message):
+            if is_table:
+                with lock:
+                    print(f"[{time.strftime('%H:%M:%S')}] {deployment_name}: {message}",
+                          flush=True)
+
+        # deployments by fleet, in the order of the manifests
+        fleets = {}
+        names = set()
+        for document in documents:
+            document_name = get_document_name(document)
+            self.check_manifest(document.manifest, document_name,
+                                expected_kinds=['ApplicationDeployment'],
+                                skip=parsed_args.no_validate)
+            deployment_name = self.get_deployment_name(document.manifest, document_name)
+            if deployment_name in names:
+                print(f"Deployment '{deployment_name}' is defined twice")
+                sys.exit(1)
+            names.add(deployment_name)
+            manifest_path = None if document.path == '-' else document.path
+            # the files are read before any wave starts, but each deployment
+            # uploads them only before its own first wave
+            self.load_yaml_files_from_parammap(document.manifest, manifest_path=manifest_path)
+            try:
+                wave_rollout = WaveRollout(
+                    config, document.manifest,
+                    functools.partial(self.get_rosparam_yamls, document.manifest,
+                                      manifest_path=manifest_path, config=config),
+                    waves,
+                    until=parsed_args.until,
+                    timeout=parsed_args.timeout,
+                    on_event=print_event)
+            except ValueError as exc:
+                print(f'{document_name}: {exc}')
+                sys.exit(1)
+            fleets.setdefault(document.manifest['metadata'].get('targetFleet', None),
+                              []).append(wave_rollout)
+
+        def roll_out_fleet(rollouts):
+            # the next deployment of a fleet starts once the previous one is ready
+            for i, wave_rollout in enumerate(rollouts):
+                if wave_rollout.run() != 'ready':
+                    for skipped in rollouts[i + 1:]:
+                        skipped.result = 'skipped'
+                        skipped.message = f"'{wave_rollout.name}' is not {parsed_args.until}"
+                    return
+
+        start = time.monotonic()
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(parsed_args.parallel or len(fleets),
+                                                len(fleets))) as executor:
+            list(executor.map(roll_out_fleet, fleets.values()))
+        elapsed = time.monotonic() - start
+
+        records = [{
+            'name': wave_rollout.name,
+            'fleet': fleet,
+            'result': wave_rollout.result,
+            'waves': wave_rollout.num_skipped + wave_rollout.num_done,
+            'total_waves': wave_rollout.num_skipped + len(wave_rollout.waves),
+            'robots': wave_rollout.get_num_robots(),
+            'total_robots': len(wave_rollout.manifest['metadata'].get('targetRobots', None) or []),
+            'seconds': round(wave_rollout.elapsed, 3),
+            'message': wave_rollout.message,
+        } for fleet, rollouts in fleets.items() for wave_rollout in rollouts]
+
+        if not is_table:
+            write_records(records, parsed_args.output, name_field=self.NAME_FIELD)
+        else:
+            print()
+            with StreamingTable(['Deployment', 'Fleet', 'Result', 'Waves', 'Robots', 'Time',
+                                 'Message']) as table:
+                for record in records:
+                    table.add_row({
+                        'Deployment': record['name'],
+                        'Fleet': record['fleet'],
+                        'Result': record['result'],
+                        'Waves': f"{record['waves']}/{record['total_waves']}",
+                        'Robots': f"{record['robots']}/{record['total_robots']}",
+                        'Time': f"{record['seconds']:.1f}s",
+                        'Message': record['message'],
+                    })
+            num_ready = sum(1 for record in records if record['result'] == 'ready')
+            print(f'\n{num_ready} of {len(records)} deployments rolled out in {elapsed:.1f}s '
+                  f'({len(fleets)} fleets)')
+
+        results = {record['result'] for record in records}
+        if 'failed' in results:
+            sys.exit(self.EXIT_JOB_FAILED)
+        if 'timeout' in results:
+            sys.exit(self.EXIT_TIMEOUT)
+        if results != {'ready'}:
+            sys.exit(1)
+
+    def upgrade(self, *args):
+        """
+        Upgrade a deployment with only the changes to its last-applied manifest
+        Example: kuberos deploy upgrade -f deployment.yaml --dry-run
+        """
+        parser = self.commands['upgrade']
+        parsed_args = parser.parse_args(args)
+        config = KuberosConfig.get_current_config()
+
+        try:
+            with open(parsed_args.file, "r", encoding="utf-8") as yaml_file:
+                deploy_content = yaml.safe_load(yaml_file)
+        except FileNotFoundError:
+            print(f'Deployment description file: {parsed_args.file} not found.')
+            sys.exit(1)
+        self.check_manifest(deploy_content, parsed_args.file,
+                            expected_kinds=['ApplicationDeployment'],
+                            skip=parsed_args.no_validate)
+
+        deployment_name = self.get_deployment_name(deploy_content, parsed_args.file)
+        last_applied = LastApplied.load(config['name'], deployment_name)
+        if last_applied is None:
+            print(f"[Error] No last-applied manifest of deployment '{deployment_name}' "
+                  f"in context '{config['name']}', it was not created from this machine.")
+            sys.exit(1)
+
+        loader = ParamFileLoader()
+        try:
+            param_files = loader.load(deploy_content, manifest_path=parsed_args.file)
+        except ParamFileError as exc:
+            print(exc)
+            sys.exit(1)
+        param_digests = {param_file.name: param_file.digest for param_file in param_files}
+        diff = DeploymentDiff(last_applied['manifest'], deploy_content,
+                              last_applied['param_digests'], param_digests)
+
+        if parsed_args.output == 'table':
+            self.print_upgrade_plan(deployment_name, diff)
+        elif parsed_args.dry_run or not diff.has_changes():
+            self.print_response({'plan': diff.get_plan()}, parsed_args.output)
+        if parsed_args.dry_run or not diff.has_changes():
+            return
+
+        changed_params = set(diff.get_changed_params())
+        uploader = ParamBlobUploader(config['server'], config['token'],
+                                     cache_dir=loader.cache_dir)
+        rosparam_yamls = uploader.get_rosparam_yamls(
+            [param_file for param_file in param_files if param_file.name in changed_params])
+        _, response = self.call_api(
+            'PATCH',
+            f"{config['server']}/{Endpoints.DEPLOYING}{deployment_name}/",
+            json_data=diff.get_patch(rosparam_yamls),
+            auth_token=config['token'])
+
+        if response.get('status', None) == 'success':
+            LastApplied.save(config['name'], deploy_content, param_digests)
+        if parsed_args.output == 'table':
+            self.print_response(response, parsed_args.output)
+        else:
+            self.print_response({'plan': diff.get_plan(), 'deployment': response},
+                                parsed_args.output)
+        if response.get('status', None) != 'success':
+            sys.exit(1)
+
+    @staticmethod
+    def print_upgrade_plan(deployment_name: str, diff: DeploymentDiff):
+        """
+        Print the changes of the upgrade, + added, ~ changed, - removed
+        """
+        if not diff.has_changes():
+            print(f"Deployment '{deployment_name}' is up to date, no changes to upgrade.")
+            return
+
+        def format_change(path, old, new):
+            if new is None:
+                return f'- {path}: {old}'
+            if old is None:
+                return f'+ {path}: {new}'
+            return f'~ {path}: {old} -> {new}'
+
+        print(f"Upgrade plan of deployment '{deployment_name}':")
+        for change in diff.metadata:
+            print(f'  {format_change(*change)}')
+        for kind, added, changes, removed in (
+                ('rosModules', diff.added_modules, diff.module_changes, diff.removed_modules),
+                ('rosParamMap', diff.added_params, diff.param_changes, diff.removed_params)):
+            for name in added:
+                print(f'  + {kind}/{name}')
+            for name, module_changes in changes.items():
+                print(f'  ~ {kind}/{name}')
+                for change in module_changes:
+                    print(f'      {format_change(*change)}')
+            for name in removed:
+                print(f'  - {kind}/{name}')
+        for section in diff.sections:
+            print(f'  ~ {section}')
+
+        restarted = diff.get_restarted_modules()
+        num_modules = len(diff.new.get('rosModules', None) or [])
+        print(f'\n{len(restarted)} of {num_modules} modules restarted'
+              f"{': ' + ', '.join(restarted) if restarted else ''}, "
+              f'{len(diff.added_modules)} added, {len(diff.removed_modules)} removed')
 
     def info(self, *args):
         """
@@ -177,102 +709,251 @@ class DeployCommandGroup(CommandGroupBase):
         parser = self.commands['info']
         parsed_args = parser.parse_args(args)
 
+        contexts = self.get_target_contexts(parsed_args)
+        if parsed_args.watch:
+            if contexts is not None or parsed_args.output != 'table':
+                print('[Error] --watch supports the table output of a single context only')
+                sys.exit(1)
+            self.watch(parsed_args.deployment_name, parsed_args.interval)
+            return
+
+        if contexts is not None:
+            self.info_in_contexts(contexts,
+                                  f"{Endpoints.DEPLOYMENT}{parsed_args.deployment_name}/",
+                                  self.print_deployment_info,
+                                  output_format=parsed_args.output)
+            return
+
         config = KuberosConfig.get_current_config()
         resource_url = f"{config['server']}/{Endpoints.DEPLOYMENT}{parsed_args.deployment_name}/"
-        success, res = self.call_api('GET',
-                                     resource_url,
-                                     auth_token=config['token'])
-        if res['status'] == 'success':
-
-            data = res['data']
-
-            # meta info
-            print(f"Deployment Name: {data['name']}")
-            print(f"Status: {data['status']}")
-            print(f"Fleet: {data['fleet_name']}")
-            print(f"Running Since: {data['running_since']}")
-
-            # dep jobs summary
-            num_of_single_dash = 60
-            print('Deployment Jobs Summary')
-            print('-' * num_of_single_dash)
-            dep_job_set = data['deployment_job_set']
-            data_to_display = [{
+        if parsed_args.output == 'table':
+            # the jobs are rendered while the response is received
+            success, res = self.stream_api('GET',
+                                           resource_url,
+                                           ['data', 'deployment_job_set'],
+                                           auth_token=config['token'])
+        else:
+            success, res = self.call_api('GET',
+                                         resource_url,
+                                         auth_token=config['token'])
+        with self.stream_errors():
+            if res['status'] == 'success' and parsed_args.output != 'table':
+                self.print_response(res['data'], parsed_args.output)
+            elif res['status'] == 'success':
+                with open_pager(enabled=not parsed_args.no_pager) as stream:
+                    self.print_deployment_info(res['data'], stream=stream)
+            else:
+                print(res)
+
+    def watch(self, deployment_name: str, interval: float):
+        """
+        Poll the deployment and redraw the jobs whose phase or pod/service status changed.
+        Polls every interval while the jobs are changing, backs off once they are stable.
+        Example: kuberos deploy info <deployment_name> --watch
+        """
+        config = KuberosConfig.get_current_config()
+        poller = ConditionalPoller(f"{config['server']}/{Endpoints.DEPLOYMENT}{deployment_name}/",
+                                   headers={'Authorization': 'Token ' + config['token']},
+                                   min_interval=interval,
+                                   max_interval=self.WATCH_MAX_INTERVAL)
+        view = LiveView()
+        data = None
+        try:
+            while True:
+                error = ''
+                try:
+                    changed, response = poller.poll()
+                except ApiError as exc:
+                    if exc.status_code is not None:
+                        # e.g. the deployment was deleted or the token expired
+                        print(exc)
+                        sys.exit(1)
+                    changed, error = False, f'  {exc}'
+
+                if changed:
+                    if response['status'] != 'success':
+                        print(response)
+                        sys.exit(1)
+                    data = response['data']
+
+                next_interval = poller.next_interval(
+                    changed or data is None or self.is_transitioning(data))
+                status = (f"Updated {time.strftime('%H:%M:%S')}, next in {next_interval:.1f}s, "
+                          f"{poller.num_requests} requests, "
+                          f"{poller.bytes_received / 1024:.1f} KiB received{error}")
+                if data is not None:
+                    view.update(self.get_watch_lines(data, view), status)
+                time.sleep(next_interval)
+
+        except KeyboardInterrupt:
+            pass
+
+    @classmethod
+    def is_transitioning(cls, data: dict) -> bool:
+        """
+        Check if any job of the deployment or any of its pods is not in a stable phase
+        """
+        for job in data['deployment_job_set']:
+            if str(job['job_phase']).lower() not in cls.STABLE_PHASES:
+                return True
+            for pod in job['all_pods_status']:
+                if str(pod.get('status', '')).lower() not in cls.STABLE_PHASES:
+                    return True
+        return False
+
+    @staticmethod
+    def get_watch_lines(data: dict, view: LiveView) -> list:
+        """
+        Get the output lines of the watched deployment, one line per job
+        """
+        lines = [
+            f"Deployment Name: {data['name']}",
+            f"Status: {data['status']}",
+            f"Fleet: {data['fleet_name']}",
+            f"Running Since: {data['running_since']}",
+            '',
+        ]
+        rows = []
+        for job in data['deployment_job_set']:
+            pod_status = {}
+            for pod in job['all_pods_status']:
+                status = pod.get('status', 'N/A')
+                pod_status[status] = pod_status.get(status, 0) + 1
+            rows.append({
                 'Robot Name': job['robot_name'],
                 'Job Phase': job['job_phase'],
                 'Pods': len(job['all_pods_status']),
                 'Services': len(job['all_svcs_status']),
-            } for job in dep_job_set]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-
-            # detailed job status
-            print('\n')
-            i = 0
-            for job in dep_job_set:
-                i += 1
-                print(f"Deployment Job Nr. {i}")
-                print(f"Robot Name: {job['robot_name']}")
-                print(f"Job Phase: {job['job_phase']}")
-                print('-' * num_of_single_dash)
-
-                data_to_display = [{
-                    'Resource Name': pod['name'],
-                    'Type': 'Pod',
-                    'Status': pod.get('status', 'N/A'),
-                } for pod in job['all_pods_status']]
-                data_to_display += [{
-                    'Resource Name': svc['name'],
-                    'Type': 'Service',
-                    'Status': svc.get('status', 'N/A'),
-                } for svc in job['all_svcs_status']]
-
-                table = tabulate(
-                    data_to_display, headers="keys", tablefmt='plain')
-                print(table)
+                'Pod Status': ' '.join(f'{status}:{num}' for status, num in pod_status.items()),
+                'Service Status': ' '.join(sorted({str(svc.get('status', 'N/A'))
+                                                   for svc in job['all_svcs_status']})),
+            })
+        return lines + view.format_table(
+            'jobs',
+            ['Robot Name', 'Job Phase', 'Pods', 'Services', 'Pod Status', 'Service Status'],
+            rows)
 
-        else:
-            print(res)
+    @staticmethod
+    def print_deployment_info(data: dict, stream=None):
+        """
+        Print the deployment status and the status of its deployment jobs.
+
+        The jobs are rendered in a single pass: the summary table is streamed
+        to the output, the detailed job status is rendered into a deferred
+        buffer and printed afterwards.
 
-    def list(self):
+        Args:
+            data (dict): deployment data, 'deployment_job_set' can be any iterable
+            stream (file, optional): defaults to sys.stdout
+        """
+        if stream is None:
+            stream = sys.stdout
+        # meta info
+        stream.write(f"Deployment Name: {data['name']}\n")
+        stream.write(f"Status: {data['status']}\n")
+        stream.write(f"Fleet: {data['fleet_name']}\n")
+        stream.write(f"Running Since: {data['running_since']}\n")
+
+        # dep jobs summary
+        num_of_single_dash = 60
+        stream.write('Deployment Jobs Summary\n')
+        stream.write('-' * num_of_single_dash + '\n')
+        summary = StreamingTable(['Robot Name', 'Job Phase', 'Pods', 'Services'],
+                                 stream=stream)
+
+        # detailed job status
+        details = deferred_section()
+        details.write('\n\n')
+        i = 0
+        for job in data['deployment_job_set']:
+            i += 1
+            summary.add_row({
+                'Robot Name': job['robot_name'],
+                'Job Phase': job['job_phase'],
+                'Pods': len(job['all_pods_status']),
+                'Services': len(job['all_svcs_status']),
+            })
+
+            details.write(f"Deployment Job Nr. {i}\n")
+            details.write(f"Robot Name: {job['robot_name']}\n")
+            details.write(f"Job Phase: {job['job_phase']}\n")
+            details.write('-' * num_of_single_dash + '\n')
+            with StreamingTable(['Resource Name', 'Type', 'Status'], stream=details) as table:
+                for pod in job['all_pods_status']:
+                    table.add_row({
+                        'Resource Name': pod['name'],
+                        'Type': 'Pod',
+                        'Status': pod.get('status', 'N/A'),
+                    })
+                for svc in job['all_svcs_status']:
+                    table.add_row({
+                        'Resource Name': svc['name'],
+                        'Type': 'Service',
+                        'Status': svc.get('status', 'N/A'),
+                    })
+
+        summary.close()
+        write_deferred_section(details, stream)
+
+    def list(self, *args):
         """
         List all deployments
         Example: kuberos cluster list
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is not None:
+            self.list_in_contexts(contexts, Endpoints.DEPLOYMENT, self.get_list_rows,
+                                  output_format=parsed_args.output,
+                                  page_size=parsed_args.page_size,
+                                  limit=parsed_args.limit)
+            return
+
         config = KuberosConfig.get_current_config()
-        _, response = self.call_api('GET',
-                                    f"{config['server']}/{Endpoints.DEPLOYMENT}",
-                                    auth_token=config['token'])
-        if response['status'] == 'success':
-            data = response['data']
-            data_to_display = [{
-                'name': item['name'],
-                'status': item['status'],
-                'fleet': item['fleet_name'],
-                'running_since': item['running_since'],
-            } for item in data]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print('[Error] Failed to list clusters')
+        self.list_resources(f"{config['server']}/{Endpoints.DEPLOYMENT}",
+                            config['token'],
+                            self.get_list_rows,
+                            parsed_args)
+
+    @staticmethod
+    def get_list_rows(data: list) -> list:
+        """
+        Convert the deployment list to table rows
+        """
+        return [{
+            'name': item['name'],
+            'status': item['status'],
+            'fleet': item['fleet_name'],
+            'running_since': item['running_since'],
+        } for item in data]
 
     def delete(self, *args):
         """
-        Delete the cluster by cluster name
+        Delete one or more deployments by deployment name
         """
         parser = self.commands['delete']
         parsed_args = parser.parse_args(args)
         config = KuberosConfig.get_current_config()
-        url = f"{config['server']}/{Endpoints.DEPLOYING}{parsed_args.deployment_name}/"
-
-        success, response = self.call_api('DELETE',
-                                          url,
-                                          auth_token=config['token'])
-        if success:
-            print(response)
-            # print(f"Successfully delete cluster: {parsed_args.deployment_name}")
-        else:
-            print('[Error] Failed to delete cluster')
+
+        calls = [ApiCall(deployment_name,
+                         'DELETE',
+                         f"{config['server']}/{Endpoints.DEPLOYING}{deployment_name}/",
+                         None)
+                 for deployment_name in parsed_args.deployment_name]
+        results = self.call_api_bulk(calls,
+                                     concurrency=parsed_args.parallel,
+                                     auth_token=config['token'])
+        for res in results:
+            if res.success:
+                self.print_response(res.data, parsed_args.output)
+                if not isinstance(res.data, dict) or res.data.get('status', 'success') == 'success':
+                    LastApplied.delete(config['name'], res.key)
+
+        error_stream = sys.stderr if parsed_args.output != 'table' else None
+        if self.print_bulk_errors(results, stream=error_stream) > 0:
+            sys.exit(1)
 
     def print_help(self):
         """
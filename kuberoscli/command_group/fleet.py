@@ -8,6 +8,8 @@ from tabulate import tabulate
 
 from ..endpoints import Endpoints
 from ..kuberos_config import KuberosConfig
+from ..transport import ApiCall
+from ..output import write_records
 from .base import CommandGroupBase, KubeROSBaseCompleter
 
 
@@ -17,13 +19,22 @@ KubeROS CLI [fleet] command group
 Usage:
     kuberos fleet <command> [fleet_name] [-args]
     
+    All commands accept -o --output: table (default), wide, name, json, jsonl, yaml, csv
+    
 Commands:
     create       Build a new fleet (Fleet name must be unique)
                  -f --file: manifest file path
+                 --no-validate: don't validate the manifest before sending it
     
     list         List all fleets
+                 --limit: max. number of listed resources
+                 --page-size: number of resources requested per page
+                 -A --all-contexts: list the fleets of all contexts
+                 --contexts: list the fleets of the given contexts (ctx-1,ctx-2)
     
-    info         Get a fleet by name
+    info         Get one or more fleets by name
+                 -p --parallel: max. number of concurrent requests
+                 -A --all-contexts / --contexts: query several contexts
     
     delete       Remove a fleet from Kuberos (remove all kuberos labels)
     
@@ -36,9 +47,7 @@ class FleetCompleter(KubeROSBaseCompleter):
     Get the list of cluster names from the API server or cached data
     """
 
-    def get_data_for_completion(self):
-        _, data = self.call_api()
-        return [item['fleet_name'] for item in data]
+    NAME_FIELD = 'fleet_name'
 
 
 class FleetCommandGroup(CommandGroupBase):
@@ -50,10 +59,13 @@ class FleetCommandGroup(CommandGroupBase):
 
     RESOURCE_URL = 'api/v1/fleet/fleets_name_list'
 
+    NAME_FIELD = 'fleet_name'
+
     def __init__(self, subparsers) -> None:
         super().__init__(subparsers, 'fleet')
 
         self.init_subcommand_create()
+        self.init_subcommand_list()
         self.init_subcommand_info()
         self.init_subcommand_delete()
 
@@ -65,15 +77,30 @@ class FleetCommandGroup(CommandGroupBase):
         parser = self.commands['create']
         parser.add_argument(
             '-f', '--file', help='File path of fleet manifest')
+        self.add_validation_argument(parser)
+
+    def init_subcommand_list(self):
+        """
+        Initialize the subcommand <list>
+        """
+        parser = self.commands['list']
+        self.add_context_arguments(parser)
+        self.add_page_arguments(parser)
 
     def init_subcommand_info(self):
         """
         Initialize the subcommand <info>
         """
         parser = self.commands['info']
-        parser.add_argument('fleet_name', help="Fleet name").completer = FleetCompleter(
-            resource_url=self.RESOURCE_URL
-        )
+        parser.add_argument('fleet_name',
+                            nargs='+',
+                            help="Fleet name(s)").completer = FleetCompleter(
+                                resource_url=self.RESOURCE_URL)
+        parser.add_argument('-p', '--parallel',
+                            type=int,
+                            default=None,
+                            help='Max. number of fleets requested concurrently')
+        self.add_context_arguments(parser)
 
     def init_subcommand_delete(self):
         """
@@ -97,8 +124,12 @@ class FleetCommandGroup(CommandGroupBase):
         url = f"{config['server']}/{Endpoints.FLEET}"
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
+                if not parsed_args.no_validate:
+                    self.check_manifest(yaml.safe_load(file), file_path,
+                                        expected_kinds=['Fleet'])
+                    file.seek(0)
                 files = {'fleet_manifest': file}
-                success, _ = self.call_api(
+                success, res = self.call_api(
                     'POST',
                     url,
                     files=files,
@@ -107,7 +138,9 @@ class FleetCommandGroup(CommandGroupBase):
                     },
                     auth_token=config['token'],
                 )
-                if success:
+                if success and parsed_args.output != 'table':
+                    self.print_response(res, parsed_args.output)
+                elif success:
                     print("Successfully create fleet")
                 else:
                     print('ERROR')
@@ -143,65 +176,112 @@ class FleetCommandGroup(CommandGroupBase):
 
     def info(self, *args):
         """
-        Retrieve the status of a cluster by cluster name
-        Example: kuberos cluster info <cluster_name>
+        Retrieve the status of one or more fleets by fleet name
+        Example: kuberos fleet info <fleet_name> [<fleet_name> ...]
         """
         parser = self.commands['info']
         parsed_args = parser.parse_args(args)
 
-        config = KuberosConfig.get_current_config()
-        cluster_url = f"{config['server']}/{Endpoints.FLEET}{parsed_args.fleet_name}/"
-        success, response = self.call_api('GET',
-                                          cluster_url,
-                                          auth_token=config['token'],
-                                          )
-        if success and response['status'] == 'success':
-            data = response['data']
-            print(f"Fleet Name: {data['fleet_name']}")
-            print(f"Healthy: {data['is_entire_fleet_healthy']}")
-            print(f"Fleet status: {data['fleet_status']}")
-            print(f"Alive Age: {data['alive_age']}")
-            print(f"Main Cluster: {data['k8s_main_cluster_name']}")
-            print(f"Description: {data['description']}")
-            print(f"Created since: {data['created_since']}")
-            print('='*40)
-            data_to_display = [{
-                    'Robot Name': item['robot_name'],
-                    'Id': item['robot_id'],
-                    'Hostname': item['cluster_node_name'],
-                    'Computer Group': item['onboard_comp_group'],
-                    'Reachable': item['is_fleet_node_alive'],
-                    'Status': item['status'],
-                    'Shared Resource': item['shared_resource'],
-                } for item in data['fleet_node_set']]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print("ERROR")
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is None:
+            contexts = [KuberosConfig.get_current_config()]
+
+        calls = [ApiCall((ctx['name'], fleet_name),
+                         'GET',
+                         f"{ctx['server']}/{Endpoints.FLEET}{fleet_name}/",
+                         self._with_auth_header(None, ctx['token']))
+                 for ctx in contexts
+                 for fleet_name in parsed_args.fleet_name]
+        results = self.call_api_bulk(calls,
+                                     concurrency=parsed_args.parallel)
+
+        fleets = []
+        for res in results:
+            ctx_name, fleet_name = res.key
+            if res.success and res.data['status'] == 'success':
+                if parsed_args.output != 'table':
+                    fleets.append({'context': ctx_name, **res.data['data']}
+                                  if len(contexts) > 1 else res.data['data'])
+                    continue
+                if len(contexts) > 1:
+                    print(f'Context: {ctx_name}')
+                self.print_fleet_info(res.data['data'])
+                print('\n')
+            elif res.success:
+                print(f"[Error] Failed to get fleet: {fleet_name}", file=sys.stderr)
+                print(res.data, file=sys.stderr)
+
+        if parsed_args.output != 'table':
+            if len(calls) == 1 and fleets:
+                self.print_response(fleets[0], parsed_args.output)
+            else:
+                write_records(fleets, parsed_args.output, name_field=self.NAME_FIELD)
+
+        results = [res._replace(key='/'.join(res.key)) for res in results]
+        error_stream = sys.stderr if parsed_args.output != 'table' else None
+        if self.print_bulk_errors(results, stream=error_stream) > 0:
+            sys.exit(1)
 
-    def list(self):
+    @staticmethod
+    def print_fleet_info(data: dict):
+        """
+        Print the status of a fleet and its robots
+        """
+        print(f"Fleet Name: {data['fleet_name']}")
+        print(f"Healthy: {data['is_entire_fleet_healthy']}")
+        print(f"Fleet status: {data['fleet_status']}")
+        print(f"Alive Age: {data['alive_age']}")
+        print(f"Main Cluster: {data['k8s_main_cluster_name']}")
+        print(f"Description: {data['description']}")
+        print(f"Created since: {data['created_since']}")
+        print('='*40)
+        data_to_display = [{
+                'Robot Name': item['robot_name'],
+                'Id': item['robot_id'],
+                'Hostname': item['cluster_node_name'],
+                'Computer Group': item['onboard_comp_group'],
+                'Reachable': item['is_fleet_node_alive'],
+                'Status': item['status'],
+                'Shared Resource': item['shared_resource'],
+            } for item in data['fleet_node_set']]
+        table = tabulate(data_to_display, headers="keys", tablefmt='plain')
+        print(table)
+
+    def list(self, *args):
         """
         List all clusters that the user has access to
         Example: kuberos cluster list
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
+        contexts = self.get_target_contexts(parsed_args)
+        if contexts is not None:
+            self.list_in_contexts(contexts, Endpoints.FLEET, self.get_list_rows,
+                                  output_format=parsed_args.output,
+                                  page_size=parsed_args.page_size,
+                                  limit=parsed_args.limit)
+            return
+
         config = KuberosConfig.get_current_config()
-        success, response = self.call_api('GET',
-                                          f"{config['server']}/{Endpoints.FLEET}",
-                                          auth_token=config['token'])
-        if success:
-            data = response['data']
-            data_to_display = [{
-                'Name': item['fleet_name'],
-                'Status': item['fleet_status'],
-                'Alive Age': item['alive_age'],
-                'Healthy': item['is_entire_fleet_healthy'],
-                'Main Cluster': item['k8s_main_cluster_name'],
-                'Created since': item['created_since'],
-            } for item in data]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print('error')
+        self.list_resources(f"{config['server']}/{Endpoints.FLEET}",
+                            config['token'],
+                            self.get_list_rows,
+                            parsed_args)
+
+    @staticmethod
+    def get_list_rows(data: list) -> list:
+        """
+        Convert the fleet list to table rows
+        """
+        return [{
+            'Name': item['fleet_name'],
+            'Status': item['fleet_status'],
+            'Alive Age': item['alive_age'],
+            'Healthy': item['is_entire_fleet_healthy'],
+            'Main Cluster': item['k8s_main_cluster_name'],
+            'Created since': item['created_since'],
+        } for item in data]
 
 
     def delete(self, *args):
@@ -216,7 +296,9 @@ class FleetCommandGroup(CommandGroupBase):
         success, response = self.call_api('DELETE',
                                           url,
                                           auth_token=config['token'])
-        if success:
+        if success and parsed_args.output != 'table':
+            self.print_response(response, parsed_args.output)
+        elif success:
             print(response)
             print(f"Successfully delete cluster: {parsed_args.fleet_name}")
         else:
@@ -0,0 +1,133 @@
+"""
+Command group Lint
+"""
+
+import sys
+import json
+
+from ..manifest_validation import format_diagnostic, ERROR, WARNING, SUPPORTED_KINDS
+from ..manifest_lint import ManifestLinter
+from .base import CommandGroupBase
+
+
+LINT_HELP = f'''
+KubeROS CLI [lint] command
+
+Usage:
+    kuberos lint <path> [<path> ...] [-args]
+
+    Validate manifests offline, without calling the API server.
+    Supported kinds: {', '.join(SUPPORTED_KINDS)}
+
+    A path is a manifest file, a directory (searched recursively) or a glob
+    pattern ('deployments/**/*.yaml'). In directories and glob patterns, only
+    yaml files of a supported kind are validated.
+
+    -o --output: table (default), json, jsonl
+                 table: <file>: <severity>: <field path>: <message> [<code>]
+                 json:  one object with the diagnostics grouped by file
+                 jsonl: one object per diagnostic
+    -j --jobs:   number of worker processes (default: number of CPUs)
+    --no-cache:  validate all files, don't use the results of unchanged files
+
+    Exits with 1 if any manifest has errors or a path matches no file.
+'''
+
+
+class LintCommandGroup(CommandGroupBase):
+    """
+    Command [lint], validates manifest files offline.
+    It has no subcommands, the arguments are the manifest paths.
+    """
+
+    OUTPUT_FORMATS = ['table', 'json', 'jsonl']
+
+    def __init__(self, subparsers) -> None:  # pylint: disable=super-init-not-called
+        self.parser = subparsers.add_parser('lint',
+                                            help="Validate manifests offline")
+        # optional for the parser, the command line dispatcher parses
+        # the group name alone
+        self.parser.add_argument('paths',
+                                 nargs='*',
+                                 help='Manifest files, directories or glob patterns')
+        self.parser.add_argument('-o', '--output',
+                                 choices=self.OUTPUT_FORMATS,
+                                 default='table',
+                                 help='Output format (default: table)')
+        self.parser.add_argument('-j', '--jobs',
+                                 type=int,
+                                 default=None,
+                                 help='Number of worker processes (default: number of CPUs)')
+        self.parser.add_argument('--no-cache', action='store_true',
+                                 help='Validate all files again')
+        self.commands = {}
+
+    def run(self, *args):
+        """
+        Validate the manifests
+        """
+        if len(args) == 0:
+            self.print_help()
+            return
+        parsed_args = self.parser.parse_args(args)
+        if not parsed_args.paths:
+            self.print_help()
+            return
+
+        linter = ManifestLinter(jobs=parsed_args.jobs,
+                                cache_path='' if parsed_args.no_cache else None)
+        results, missing = linter.lint(parsed_args.paths)
+        for path in missing:
+            print(f'{path}: no such file or directory', file=sys.stderr)
+
+        num_errors = sum(1 for _, diagnostics in results
+                         for diagnostic in diagnostics if diagnostic.severity == ERROR)
+        num_warnings = sum(1 for _, diagnostics in results
+                           for diagnostic in diagnostics if diagnostic.severity == WARNING)
+
+        if parsed_args.output == 'json':
+            self.print_json(results, num_errors, num_warnings)
+        elif parsed_args.output == 'jsonl':
+            for path, diagnostics in results:
+                for diagnostic in diagnostics:
+                    sys.stdout.write(json.dumps(dict(diagnostic._asdict(), file=path)) + '\n')
+        else:
+            for path, diagnostics in results:
+                for diagnostic in diagnostics:
+                    sys.stdout.write(format_diagnostic(path, diagnostic) + '\n')
+            print(f'{len(results)} manifest(s) checked ({linter.num_cached} unchanged), '
+                  f'{num_errors} error(s), {num_warnings} warning(s)')
+        sys.stdout.flush()
+
+        if num_errors > 0 or missing:
+            sys.exit(1)
+
+    @staticmethod
+    def print_json(results: list, num_errors: int, num_warnings: int):
+        """
+        Print the diagnostics grouped by file as one json object
+        """
+        files = []
+        for path, diagnostics in results:
+            files.append({
+                'file': path,
+                'errors': sum(1 for diagnostic in diagnostics if diagnostic.severity == ERROR),
+                'warnings': sum(1 for diagnostic in diagnostics
+                                if diagnostic.severity == WARNING),
+                'diagnostics': [diagnostic._asdict() for diagnostic in diagnostics],
+            })
+        json.dump({
+            'files': files,
+            'summary': {
+                'files': len(results),
+                'errors': num_errors,
+                'warnings': num_warnings,
+            },
+        }, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    def print_help(self):
+        """
+        Print help message
+        """
+        print(LINT_HELP)
@@ -4,7 +4,6 @@ Command group Container Registry
 
 import sys
 import yaml
-from tabulate import tabulate
 
 from ..endpoints import Endpoints
 from ..kuberos_config import KuberosConfig
@@ -18,9 +17,12 @@ KubeROS CLI [registry] command group
 Usage:
     kuberos registry <command> [token_name] [-args]
     
+    All commands accept -o --output: table (default), wide, name, json, jsonl, yaml, csv
+    
 Commands:
     create       Add a new registry token (name must be unique)
                  -f --file: manifest file path
+                 --no-validate: don't validate the manifest before sending it
     
     attach       Attach a registry token to a cluster
                  token_name (Positional required): name of the token
@@ -28,6 +30,8 @@ Commands:
                  -n --namespace (Optional): namespace of the cluster, default: ros-default
     
     list         List all container registries and token
+                 --limit: max. number of listed resources
+                 --page-size: number of resources requested per page
     
     info         Get the info of a container registry
     
@@ -40,10 +44,6 @@ class RegistryTokenCompleter(KubeROSBaseCompleter):
     Get the list of cluster names from the API server or cached data
     """
 
-    def get_data_for_completion(self):
-        _, data = self.call_api()
-        return [item['name'] for item in data]
-
 
 class RegistryCommandGroup(CommandGroupBase):
     """
@@ -58,6 +58,7 @@ class RegistryCommandGroup(CommandGroupBase):
         super().__init__(subparsers, 'registry')
 
         self.init_subcommand_create()
+        self.init_subcommand_list()
         self.init_subcommand_attach()
         self.init_subcommand_info()
         self.init_subcommand_delete()
@@ -71,6 +72,14 @@ class RegistryCommandGroup(CommandGroupBase):
             '-f', '--file',
             required=True,
             help='Path of the registry token yaml file')
+        self.add_validation_argument(parser)
+
+    def init_subcommand_list(self):
+        """
+        Initialize the subcommand <list>
+        """
+        parser = self.commands['list']
+        self.add_page_arguments(parser)
 
     def init_subcommand_attach(self):
         """
@@ -121,6 +130,9 @@ class RegistryCommandGroup(CommandGroupBase):
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 registry_token = yaml.safe_load(file)
+                self.check_manifest(registry_token, file_path,
+                                    expected_kinds=['RegistryToken'],
+                                    skip=parsed_args.no_validate)
                 meta_data = registry_token['metadata']
                 success, res = self.call_api(
                     'POST',
@@ -134,7 +146,9 @@ class RegistryCommandGroup(CommandGroupBase):
                     },
                     auth_token=config['token'],
                 )
-                if success:
+                if success and parsed_args.output != 'table':
+                    self.print_response(res, parsed_args.output)
+                elif success:
                     print("Successfully added new registry token")
                     print(res)
                 else:
@@ -166,7 +180,7 @@ class RegistryCommandGroup(CommandGroupBase):
             auth_token=config['token'],
         )
         if success:
-            print(response)
+            self.print_response(response, parsed_args.output)
         else:
             print('ERROR')
             print(response)
@@ -186,7 +200,9 @@ class RegistryCommandGroup(CommandGroupBase):
                                           auth_token=config['token'],
                                           )
 
-        if success and response['status'] == 'success':
+        if success and response['status'] == 'success' and parsed_args.output != 'table':
+            self.print_response(response['data'], parsed_args.output)
+        elif success and response['status'] == 'success':
             data = response['data']
             print(f"Name: {data['name']}")
             print(f"Registry: {data['registry_url']}")
@@ -195,29 +211,32 @@ class RegistryCommandGroup(CommandGroupBase):
         else:
             print("ERROR")
 
-    def list(self):
+    def list(self, *args):
         """
         List all registry tokens that managed by KubeROS
         Example: kuberos registry list
         """
+        parser = self.commands['list']
+        parsed_args = parser.parse_args(args)
+
         config = KuberosConfig.get_current_config()
-        success, response = self.call_api('GET',
-                                          f"{config['server']}/{Endpoints.REGISTRY_TOKEN}",
-                                          auth_token=config['token'])
-        if success:
-            data = response['data']
-            data_to_display = [{
-                'name': item['name'],
-                'uuid': item['uuid'],
-                'user name': item['user_name'],
-                'registry': item['registry_url'],
-                # 'description': item['description'],
-            } for item in data]
-            table = tabulate(data_to_display, headers="keys", tablefmt='plain')
-            print(table)
-        else:
-            print('error')
-            print(response)
+        self.list_resources(f"{config['server']}/{Endpoints.REGISTRY_TOKEN}",
+                            config['token'],
+                            self.get_list_rows,
+                            parsed_args)
+
+    @staticmethod
+    def get_list_rows(data: list) -> list:
+        """
+        Convert the registry token list to table rows
+        """
+        return [{
+            'name': item['name'],
+            'uuid': item['uuid'],
+            'user name': item['user_name'],
+            'registry': item['registry_url'],
+            # 'description': item['description'],
+        } for item in data]
 
     def delete(self, *args):
         """
@@ -231,7 +250,9 @@ class RegistryCommandGroup(CommandGroupBase):
         success, response = self.call_api('DELETE',
                                           url,
                                           auth_token=config['token'])
-        if success:
+        if success and parsed_args.output != 'table':
+            self.print_response(response, parsed_args.output)
+        elif success:
             print(response)
             print(
                 f"Successfully delete registry token: {parsed_args.token_name}")
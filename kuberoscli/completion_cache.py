@@ -0,0 +1,192 @@
+"""
+On-disk cache of resource names for the autocompletion
+
+Names are cached per context and resource url. Fresh entries are served
+directly, stale entries are served immediately and refreshed by a detached
+background process:
+
+    python -m kuberoscli.completion_cache <context> <resource_url> <name_field>
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+from .kuberos_config import KuberosConfig
+from .transport import KuberosTransport, ApiError
+from .pagination import Paginator
+
+
+class CompletionCache:
+    """
+    Completion cache stored as a json file next to the config file
+    Default path: ~/.kuberos/cache/completion.json
+    """
+
+    # seconds an entry is served without refresh
+    TTL = 60
+    # seconds a stale entry is still served while it is refreshed
+    MAX_STALE = 24 * 3600
+    # max. number of cached (context, resource) entries, least recently used are evicted
+    MAX_ENTRIES = 64
+
+    def __init__(self, cache_path: str = None) -> None:
+        if cache_path is None:
+            cache_path = self.get_cache_path()
+        self.cache_path = cache_path
+        self._data = None
+
+    @staticmethod
+    def get_cache_path() -> str:
+        """
+        Get the path of the cache file
+        """
+        config_dir = os.path.dirname(KuberosConfig.get_config_path())
+        return os.path.join(config_dir, 'cache', 'completion.json')
+
+    @staticmethod
+    def get_key(context: str, resource_url: str) -> str:
+        """
+        Key of a cache entry
+        """
+        return f'{context}|{resource_url}'
+
+    def load(self) -> dict:
+        """
+        Load the cache file, an invalid or missing file is an empty cache
+        """
+        if self._data is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as file:
+                    self._data = json.load(file)
+            except (OSError, ValueError):
+                self._data = {}
+            self._data.setdefault('entries', {})
+        return self._data
+
+    def save(self):
+        """
+        Evict the least recently used entries and write the cache file atomically
+        """
+        data = self.load()
+        entries = data['entries']
+        if len(entries) > self.MAX_ENTRIES:
+            lru_keys = sorted(entries, key=lambda key: entries[key]['used'])
+            for key in lru_keys[:len(entries) - self.MAX_ENTRIES]:
+                del entries[key]
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # the cache is optional, completion works without it
+            pass
+
+    def get_current_context(self) -> str:
+        """
+        Get the name of the current context.
+        The name is cached together with the mtime and size of the config file,
+        so a warm cache does not need to parse the config file.
+        """
+        override = KuberosConfig.get_context_override()
+        if override is not None:
+            return override
+
+        config_path = KuberosConfig.get_config_path()
+        try:
+            stat = os.stat(config_path)
+            stamp = [config_path, stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            stamp = None
+
+        data = self.load()
+        cached = data.get('current_context', None)
+        if stamp is not None and cached is not None and cached['stamp'] == stamp:
+            return cached['name']
+
+        name = KuberosConfig.get_current_config()['name']
+        data['current_context'] = {'stamp': stamp, 'name': name}
+        self.save()
+        return name
+
+    def get(self, context: str, resource_url: str):
+        """
+        Get the cached names
+
+        Returns:
+            names (list): cached names, None if not cached or too old
+            is_fresh (bool): False if the names should be refreshed
+        """
+        entry = self.load()['entries'].get(self.get_key(context, resource_url), None)
+        if entry is None:
+            return None, False
+
+        age = time.time() - entry['updated']
+        if age > self.MAX_STALE:
+            return None, False
+
+        # the lru timestamp has a resolution of TTL to avoid a write on every hit
+        if time.time() - entry['used'] > self.TTL:
+            entry['used'] = time.time()
+            self.save()
+        return entry['names'], age <= self.TTL
+
+    def put(self, context: str, resource_url: str, names: list):
+        """
+        Add or update the cached names and save the cache
+        """
+        now = time.time()
+        self.load()['entries'][self.get_key(context, resource_url)] = {
+            'names': names,
+            'updated': now,
+            'used': now,
+        }
+        self.save()
+
+    def refresh_in_background(self,
+                              context: str,
+                              resource_url: str,
+                              name_field: str):
+        """
+        Start a detached process to refresh a stale entry.
+        Only one refresh per entry is started within the TTL.
+        """
+        entry = self.load()['entries'][self.get_key(context, resource_url)]
+        if time.time() - entry.get('refreshing', 0) < self.TTL:
+            return
+        entry['refreshing'] = time.time()
+        self.save()
+
+        try:
+            subprocess.Popen([sys.executable, '-m', 'kuberoscli.completion_cache',
+                              context, resource_url, name_field],
+                             stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL,
+                             start_new_session=True)
+        except OSError:
+            pass
+
+
+def refresh(context: str, resource_url: str, name_field: str):
+    """
+    Fetch the names from the API server and update the cache
+    """
+    config = KuberosConfig.get_context_by_name(context)
+    paginator = Paginator(f"{config['server']}/{resource_url}",
+                          headers={'Authorization': 'Token ' + config['token']},
+                          timeout=KuberosTransport.COMPLETION_TIMEOUT)
+    try:
+        names = [item[name_field] for item in paginator]
+    except ApiError:
+        return
+    CompletionCache().put(context, resource_url, names)
+
+
+if __name__ == '__main__':
+    refresh(*sys.argv[1:4])
@@ -0,0 +1,395 @@
+"""
+Transfer of batch job data files (bags, logs) to and from the API server
+ - DataTransfer: list, chunked parallel download and upload of files
+ - TransferError: a transfer failed, e.g. a chunk checksum mismatch
+
+Files are transferred in fixed-size chunks over the pooled session, several
+chunks in parallel. Each chunk is verified by its sha256:
+
+    GET  data_management/<job>/                         list the files
+    GET  data_management/<job>/files/?path=&chunk_size= size, sha256 and chunk digests
+    GET  data_management/<job>/files/?path=   Range: bytes=<first>-<last>
+    POST data_management/<job>/uploads/                 start or resume an upload,
+                                                        returns the received chunks
+    PUT  data_management/<job>/uploads/<id>/?index=     chunk, X-Chunk-SHA256 header
+    POST data_management/<job>/uploads/<id>/complete/   verify and store the file
+
+Downloads are written to '<file>.part' at the offset of each chunk, without
+buffering the file in memory. The verified chunks are recorded in
+'<file>.part.json', an interrupted download continues with the missing
+chunks. Uploads read each chunk from the file at its offset, an interrupted
+upload of the same content resumes with the chunks the server lacks.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from .endpoints import Endpoints
+from .transport import KuberosTransport, ApiError, CONNECTION_ERROR_MESSAGE
+
+
+class TransferError(Exception):
+    """
+    A file transfer failed
+    """
+
+
+def get_digests(path: str, chunk_size: int):
+    """
+    Compute the sha256 of a file and of each of its chunks in one pass
+
+    Returns:
+        digest (str): sha256 of the file
+        chunk_digests (list of str): sha256 of each chunk
+    """
+    file_hash = hashlib.sha256()
+    chunk_digests = []
+    with open(path, 'rb') as file:
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            file_hash.update(data)
+            chunk_digests.append(hashlib.sha256(data).hexdigest())
+    return file_hash.hexdigest(), chunk_digests
+
+
+def check_relative_path(path: str) -> str:
+    """
+    Normalize a remote file path, it must stay inside the destination directory
+
+    Raises:
+        TransferError: the path is absolute or leaves the directory
+    """
+    normalized = os.path.normpath(path.replace('\\', '/'))
+    if os.path.isabs(normalized) or normalized.split(os.sep)[0] == '..':
+        raise TransferError(f"Invalid file path '{path}'")
+    return normalized
+
+
+class DataTransfer:
+    """
+    Data files of a batch job
+
+    Example:
+        transfer = DataTransfer(config['server'], config['token'], 'sim-campaign')
+        transfer.download('bags/run-1.bag', 'data/run-1.bag')
+    """
+
+    # default chunk size in bytes
+    CHUNK_SIZE = 8 * 1024 * 1024
+    # default number of chunks transferred concurrently
+    MAX_WORKERS = 4
+    # attempts of each chunk, e.g. after a checksum mismatch
+    CHUNK_ATTEMPTS = 3
+    # size of the pieces a downloaded chunk is written in
+    WRITE_SIZE = 1024 * 1024
+    # min. seconds between two writes of the download state
+    STATE_INTERVAL = 1.0
+    # timeout of a chunk request in seconds
+    CHUNK_TIMEOUT = 120
+
+    def __init__(self,
+                 server: str,
+                 auth_token: str,
+                 batchjob_name: str,
+                 parallel: int = None,
+                 chunk_size: int = None,
+                 on_progress=None) -> None:
+        """
+        Args:
+            server (str): address of the API server
+            auth_token (str): user token
+            batchjob_name (str): name of the batch job
+            parallel (int, optional): number of chunks transferred concurrently
+            chunk_size (int, optional): chunk size in bytes
+            on_progress (callable, optional): called with (bytes transferred, total bytes)
+                of the current file
+        """
+        self.url = f'{server}/{Endpoints.BATCH_DATA}{batchjob_name}/'
+        self.headers = {'Authorization': 'Token ' + auth_token}
+        self.parallel = max(1, parallel or self.MAX_WORKERS)
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._done_bytes = 0
+        self._total_bytes = 0
+
+    def call(self, method: str, url: str, headers: dict = None, **kwargs):
+        """
+        Call a json endpoint, responses with a status other than 'success' raise
+
+        Raises:
+            ApiError: the request failed
+        """
+        response = KuberosTransport.call_json(method, url,
+                                              headers=dict(self.headers, **(headers or {})),
+                                              **kwargs)
+        if not isinstance(response, dict) or response.get('status', None) != 'success':
+            errors = response.get('errors', response) if isinstance(response, dict) else response
+            raise ApiError(f'[Error] {errors}')
+        return response.get('data', None)
+
+    def list_files(self) -> list:
+        """
+        List the data files of the batch job
+
+        Returns:
+            list of dict: {'path', 'size', 'sha256', ...}
+        """
+        return self.call('GET', self.url)
+
+    def _add_progress(self, num_bytes: int):
+        with self._lock:
+            self._done_bytes += num_bytes
+            done, total = self._done_bytes, self._total_bytes
+        if self.on_progress is not None:
+            self.on_progress(done, total)
+
+    def _run_chunks(self, transfer_chunk, indices: list, on_done=None):
+        """
+        Transfer the chunks concurrently, each chunk is attempted CHUNK_ATTEMPTS times
+
+        Raises:
+            TransferError: a chunk failed in all attempts
+        """
+        def run(index):
+            error = None
+            for _ in range(self.CHUNK_ATTEMPTS):
+                try:
+                    transfer_chunk(index)
+                    if on_done is not None:
+                        on_done(index)
+                    return
+                except (ApiError, TransferError) as exc:
+                    if isinstance(exc, ApiError) and exc.status_code is not None \
+                            and exc.status_code < 500:
+                        # e.g. unauthorized or not found, not worth a retry
+                        raise
+                    error = exc
+            raise TransferError(f'Chunk {index} failed: {error}')
+
+        if not indices:
+            return
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(self.parallel, len(indices))) as executor:
+            # the first error is raised, the remaining chunks are not started
+            futures = [executor.submit(run, index) for index in indices]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def download(self, remote_path: str, local_path: str) -> int:
+        """
+        Download a file in chunks, resuming a previous interrupted download
+
+        Returns:
+            int: number of bytes downloaded, without the chunks of a previous download
+
+        Raises:
+            TransferError: a chunk can't be downloaded or verified
+            ApiError: the API server rejected a request
+        """
+        info = self.call('GET', f'{self.url}files/',
+                         params={'path': remote_path, 'chunk_size': self.chunk_size})
+        size = info['size']
+        chunk_size = info.get('chunk_size', None) or self.chunk_size
+        chunk_digests = info['chunks']
+
+        part_path = f'{local_path}.part'
+        state_path = f'{part_path}.json'
+        state = self._load_state(state_path)
+        if state is None or state['sha256'] != info['sha256'] \
+                or state['chunk_size'] != chunk_size or not os.path.exists(part_path):
+            state = {'sha256': info['sha256'], 'chunk_size': chunk_size, 'done': []}
+        done = set(state['done'])
+        pending = [index for index in range(len(chunk_digests)) if index not in done]
+
+        os.makedirs(os.path.dirname(os.path.abspath(local_path)), exist_ok=True)
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            if not done:
+                self._allocate(fd, size)
+            self._done_bytes = sum(min(chunk_size, size - index * chunk_size) for index in done)
+            self._total_bytes = size
+            start_bytes = self._done_bytes
+            last_saved = [time.monotonic()]
+
+            def fetch(index):
+                self._fetch_chunk(fd, remote_path, index, chunk_size, size, chunk_digests[index])
+
+            def on_done(index):
+                with self._lock:
+                    done.add(index)
+                    now = time.monotonic()
+                    if now - last_saved[0] >= self.STATE_INTERVAL:
+                        last_saved[0] = now
+                        self._save_state(state_path, dict(state, done=sorted(done)))
+
+            try:
+                self._run_chunks(fetch, pending, on_done)
+            finally:
+                with self._lock:
+                    self._save_state(state_path, dict(state, done=sorted(done)))
+        finally:
+            os.close(fd)
+
+        os.replace(part_path, local_path)
+        try:
+            os.remove(state_path)
+        except OSError:
+            pass
+        return self._done_bytes - start_bytes
+
+    @staticmethod
+    def _allocate(fd: int, size: int):
+        """
+        Reserve the disk space of the downloaded file
+        """
+        os.ftruncate(fd, size)
+        if size > 0 and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                # not supported by the filesystem, the file is sparse
+                pass
+
+    def _fetch_chunk(self,
+                     fd: int,
+                     remote_path: str,
+                     index: int,
+                     chunk_size: int,
+                     size: int,
+                     expected_digest: str):
+        """
+        Download a chunk and write it to its offset while it is received
+
+        Raises:
+            TransferError: the chunk is incomplete or its checksum does not match
+            ApiError: the request failed
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        offset = index * chunk_size
+        length = min(chunk_size, size - offset)
+        headers = dict(self.headers, Range=f'bytes={offset}-{offset + length - 1}')
+        chunk_hash = hashlib.sha256()
+        received = 0
+        try:
+            with KuberosTransport.request('GET', f'{self.url}files/',
+                                          params={'path': remote_path},
+                                          headers=headers,
+                                          stream=True,
+                                          timeout=self.CHUNK_TIMEOUT) as resp:
+                if resp.status_code >= 400:
+                    raise KuberosTransport.get_http_error(resp)
+                if resp.status_code != 206 and length != size:
+                    raise TransferError('The API server does not support range requests')
+                for data in resp.iter_content(chunk_size=self.WRITE_SIZE):
+                    if received + len(data) > length:
+                        raise TransferError(f'Chunk {index} is larger than {length} bytes')
+                    chunk_hash.update(data)
+                    self._write_at(fd, data, offset + received)
+                    received += len(data)
+        except requests.exceptions.RequestException as exc:
+            raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+
+        if received != length or chunk_hash.hexdigest() != expected_digest:
+            raise TransferError(f'Checksum mismatch of chunk {index}')
+        self._add_progress(length)
+
+    def _write_at(self, fd: int, data: bytes, offset: int):
+        if hasattr(os, 'pwrite'):
+            os.pwrite(fd, data, offset)
+        else:
+            with self._lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                os.write(fd, data)
+
+    def upload(self, local_path: str, remote_path: str) -> int:
+        """
+        Upload a file in chunks, the chunks the server already received are skipped
+
+        Returns:
+            int: number of bytes uploaded
+
+        Raises:
+            TransferError: a chunk can't be uploaded
+            ApiError: the API server rejected a request
+        """
+        size = os.path.getsize(local_path)
+        digest, chunk_digests = get_digests(local_path, self.chunk_size)
+        upload = self.call('POST', f'{self.url}uploads/', json={
+            'path': remote_path,
+            'size': size,
+            'sha256': digest,
+            'chunk_size': self.chunk_size,
+            'chunks': chunk_digests,
+        })
+        received = set(upload.get('received', None) or [])
+        pending = [index for index in range(len(chunk_digests)) if index not in received]
+        upload_url = f"{self.url}uploads/{upload['upload_id']}/"
+
+        self._total_bytes = size
+        self._done_bytes = size - sum(min(self.chunk_size, size - index * self.chunk_size)
+                                      for index in pending)
+        start_bytes = self._done_bytes
+        fd = os.open(local_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            def send(index):
+                offset = index * self.chunk_size
+                data = self._read_at(fd, min(self.chunk_size, size - offset), offset)
+                if hashlib.sha256(data).hexdigest() != chunk_digests[index]:
+                    raise TransferError(f'{local_path} changed during the upload')
+                self.call('PUT', upload_url,
+                          params={'index': index},
+                          data=data,
+                          headers={
+                              'Content-Type': 'application/octet-stream',
+                              'X-Chunk-SHA256': chunk_digests[index],
+                          },
+                          timeout=self.CHUNK_TIMEOUT)
+                self._add_progress(len(data))
+
+            self._run_chunks(send, pending)
+        finally:
+            os.close(fd)
+
+        self.call('POST', f'{upload_url}complete/')
+        return self._done_bytes - start_bytes
+
+    def _read_at(self, fd: int, length: int, offset: int) -> bytes:
+        if hasattr(os, 'pread'):
+            return os.pread(fd, length, offset)
+        with self._lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, length)
+
+    @staticmethod
+    def _load_state(state_path: str) -> dict:
+        try:
+            with open(state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_state(state_path: str, state: dict):
+        """
+        Write the download state atomically, the chunks not recorded are downloaded again
+        """
+        try:
+            tmp_path = f'{state_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(state, file)
+            os.replace(tmp_path, state_path)
+        except OSError:
+            pass
@@ -10,6 +10,10 @@ class Endpoints:
     BATCH_JOB = 'api/v1/batch_jobs/batch_jobs/'
     BATCH_DATA = 'api/v1/batch_jobs/data_management/'
 
+    # Parameter file contents, referenced by digest
+    PARAM_BLOBS = 'api/v1/param_blobs/'
+    PARAM_BLOBS_MISSING = 'api/v1/param_blobs/missing/'
+
     # Auth
     LOGIN = 'api/v1/auth/user_login/'
     LOGOUT = 'api/v1/auth/user_logout/'
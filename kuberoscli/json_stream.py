@@ -0,0 +1,293 @@
+"""
+JSON decoding of API responses
+ - loads: decode a complete document, with orjson if it is installed
+ - StreamingJsonParser: decode a document incrementally from chunks
+
+The streaming parser decodes the array at a given path of the document
+element by element while the response is still being received, e.g. the
+'cluster_node_set' of a cluster:
+
+    response = StreamingJsonParser(resp.iter_content(65536),
+                                   ['data', 'cluster_node_set']).root
+    response['status']                      # parses up to the status field
+    for node in response['data']['cluster_node_set']:
+        ...                                 # one node decoded at a time
+
+All other values are decoded as a whole with the C scanner of the json module.
+"""
+
+import json
+import codecs
+from collections import deque
+
+# optional fast backend, imported on first use: False if not checked yet,
+# None if not installed
+_orjson = False
+
+
+_DECODER = json.JSONDecoder()
+
+_WHITESPACE = ' \t\n\r'
+
+_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+def loads(data):
+    """
+    Decode a complete json document (str or bytes)
+    """
+    global _orjson  # pylint: disable=global-statement
+    if _orjson is False:
+        try:
+            import orjson  # pylint: disable=import-outside-toplevel
+            _orjson = orjson
+        except ImportError:  # the json module is used as fallback
+            _orjson = None
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+class StreamedObject:
+    """
+    Json object decoded on access. Fields are parsed up to the requested key,
+    the streamed array is returned as StreamedArray.
+    Accessing a field behind a streamed array that was not iterated yet keeps
+    the array items in memory until they are iterated.
+    """
+
+    def __init__(self, parser: 'StreamingJsonParser') -> None:
+        self._parser = parser
+        self._fields = {}
+        self._complete = False
+
+    def _parse_until(self, key):
+        while key not in self._fields and not self._complete:
+            if not self._parser.step():
+                break
+
+    def __getitem__(self, key):
+        self._parse_until(key)
+        return self._fields[key]
+
+    def __contains__(self, key) -> bool:
+        self._parse_until(key)
+        return key in self._fields
+
+    def get(self, key, default=None):
+        """
+        Get a field, default if the object has no such field
+        """
+        self._parse_until(key)
+        return self._fields.get(key, default)
+
+    def to_dict(self) -> dict:
+        """
+        Parse the rest of the object and convert it to a dict,
+        the streamed array is converted to a list
+        """
+        self._parse_until(None)
+        return {key: value.to_dict() if isinstance(value, StreamedObject)
+                else list(value) if isinstance(value, StreamedArray)
+                else value
+                for key, value in self._fields.items()}
+
+    def __repr__(self) -> str:
+        # used to print error responses, parses the whole object
+        return repr(self.to_dict())
+
+    def close(self):
+        """
+        Stop parsing and close the underlying response
+        """
+        self._parser.close()
+
+
+class StreamedArray:
+    """
+    Json array decoded element by element while it is iterated.
+    It can only be iterated once, the elements are not kept.
+    """
+
+    def __init__(self, parser: 'StreamingJsonParser') -> None:
+        self._parser = parser
+        self._pending = deque()
+        self._complete = False
+        self._iterated = False
+
+    def __iter__(self):
+        if self._iterated:
+            raise RuntimeError('A streamed array can only be iterated once')
+        self._iterated = True
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if self._complete:
+                return
+            if not self._parser.step():
+                return
+
+
+class StreamingJsonParser:
+    """
+    Incremental parser of a json document received in chunks.
+    Only the objects along the path are parsed field by field,
+    the array at the end of the path is parsed element by element.
+    """
+
+    # consumed text is dropped from the buffer when it exceeds this size
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self, chunks, path: list, on_close=None) -> None:
+        """
+        Args:
+            chunks (iterable of bytes or str): the document in chunks,
+                e.g. requests.Response.iter_content()
+            path (list of str): keys of the array to stream
+            on_close (callable, optional): called once the document is parsed
+                or the parser is closed, e.g. requests.Response.close
+        """
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._on_close = on_close
+        self.root = StreamedObject(self)
+        self._steps = self._walk_object(self.root, list(path))
+
+    def step(self) -> bool:
+        """
+        Parse the next field or array element
+
+        Returns:
+            bool: False if the document is parsed completely
+        """
+        if self._steps is None:
+            return False
+        try:
+            next(self._steps)
+            return True
+        except StopIteration:
+            if self._next_char():
+                self._raise_error('Extra data')
+            self.close()
+            return False
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Stop parsing and call on_close
+        """
+        self._steps = None
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+
+    def _raise_error(self, message: str):
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def _fill(self) -> bool:
+        """
+        Append the next chunk to the buffer, False at the end of the document
+        """
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._text_decoder.decode(chunk)
+            if chunk:
+                self._buffer += chunk
+                return True
+        self._buffer += self._text_decoder.decode(b'', final=True)
+        self._eof = True
+        return False
+
+    def _compact(self):
+        if self._pos > self.COMPACT_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+    def _next_char(self) -> str:
+        """
+        Skip whitespace and return the next character, '' at the end
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self._next_char()
+        if not char or char not in chars:
+            self._raise_error(f'Expecting one of {chars!r}')
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        """
+        Decode the next complete value from the buffer, reading more chunks
+        until it is complete. The buffer is at least doubled before
+        retrying, so large values are not decoded over and over.
+        """
+        self._compact()
+        self._next_char()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # a number is complete only if a delimiter follows, '-25' of '-2500.0'
+                # might be decoded if the chunk ends in the middle of the number
+                if self._eof or (end < len(self._buffer)
+                                 and self._buffer[end] in _DELIMITERS):
+                    self._pos = end
+                    return value
+                self._fill()
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                target = 2 * len(self._buffer) - self._pos
+                while len(self._buffer) < target and self._fill():
+                    pass
+
+    def _walk_object(self, obj: StreamedObject, path: list):
+        self._expect('{')
+        if self._next_char() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._decode_value()
+                if not isinstance(key, str):
+                    self._raise_error('Expecting property name')
+                self._expect(':')
+                if path and key == path[0] and len(path) == 1 and self._next_char() == '[':
+                    array = StreamedArray(self)
+                    obj._fields[key] = array  # pylint: disable=protected-access
+                    yield from self._walk_array(array)
+                elif path and key == path[0] and len(path) > 1 and self._next_char() == '{':
+                    child = StreamedObject(self)
+                    obj._fields[key] = child  # pylint: disable=protected-access
+                    yield from self._walk_object(child, path[1:])
+                else:
+                    obj._fields[key] = self._decode_value()  # pylint: disable=protected-access
+                    yield
+                if self._expect(',}') == '}':
+                    break
+        obj._complete = True  # pylint: disable=protected-access
+
+    def _walk_array(self, array: StreamedArray):
+        # pylint: disable=protected-access
+        self._expect('[')
+        if self._next_char() == ']':
+            self._pos += 1
+        else:
+            while True:
+                array._pending.append(self._decode_value())
+                yield
+                if self._expect(',]') == ']':
+                    break
+        array._complete = True
@@ -4,14 +4,94 @@ KubeROS Config object to handle the config file
 
 import os
 import sys
+import copy
+import tempfile
+import contextlib
 import yaml
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# use the libyaml bindings if available, they are much faster for large configs
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YamlDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+class KuberosConfigStore:
+    """
+    Parsed content of a config file.
+
+    The file is parsed once per process and only parsed again if it
+    changed (inode, mtime or size). Contexts are indexed by name.
+    """
+
+    def __init__(self, config_path: str) -> None:
+        self.config_path = config_path
+        self._stamp = None
+        self._config = None
+        self._contexts = {}
+
+    def get_stamp(self) -> tuple:
+        """
+        Get the (inode, mtime, size) of the config file, None if it does not exist.
+        The config is written by renaming a new file, so each write changes the inode.
+        """
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self) -> dict:
+        """
+        Get the parsed config, parse the file only if it changed.
+        The returned dict is shared, don't modify it.
+        """
+        stamp = self.get_stamp()
+        if self._config is None or stamp != self._stamp:
+            with open(self.config_path, "r", encoding="utf-8") as file:
+                config = yaml.load(file, Loader=YamlLoader)
+            self.set(config, stamp)
+        return self._config
+
+    def set(self, config: dict, stamp: tuple):
+        """
+        Set the parsed config, e.g. after writing it to the file
+        """
+        self._config = config
+        self._stamp = stamp
+        contexts = config.get('contexts', None) if isinstance(config, dict) else None
+        self._contexts = {con['name']: con for con in contexts or []}
+
+    def get_context(self, ctx_name: str) -> dict:
+        """
+        Get a context by name, None if it does not exist
+        """
+        self.load()
+        return self._contexts.get(ctx_name, None)
+
+    def get_context_names(self) -> list:
+        """
+        Get the list of context names
+        """
+        self.load()
+        return list(self._contexts)
+
 
 class KuberosConfig:
     """
     Class to handle the Kuberos CLI config file
     """
 
+    # config stores by config path, shared in the process
+    _stores = {}
+
+    # context selected with the global --context flag
+    _context_override = None
+
     @staticmethod
     def get_config_path() -> str:
         """
@@ -25,6 +105,18 @@ class KuberosConfig:
         config_path = os.path.expanduser(config_path)
         return config_path
 
+    @classmethod
+    def get_store(cls) -> KuberosConfigStore:
+        """
+        Get the process-wide store of the config file
+        """
+        config_path = cls.get_config_path()
+        store = cls._stores.get(config_path, None)
+        if store is None:
+            store = KuberosConfigStore(config_path)
+            cls._stores[config_path] = store
+        return store
+
     @staticmethod
     def create_config_file(config_path: str):
         """
@@ -35,7 +127,7 @@ class KuberosConfig:
         else:
             # check if the config folder exists
             if not os.path.isdir(os.path.dirname(config_path)):
-                os.mkdir(os.path.dirname(config_path))
+                os.makedirs(os.path.dirname(config_path))
 
             # create the config file
             with open(config_path, "w", encoding="utf-8") as file:
@@ -51,20 +143,74 @@ class KuberosConfig:
     def load_kuberos_config(cls) -> dict:
         """
         Load the cached authentication token and api server address
+        The returned dict is shared, don't modify it.
         """
-        config_path = cls.get_config_path()
+        store = cls.get_store()
 
-        if os.path.isfile(config_path):
-            with open(config_path, "r", encoding="utf-8") as file:
-                config = yaml.safe_load(file)
-        else:
+        if store.get_stamp() is None:
+            config_path = store.config_path
             cls.create_config_file(config_path)
             print("Cannot find config file")
             print(f"create a new config file in default path: {config_path}")
             print("Please add a new context by using command: kuberos config create")
             sys.exit(1)
 
-        return config
+        return store.load()
+
+    @classmethod
+    @contextlib.contextmanager
+    def locked(cls):
+        """
+        Hold an exclusive advisory lock on the config file.
+        Used around read-modify-write of the config file, so parallel
+        kuberos processes don't lose each others updates.
+        """
+        lock_path = cls.get_config_path() + '.lock'
+        # the first write of a fresh install, before the config directory exists
+        if os.path.dirname(lock_path):
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a', encoding='utf-8') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @classmethod
+    def write_config(cls, config: dict):
+        """
+        Write the config to the local config file.
+        The config is written to a temporary file which replaces the
+        config file, so readers never see a partially written file.
+        """
+        store = cls.get_store()
+        config_path = store.config_path
+        content = yaml.dump(config, Dumper=YamlDumper, default_flow_style=False)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(config_path),
+                                        prefix='.config.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(config_path):
+                os.chmod(tmp_path, os.stat(config_path).st_mode & 0o777)
+            os.replace(tmp_path, config_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        store.set(config, store.get_stamp())
 
     @classmethod
     def update_config(cls,
@@ -73,29 +219,26 @@ class KuberosConfig:
         """
         Update the local cli config file
         """
-        config_path = cls.get_config_path()
-        config = cls.load_kuberos_config()
+        with cls.locked():
+            config = copy.deepcopy(cls.load_kuberos_config())
 
-        # update contexts
-        if context is not None:
-            # add new context
-            if context['name'] not in cls.get_context_names():
-                config['contexts'].append(context)
-            else:
-                # update context
-                for con in config['contexts']:
-                    if con['name'] == context['name']:
-                        con.update(context)
-                        break
+            # update contexts
+            if context is not None:
+                # add new context
+                if cls.get_store().get_context(context['name']) is None:
+                    config['contexts'].append(context)
+                else:
+                    # update context
+                    for con in config['contexts']:
+                        if con['name'] == context['name']:
+                            con.update(context)
+                            break
 
-        # update current context
-        if current_context is not None:
-            config['current-context'] = current_context
+            # update current context
+            if current_context is not None:
+                config['current-context'] = current_context
 
-        with open(config_path, "w", encoding="utf-8") as file:
-            yaml.safe_dump(config,
-                           file,
-                           default_flow_style=False)
+            cls.write_config(config)
         # print('Update config file success')
 
     @classmethod
@@ -104,36 +247,55 @@ class KuberosConfig:
         """
         Delete a context from local config file
         """
-        config = cls.load_kuberos_config()
-        config_path = cls.get_config_path()
-
-        new_config = {
-            'current-context': config['current-context'],
-            'contexts': [],
-        }
+        with cls.locked():
+            config = cls.load_kuberos_config()
 
-        for con in config['contexts']:
-            if con['name'] != context_name:
-                new_config['contexts'].append(con)
+            new_config = {
+                'current-context': config['current-context'],
+                'contexts': copy.deepcopy([con for con in config['contexts']
+                                           if con['name'] != context_name]),
+            }
 
-        with open(config_path, "w", encoding="utf-8") as file:
-            yaml.safe_dump(new_config,
-                           file,
-                           default_flow_style=False)
+            cls.write_config(new_config)
 
     @classmethod
     def get_context_names(cls) -> list:
         """
         Get the list of context names
         """
-        config = cls.load_kuberos_config()
-        return [con['name'] for con in config['contexts']]
+        cls.load_kuberos_config()
+        return cls.get_store().get_context_names()
+
+    @classmethod
+    def set_context_override(cls, ctx_name: str):
+        """
+        Use another context than the current context of the config file
+        for this process (global --context flag), without writing the file
+        """
+        cls._context_override = ctx_name
+
+    @classmethod
+    def get_context_override(cls) -> str:
+        """
+        Get the context selected by the --context flag or
+        the KUBEROS_CONTEXT environment variable, None if not set
+        """
+        if cls._context_override:
+            return cls._context_override
+        return os.environ.get('KUBEROS_CONTEXT', None) or None
 
     @classmethod
     def get_current_config(cls) -> dict:
         """
-        Get config of the current context
+        Get config of the current context.
+        The current context is, in this order:
+         - the --context flag
+         - the KUBEROS_CONTEXT environment variable
+         - the current-context in the config file
         """
+        current_context = cls.get_context_override()
+        if current_context is not None:
+            return cls.get_context_by_name(current_context)
 
         config = cls.load_kuberos_config()
 
@@ -141,7 +303,7 @@ class KuberosConfig:
             current_context = config['current-context']
         except KeyError:
             print("Error in config file, please check the config file")
-            print(f"Config file path: {config}")
+            print(f"Config file path: {cls.get_config_path()}")
             print("Quick fix: delete the config file and create a new context using command: kuberos config create")
             sys.exit(0)
 
@@ -160,29 +322,22 @@ class KuberosConfig:
             ctx_name (str): context name
 
         Returns:
-            ctx_config (dict): context config
+            ctx_config (dict): context config (a copy, can be modified)
         """
         config = cls.load_kuberos_config()
-        ctx_config = None
 
-        try:
-            contexts = config['contexts']
-        except KeyError:
+        if 'contexts' not in config:
             print("Error in config file, please check the config file")
-            print(f"Config file path: {config}")
+            print(f"Config file path: {cls.get_config_path()}")
             print("Quick fix: delete the config file and \
                 create a new context using command: kuberos config create")
             sys.exit(0)
 
-        for con in contexts:
-            if con['name'] == ctx_name:
-                ctx_config = con
-                break
+        ctx_config = cls.get_store().get_context(ctx_name)
 
         if ctx_config is None:
             print(f"Context [{ctx_name}] not found")
-            contexts_name = [con['name'] for con in contexts]
-            print(f"Available contexts: {contexts_name}")
+            print(f"Available contexts: {cls.get_context_names()}")
             sys.exit(1)
 
-        return ctx_config
+        return dict(ctx_config)
@@ -16,29 +16,53 @@
 # limitations under the License.
 
 
+import os
 import sys
 import argparse
-import argcomplete
-
-# KuberosCLI
-from kuberoscli.command_group.cluster import ClusterCommandGroup
-from kuberoscli.command_group.fleet import FleetCommandGroup
-from kuberoscli.command_group.deploy import DeployCommandGroup
-from kuberoscli.command_group.config import ConfigCommandGroup
-from kuberoscli.command_group.batchjob import BatchJobCommandGroup
-from kuberoscli.command_group.registry import RegistryCommandGroup
+import importlib
+
+from kuberoscli.kuberos_config import KuberosConfig
+
+
+# Command groups are imported only when they are dispatched or completed,
+# to keep the startup time of the CLI short.
+# group name: (module, class name, help)
+COMMAND_GROUPS = {
+    'deploy': ('kuberoscli.command_group.deploy', 'DeployCommandGroup',
+               'Deploy, check, delete the ROS2 applications'),
+    'job': ('kuberoscli.command_group.batchjob', 'BatchJobCommandGroup',
+            'Create, check, stop, delete a BatchJob'),
+    'cluster': ('kuberoscli.command_group.cluster', 'ClusterCommandGroup',
+                'Manage the clusters'),
+    'fleet': ('kuberoscli.command_group.fleet', 'FleetCommandGroup',
+              'Manage the fleets'),
+    'registry': ('kuberoscli.command_group.registry', 'RegistryCommandGroup',
+                 'Manage the container registry'),
+    'config': ('kuberoscli.command_group.config', 'ConfigCommandGroup',
+               'Manage the context of the Kuberos CLI'),
+    'apply': ('kuberoscli.command_group.apply', 'ApplyCommandGroup',
+              'Create resources of any supported kind'),
+    'lint': ('kuberoscli.command_group.lint', 'LintCommandGroup',
+             'Validate manifests offline'),
+}
 
 
 CLI_HELP_SUMMARY = '''
 KubeROS Command Line Tool
 
 Usage:
-    kuberos <command_group> <command> [name] [-args]
+    kuberos [--context <context_name>] <command_group> <command> [name] [-args]
     
     Call kuberos <command_group> -h for more detailed usages.
     Example: check the deployment info
              kuberos deploy info <deployment_name>
     
+Global Options:
+
+    --context    Use this context instead of the current context (read-only,
+                 the config file is not changed). Can also be set with the
+                 environment variable KUBEROS_CONTEXT.
+    
 Command Groups:
 
     deploy       Deploy, check, delete the ROS2 applications
@@ -46,6 +70,7 @@ Command Groups:
     job          create, check, stop, delete a BatchJob
     
     apply        General command to create resources in any supported types
+                 (kuberos apply -f <file|dir>, multi-document yaml, dependency order)
     
     cluster      Manage the clusters (create, list, update, info, delete)
     
@@ -54,9 +79,20 @@ Command Groups:
     config       Manage the context of the Kuberos CLI (login, switch context, etc.)
     
     registry     Manage the container registry (token, repository)
+    
+    lint         Validate manifests offline (kuberos lint <manifest> ...)
 '''
 
 
+class ContextNameCompleter:
+    """
+    Complete the context names of the global --context flag
+    """
+
+    def __call__(self, **kwargs):
+        return KuberosConfig.get_context_names()
+
+
 class KuberosCli:
     """
     Command line tool for KubeROS
@@ -66,29 +102,85 @@ class KuberosCli:
         self.parser = argparse.ArgumentParser(
             description="KubeROS Command Line Tool")
 
+        self.parser.add_argument('--context',
+                                 help='Context to use instead of the current context'
+                                 ).completer = ContextNameCompleter()
         group_subparsers = self.parser.add_subparsers(dest='group',
                                                       help='Command group to execute')
 
-        # Add subparsers for each command group
+        # global options are valid at any position in the command line
+        context, argv = self.split_global_options(sys.argv[1:])
+        if context is not None:
+            KuberosConfig.set_context_override(context)
+
+        # Only the requested command group is loaded,
+        # the others are registered with a placeholder parser.
+        requested_group = self.get_requested_group(argv)
         self.groups = {}
-        self.groups.update({
-            'deploy': DeployCommandGroup(subparsers=group_subparsers),
-            'job': BatchJobCommandGroup(subparsers=group_subparsers),
-            'cluster': ClusterCommandGroup(subparsers=group_subparsers),
-            'fleet': FleetCommandGroup(subparsers=group_subparsers),
-            'registry': RegistryCommandGroup(subparsers=group_subparsers),
-            'config': ConfigCommandGroup(subparsers=group_subparsers),
-        })
-
-        argcomplete.autocomplete(self.parser)
-        args = self.parser.parse_args(sys.argv[1:2])
+        for group_name, (_, _, group_help) in COMMAND_GROUPS.items():
+            if group_name == requested_group:
+                self.groups[group_name] = self.load_group(group_name,
+                                                          group_subparsers)
+            else:
+                group_subparsers.add_parser(group_name, help=group_help)
+
+        if '_ARGCOMPLETE' in os.environ:
+            import argcomplete  # pylint: disable=import-outside-toplevel
+            argcomplete.autocomplete(self.parser)
+        args = self.parser.parse_args(argv[0:1])
 
         # dispatch to the corresponding command group
         if not args.group in self.groups.keys():
             self.print_help()
             sys.exit(1)
         else:
-            self.groups[args.group].run(*sys.argv[2:])
+            self.groups[args.group].run(*argv[1:])
+
+    @staticmethod
+    def split_global_options(argv: list):
+        """
+        Remove the global options from the arguments
+
+        Returns:
+            context (str): value of --context, None if not given
+            argv (list): remaining arguments
+        """
+        context = None
+        remaining = []
+        args = iter(argv)
+        for arg in args:
+            if arg == '--context':
+                context = next(args, None)
+            elif arg.startswith('--context='):
+                context = arg.split('=', 1)[1]
+            else:
+                remaining.append(arg)
+        return context, remaining
+
+    def get_requested_group(self, argv: list) -> str:
+        """
+        Get the name of the command group from the command line,
+        or from the line to complete in autocompletion mode
+        """
+        if '_ARGCOMPLETE' in os.environ:
+            comp_line = os.environ.get('COMP_LINE', '')
+            comp_point = int(os.environ.get('COMP_POINT', len(comp_line)))
+            context, argv = self.split_global_options(comp_line[:comp_point].split()[1:])
+            if context is not None:
+                KuberosConfig.set_context_override(context)
+
+        if argv and argv[0] in COMMAND_GROUPS:
+            return argv[0]
+        return None
+
+    @staticmethod
+    def load_group(group_name: str, group_subparsers):
+        """
+        Import the command group module and build its parser
+        """
+        module_name, class_name, _ = COMMAND_GROUPS[group_name]
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)(subparsers=group_subparsers)
 
     def print_help(self):
         """
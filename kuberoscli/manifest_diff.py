@@ -0,0 +1,269 @@
+"""
+Structural diff of deployment manifests for `deploy upgrade`
+ - LastApplied: the last manifest applied to a deployment, stored per context
+ - DeploymentDiff: changes between the last-applied and the new manifest
+
+The rosModules and rosParamMap lists are compared by name, all other
+sections as a whole. A rosParamMap entry of type yaml also changes if the
+content of its parameter file changed, compared by sha256 digest.
+Only the changed modules and parameter maps are sent to the API server,
+the unchanged modules keep running.
+
+    ~/.kuberos/last-applied/<context>/<deployment>.json
+"""
+
+import os
+import json
+import time
+import hashlib
+
+from .kuberos_config import KuberosConfig
+
+
+class LastApplied:
+    """
+    Store of the last manifest applied to each deployment, by context
+    """
+
+    @staticmethod
+    def get_path(context: str, deployment_name: str) -> str:
+        """
+        Get the path of the last-applied file of a deployment
+        """
+        config_dir = os.path.dirname(KuberosConfig.get_config_path())
+        return os.path.join(config_dir, 'last-applied', context, f'{deployment_name}.json')
+
+    @classmethod
+    def load(cls, context: str, deployment_name: str) -> dict:
+        """
+        Load the last-applied manifest of a deployment
+
+        Returns:
+            dict: {'manifest': dict, 'param_digests': {name: digest}, 'applied': time},
+                None if not stored
+        """
+        try:
+            with open(cls.get_path(context, deployment_name), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def save(cls, context: str, manifest: dict, param_digests: dict):
+        """
+        Store the manifest of a deployment after it was applied
+
+        Args:
+            context (str): name of the context
+            manifest (dict): the applied manifest
+            param_digests (dict): digests of the parameter files by name,
+                see get_param_digests
+        """
+        path = cls.get_path(context, manifest['metadata']['name'])
+        data = {
+            'manifest': manifest,
+            'param_digests': param_digests,
+            'applied': time.time(),
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the next upgrade of this deployment is not possible
+            pass
+
+    @classmethod
+    def delete(cls, context: str, deployment_name: str):
+        """
+        Remove the last-applied manifest of a deleted deployment, a deployment
+        created again with the same name starts without it
+        """
+        try:
+            os.remove(cls.get_path(context, deployment_name))
+        except OSError:
+            pass
+
+
+def get_param_digests(rosparam_yamls: list) -> dict:
+    """
+    Get the sha256 digest of each parameter file of the request,
+    sent either as content or as content reference
+    """
+    digests = {}
+    for item in rosparam_yamls:
+        for name, digest in (item.get('content_sha256', None) or {}).items():
+            digests[name] = digest
+        for name, content in (item.get('content', None) or {}).items():
+            digests[name] = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    return digests
+
+
+def diff_values(old, new, path: str = '') -> list:
+    """
+    Get the leaf changes between two values, mappings are compared by key
+
+    Returns:
+        list of (path, old value, new value), None values for added or removed keys
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in list(old) + [key for key in new if key not in old]:
+            sub_path = f'{path}.{key}' if path else str(key)
+            if key not in new:
+                changes.append((sub_path, old[key], None))
+            elif key not in old:
+                changes.append((sub_path, None, new[key]))
+            else:
+                changes.extend(diff_values(old[key], new[key], sub_path))
+        return changes
+    if old != new:
+        return [(path, old, new)]
+    return []
+
+
+def _by_name(items) -> dict:
+    return {item['name']: item for item in items or []
+            if isinstance(item, dict) and 'name' in item}
+
+
+class DeploymentDiff:
+    """
+    Changes between two versions of a deployment manifest
+    """
+
+    # sections compared as a whole
+    SECTIONS = ['staticFileMap', 'containerRegistry']
+
+    def __init__(self,
+                 old: dict,
+                 new: dict,
+                 old_param_digests: dict = None,
+                 new_param_digests: dict = None) -> None:
+        """
+        Args:
+            old (dict): last-applied manifest
+            new (dict): new manifest
+            old_param_digests, new_param_digests (dict): parameter file digests by name
+        """
+        self.old = old
+        self.new = new
+        old_param_digests = old_param_digests or {}
+        new_param_digests = new_param_digests or {}
+
+        self.metadata = diff_values(old.get('metadata', {}), new.get('metadata', {}), 'metadata')
+
+        old_modules = _by_name(old.get('rosModules', None))
+        new_modules = _by_name(new.get('rosModules', None))
+        self.added_modules = [name for name in new_modules if name not in old_modules]
+        self.removed_modules = [name for name in old_modules if name not in new_modules]
+        self.module_changes = {name: diff_values(old_modules[name], module)
+                               for name, module in new_modules.items()
+                               if name in old_modules and old_modules[name] != module}
+
+        old_params = _by_name(old.get('rosParamMap', None))
+        new_params = _by_name(new.get('rosParamMap', None))
+        self.added_params = [name for name in new_params if name not in old_params]
+        self.removed_params = [name for name in old_params if name not in new_params]
+        self.param_changes = {}
+        for name, param in new_params.items():
+            if name not in old_params:
+                continue
+            changes = diff_values(old_params[name], param)
+            old_digest = old_param_digests.get(name, None)
+            new_digest = new_param_digests.get(name, None)
+            if old_digest != new_digest:
+                changes.append(('content',
+                                old_digest and f'sha256:{old_digest[:12]}',
+                                new_digest and f'sha256:{new_digest[:12]}'))
+            if changes:
+                self.param_changes[name] = changes
+
+        self.sections = [section for section in self.SECTIONS
+                         if old.get(section, None) != new.get(section, None)]
+
+    def has_changes(self) -> bool:
+        """
+        Check if anything changed
+        """
+        return bool(self.metadata or self.added_modules or self.removed_modules
+                    or self.module_changes or self.added_params or self.removed_params
+                    or self.param_changes or self.sections)
+
+    def get_changed_params(self) -> list:
+        """
+        Names of the added and changed rosParamMap entries
+        """
+        return self.added_params + list(self.param_changes)
+
+    def get_restarted_modules(self) -> list:
+        """
+        Names of the existing modules that are restarted: changed modules and
+        modules using a changed or removed parameter map or static file
+        """
+        changed_refs = set(self.param_changes) | set(self.removed_params)
+        changed_static = 'staticFileMap' in self.sections
+        restarted = []
+        for module in self.new.get('rosModules', None) or []:
+            name = module.get('name', None)
+            if name in self.added_modules:
+                continue
+            refs = {param.get('valueFrom', None) for param in module.get('rosParameters') or []}
+            uses_static = bool(module.get('staticFiles', None))
+            if name in self.module_changes or refs & changed_refs \
+                    or (changed_static and uses_static):
+                restarted.append(name)
+        return restarted
+
+    def get_plan(self) -> dict:
+        """
+        Get the changes as a dict, for the machine readable output formats
+        """
+        return {
+            'metadata': [{'path': path, 'old': old, 'new': new}
+                         for path, old, new in self.metadata],
+            'rosModules': {
+                'added': self.added_modules,
+                'changed': list(self.module_changes),
+                'removed': self.removed_modules,
+            },
+            'rosParamMap': {
+                'added': self.added_params,
+                'changed': list(self.param_changes),
+                'removed': self.removed_params,
+            },
+            'sections': self.sections,
+            'restarted_modules': self.get_restarted_modules(),
+        }
+
+    def get_patch(self, rosparam_yamls: list) -> dict:
+        """
+        Get the request body with the changed parts of the manifest only
+
+        Args:
+            rosparam_yamls (list of dict): parameter files of the added and changed yaml entries
+        """
+        new_modules = _by_name(self.new.get('rosModules', None))
+        new_params = _by_name(self.new.get('rosParamMap', None))
+        changes = {
+            'metadata': self.new.get('metadata', {}),
+            'rosModules': {
+                'added': [new_modules[name] for name in self.added_modules],
+                'changed': [new_modules[name] for name in self.module_changes],
+                'removed': self.removed_modules,
+            },
+            'rosParamMap': {
+                'added': [new_params[name] for name in self.added_params],
+                'changed': [new_params[name] for name in self.param_changes],
+                'removed': self.removed_params,
+            },
+        }
+        for section in self.sections:
+            changes[section] = self.new.get(section, None)
+        return {
+            'deployment_name': self.new['metadata']['name'],
+            'changes': changes,
+            'rosparam_yamls': rosparam_yamls,
+        }
@@ -0,0 +1,266 @@
+"""
+Lint of manifest trees
+ - discover_manifests: expand files, directories and glob patterns
+ - ManifestLinter: validate many manifests with a process pool and a result cache
+
+The manifests are parsed with the C yaml loader if PyYAML is built with
+libyaml. The diagnostics of each file are cached by the sha256 of its
+content (and of the validator), so unchanged files are not parsed again:
+
+    ~/.kuberos/cache/lint.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+
+import yaml
+
+from .kuberos_config import KuberosConfig
+from .manifest_validation import validate_manifest, Diagnostic, ERROR, SUPPORTED_KINDS
+from . import manifest_validation, param_sweep
+
+
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+MANIFEST_EXTENSIONS = ('.yaml', '.yml')
+
+
+def is_manifest(content: bytes) -> bool:
+    """
+    Check if a discovered yaml file is a manifest of a supported kind,
+    other yaml files in the tree (e.g. ROS parameter files) are skipped.
+    In a multi-document file, any document of a supported kind counts.
+    """
+    for line in content.splitlines():
+        if line.startswith(b'kind:'):
+            kind = line[len(b'kind:'):].split(b'#', 1)[0].strip().strip(b'\'"')
+            if kind.decode('utf-8', 'replace') in SUPPORTED_KINDS:
+                return True
+    return False
+
+
+def discover_manifests(paths: list):
+    """
+    Expand the given paths to manifest files
+
+    Args:
+        paths (list of str): files, directories (searched recursively for
+            .yaml/.yml files, hidden directories are skipped) or glob patterns,
+            '**' matches any number of directories
+
+    Returns:
+        files (list of (str, bool)): sorted (path, explicit) of the files, explicit
+            files are always linted, discovered files only if they have a supported kind
+        missing (list of str): paths that match no file
+    """
+    files = {}
+    missing = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+                for name in names:
+                    if name.endswith(MANIFEST_EXTENSIONS):
+                        files.setdefault(os.path.join(root, name), False)
+        elif os.path.isfile(path):
+            files[path] = True
+        elif glob.has_magic(path):
+            matches = [match for match in glob.glob(path, recursive=True)
+                       if os.path.isfile(match) and match.endswith(MANIFEST_EXTENSIONS)]
+            if not matches:
+                missing.append(path)
+            for match in matches:
+                files.setdefault(match, False)
+        else:
+            missing.append(path)
+    return sorted(files.items()), missing
+
+
+def lint_content(content: bytes) -> list:
+    """
+    Parse and validate the content of a manifest file. Each document of a
+    multi-document file is validated, the paths of the diagnostics of the
+    documents after the first are prefixed with the document index, e.g.
+    '#1:metadata.name', as `kuberos apply` names them.
+
+    Returns:
+        list of Diagnostic
+    """
+    try:
+        manifests = list(yaml.load_all(content, Loader=YAML_LOADER))  # nosec: safe loader
+    except yaml.YAMLError as exc:
+        message = str(exc).replace('\n', ' ')
+        return [Diagnostic(ERROR, 'yaml-error', '', f'Invalid yaml: {message}')]
+
+    documents = [(i, manifest) for i, manifest in enumerate(manifests) if manifest is not None]
+    if not documents:
+        # an empty file
+        return validate_manifest(None)
+    diagnostics = []
+    for i, manifest in documents:
+        for diagnostic in validate_manifest(manifest):
+            if i > 0:
+                path = f'#{i}:{diagnostic.path}' if diagnostic.path else f'#{i}'
+                diagnostic = diagnostic._replace(path=path)
+            diagnostics.append(diagnostic)
+    return diagnostics
+
+
+def _lint_batch(batch: list) -> list:
+    """
+    Lint a batch of (digest, content) in a worker process
+
+    Returns:
+        list of (digest, list of diagnostic tuples)
+    """
+    return [(digest, [tuple(diagnostic) for diagnostic in lint_content(content)])
+            for digest, content in batch]
+
+
+class ManifestLinter:
+    """
+    Validate manifest files, the files not cached are validated in a process pool
+
+    Example:
+        results = ManifestLinter().lint(['deployments/', 'fleets/*.yaml'])
+    """
+
+    # files validated per task of a worker process
+    BATCH_SIZE = 64
+    # below this number of files to validate, no process pool is started
+    MIN_POOL_FILES = 200
+    # max. number of cached results, least recently used are evicted
+    MAX_ENTRIES = 100000
+
+    def __init__(self, jobs: int = None, cache_path: str = None) -> None:
+        """
+        Args:
+            jobs (int, optional): number of worker processes, defaults to the number of CPUs
+            cache_path (str, optional): path of the cache file, '' disables the cache
+        """
+        self.jobs = jobs or os.cpu_count() or 1
+        if cache_path is None:
+            cache_path = self.get_cache_path()
+        self.cache_path = cache_path
+        self._cache = None
+        # statistics
+        self.num_cached = 0
+        self.num_validated = 0
+
+    @staticmethod
+    def get_cache_path() -> str:
+        """
+        Get the path of the lint cache file
+        """
+        config_dir = os.path.dirname(KuberosConfig.get_config_path())
+        return os.path.join(config_dir, 'cache', 'lint.json')
+
+    @staticmethod
+    def get_validator_digest() -> str:
+        """
+        Digest of the validator and linter source, cached results of another
+        version are not used
+        """
+        digest = hashlib.sha256()
+        for module in (manifest_validation, param_sweep, sys.modules[__name__]):
+            with open(module.__file__, 'rb') as file:
+                digest.update(file.read())
+        return digest.hexdigest()[:16]
+
+    def lint(self, paths: list):
+        """
+        Discover and validate the manifests
+
+        Returns:
+            results (list of (str, list of Diagnostic)): diagnostics by file, sorted by path
+            missing (list of str): paths that match no file
+        """
+        files, missing = discover_manifests(paths)
+        validator_digest = self.get_validator_digest()
+        cache = self._load_cache(validator_digest)
+        now = time.time()
+
+        digests = {}
+        pending = {}
+        results = {}
+        for path, explicit in files:
+            try:
+                with open(path, 'rb') as file:
+                    content = file.read()
+            except OSError as exc:
+                results[path] = [Diagnostic(ERROR, 'read-error', '',
+                                            f"Can't read the file: {exc.strerror}")]
+                continue
+            if not explicit and not is_manifest(content):
+                continue
+            digest = hashlib.sha256(content).hexdigest()
+            digests[path] = digest
+            if digest in cache['entries']:
+                cache['entries'][digest][0] = now
+                self.num_cached += 1
+            else:
+                pending[digest] = content
+
+        for digest, diagnostics in self._validate(pending):
+            cache['entries'][digest] = [now, diagnostics]
+        self.num_validated += len(pending)
+
+        for path, digest in digests.items():
+            results[path] = [Diagnostic(*diagnostic) for diagnostic in cache['entries'][digest][1]]
+        self._save_cache(cache)
+        return sorted(results.items()), missing
+
+    def _validate(self, pending: dict) -> list:
+        """
+        Validate the contents, in worker processes if there are many
+        """
+        items = list(pending.items())
+        if len(items) < self.MIN_POOL_FILES or self.jobs == 1:
+            return _lint_batch(items)
+
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        batches = [items[i:i + self.BATCH_SIZE] for i in range(0, len(items), self.BATCH_SIZE)]
+        results = []
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for batch_results in executor.map(_lint_batch, batches):
+                results.extend(batch_results)
+        return results
+
+    def _load_cache(self, validator_digest: str) -> dict:
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path:
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as file:
+                        self._cache = json.load(file)
+                except (OSError, ValueError):
+                    pass
+            if self._cache.get('validator', None) != validator_digest:
+                self._cache = {'validator': validator_digest, 'entries': {}}
+        return self._cache
+
+    def _save_cache(self, cache: dict):
+        """
+        Evict the least recently used results and write the cache file atomically
+        """
+        if not self.cache_path:
+            return
+        entries = cache['entries']
+        if len(entries) > self.MAX_ENTRIES:
+            lru_digests = sorted(entries, key=lambda digest: entries[digest][0])
+            for digest in lru_digests[:len(entries) - self.MAX_ENTRIES]:
+                del entries[digest]
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(cache, file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # the cache is optional, the files are validated again next time
+            pass
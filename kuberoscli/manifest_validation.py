@@ -0,0 +1,560 @@
+"""
+Offline validation of KubeROS manifests
+ - validate_manifest: check the structure and cross-references of a manifest
+ - Diagnostic: a problem found in a manifest
+
+Each manifest kind has a schema of nested field specs:
+
+    {'type': 'map', 'required': True, 'fields': {...}}
+    {'type': 'list', 'items': {...}}
+    {'type': 'str', 'choices': [...]}
+
+A schema is compiled once per kind into a tree of check functions, which are
+cached, so validating many manifests of the same kind does not interpret the
+schema again. After the structure, the cross-references within the manifest
+are checked, e.g. that the valueFrom of each rosParameters entry names an
+entry of the rosParamMap.
+"""
+
+import re
+import functools
+from collections import namedtuple
+
+from .param_sweep import SweepError, parse_sweep
+
+
+# severity: 'error' or 'warning', code: machine-readable kind of the problem,
+# path: location in the manifest, e.g. 'rosModules[0].preference[1]'
+Diagnostic = namedtuple('Diagnostic', ['severity', 'code', 'path', 'message'])
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# scheduling preferences of a ROS module
+PREFERENCES = ['onboard', 'edge', 'cloud']
+
+# roles of the hosts of a cluster inventory
+KUBEROS_ROLES = ['onboard', 'control-plane', 'edge', 'cloud']
+
+PARAM_TYPES = ['key-value', 'yaml']
+
+IMAGE_PULL_POLICIES = ['Always', 'IfNotPresent', 'Never']
+
+# {launch-parameters.init_topic}, parsed by yaml as a mapping if not quoted
+PLACEHOLDER_PATTERN = re.compile(r'^\{\s*([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+)\s*\}$')
+
+# kubernetes resource names (RFC 1123 label)
+NAME_PATTERN = re.compile(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?$')
+
+
+def _str(required=False, choices=None):
+    return {'type': 'str', 'required': required, 'choices': choices}
+
+
+def _scalar(required=False):
+    return {'type': 'scalar', 'required': required}
+
+
+def _bool(required=False):
+    return {'type': 'bool', 'required': required}
+
+
+def _map(fields=None, required=False, open_fields=False):
+    return {'type': 'map', 'required': required, 'fields': fields, 'open': open_fields}
+
+
+def _list(items=None, required=False):
+    return {'type': 'list', 'required': required, 'items': items}
+
+
+_ROS_MODULE = _map({
+    'name': _str(required=True),
+    'image': _str(required=True),
+    'containerRegistryName': _str(),
+    'entrypoint': _list(_str()),
+    'sourceWs': _str(),
+    'preference': _list(_str(choices=PREFERENCES)),
+    'launchParameters': _map(open_fields=True),
+    'requirements': _map({
+        'latency': _scalar(),
+        'dynamicRescheduling': _bool(),
+        'privilege': _bool(),
+        'peripheral': _list(_str()),
+        'nvidia': _bool(),
+        'containerRuntime': _str(),
+    }),
+    'rosParameters': _list(_map({
+        'name': _str(required=True),
+        'type': _str(required=True, choices=PARAM_TYPES),
+        'valueFrom': _str(required=True),
+        'mountPath': _str(),
+    })),
+    'staticFiles': _list(_map({
+        'name': _str(required=True),
+        'requiredBindType': _str(),
+        'hostpath': _str(),
+        'valueFrom': _str(required=True),
+    })),
+})
+
+_ROS_PARAM_MAP = _list(_map({
+    'name': _str(required=True),
+    'type': _str(required=True, choices=PARAM_TYPES),
+    'data': _map(open_fields=True),
+    'path': _str(),
+}))
+
+_STATIC_FILE_MAP = _list(_map({
+    'name': _str(required=True),
+}, open_fields=True))
+
+_CONTAINER_REGISTRY = _list(_map({
+    'name': _str(required=True),
+    'imagePullSecretName': _str(),
+    'imagePullPolicy': _str(choices=IMAGE_PULL_POLICIES),
+}))
+
+
+SCHEMAS = {
+    'ApplicationDeployment': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'name': _str(required=True),
+            'rosVersion': _str(),
+            'appVersion': _scalar(),
+            'targetFleet': _str(required=True),
+            'targetRobots': _list(_str()),
+            'edgeResourceGroup': _list(_str()),
+        }, required=True),
+        'rosModules': _list(_ROS_MODULE, required=True),
+        'rosParamMap': _ROS_PARAM_MAP,
+        'staticFileMap': _STATIC_FILE_MAP,
+        'containerRegistry': _CONTAINER_REGISTRY,
+    }, required=True),
+
+    # the batch job fields beyond the deployment are checked by the server
+    'BatchJob': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'name': _str(required=True),
+        }, required=True, open_fields=True),
+        'rosModules': _list(_ROS_MODULE),
+        'rosParamMap': _ROS_PARAM_MAP,
+        'staticFileMap': _STATIC_FILE_MAP,
+        'containerRegistry': _CONTAINER_REGISTRY,
+    }, required=True, open_fields=True),
+
+    'Fleet': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'name': _str(required=True),
+            'description': _str(),
+            'mainCluster': _str(required=True),
+        }, required=True),
+        'robot': _list(_map({
+            'name': _str(required=True),
+        }), required=True),
+    }, required=True),
+
+    'ClusterInventory': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'clusterName': _str(required=True),
+        }, required=True),
+        'hosts': _list(_map({
+            'hostname': _str(required=True),
+            'alias': _str(),
+            'accessIp': _str(),
+            'kuberosRole': _str(required=True, choices=KUBEROS_ROLES),
+            'onboardComputerGroup': _str(),
+            'shared': _bool(),
+            'locatedInRobot': _map({
+                'name': _str(required=True),
+                'robotId': _scalar(),
+            }),
+            'peripheralDevices': _list(_map({
+                'deviceName': _str(required=True),
+                'parameter': _map(open_fields=True),
+            })),
+        }), required=True),
+    }, required=True),
+
+    'ClusterRegistration': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'name': _str(required=True),
+            'distribution': _str(required=True),
+            'description': _str(),
+            'apiServer': _str(required=True),
+            'caCert': _str(required=True),
+            'serviceTokenAdmin': _str(required=True),
+        }, required=True),
+    }, required=True),
+
+    'RegistryToken': _map({
+        'apiVersion': _str(required=True),
+        'kind': _str(required=True),
+        'metadata': _map({
+            'name': _str(required=True),
+            'userName': _str(required=True),
+            'registryUrl': _str(required=True),
+            'token': _str(required=True),
+            'description': _str(required=True),
+        }, required=True),
+    }, required=True),
+}
+
+SUPPORTED_KINDS = sorted(SCHEMAS)
+
+
+def _join(path: str, key) -> str:
+    if isinstance(key, int):
+        return f'{path}[{key}]'
+    return f'{path}.{key}' if path else str(key)
+
+
+def _type_name(value) -> str:
+    if isinstance(value, dict):
+        return 'mapping'
+    if isinstance(value, list):
+        return 'list'
+    if value is None:
+        return 'null'
+    return type(value).__name__
+
+
+# checks of the value types, bool is not accepted as number
+_TYPE_CHECKS = {
+    'str': (lambda value: isinstance(value, str), 'a string'),
+    'bool': (lambda value: isinstance(value, bool), 'true or false'),
+    'scalar': (lambda value: isinstance(value, (str, int, float)), 'a scalar'),
+    'map': (lambda value: isinstance(value, dict), 'a mapping'),
+    'list': (lambda value: isinstance(value, list), 'a list'),
+}
+
+
+def compile_spec(spec: dict):
+    """
+    Compile a field spec into a check function
+
+    Returns:
+        callable: check(value, path, diagnostics) appending a Diagnostic per problem
+    """
+    is_type, expected = _TYPE_CHECKS[spec['type']]
+    choices = spec.get('choices', None)
+    checks = []
+
+    if spec['type'] == 'map':
+        fields = spec.get('fields', None) or {}
+        field_checks = {key: compile_spec(field) for key, field in fields.items()}
+        required = [key for key, field in fields.items() if field['required']]
+        open_fields = spec.get('open', False) or not fields
+
+        def check_map(value, path, diagnostics):
+            for key in required:
+                if key not in value or value[key] is None:
+                    diagnostics.append(Diagnostic(ERROR, 'missing-field', _join(path, key),
+                                                  f"Required field '{key}' is missing"))
+            for key, item in value.items():
+                field_check = field_checks.get(key, None)
+                if field_check is not None:
+                    if item is not None:
+                        field_check(item, _join(path, key), diagnostics)
+                elif not open_fields:
+                    diagnostics.append(Diagnostic(WARNING, 'unknown-field', _join(path, key),
+                                                  f"Unknown field '{key}'"))
+        checks.append(check_map)
+
+    elif spec['type'] == 'list' and spec.get('items', None) is not None:
+        item_check = compile_spec(spec['items'])
+
+        def check_list(value, path, diagnostics):
+            for i, item in enumerate(value):
+                if item is None:
+                    diagnostics.append(Diagnostic(ERROR, 'invalid-type', _join(path, i),
+                                                  'Empty list item'))
+                else:
+                    item_check(item, _join(path, i), diagnostics)
+        checks.append(check_list)
+
+    def check(value, path, diagnostics):
+        if not is_type(value):
+            diagnostics.append(Diagnostic(ERROR, 'invalid-type', path,
+                                          f'Expected {expected}, got {_type_name(value)}'))
+            return
+        if choices is not None and value not in choices:
+            diagnostics.append(Diagnostic(ERROR, 'invalid-value', path,
+                                          f"Invalid value '{value}', expected one of: "
+                                          f"{', '.join(choices)}"))
+        for sub_check in checks:
+            sub_check(value, path, diagnostics)
+
+    return check
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(kind: str):
+    """
+    Get the compiled check function of a manifest kind, None if the kind is not supported
+    """
+    if kind not in SCHEMAS:
+        return None
+    return compile_spec(SCHEMAS[kind])
+
+
+def _list_of_maps(value) -> list:
+    """
+    Get the (index, item) of the mappings in a list field, other values are ignored
+    """
+    if not isinstance(value, list):
+        return []
+    return [(i, item) for i, item in enumerate(value) if isinstance(item, dict)]
+
+
+def _map_of(value) -> dict:
+    """
+    Get a mapping field, other values are ignored (reported by the schema check)
+    """
+    return value if isinstance(value, dict) else {}
+
+
+def _check_duplicates(items: list, path: str, key: str, severity: str, diagnostics: list):
+    seen = set()
+    for i, item in items:
+        name = item.get(key, None)
+        if not isinstance(name, str):
+            continue
+        if name in seen:
+            diagnostics.append(Diagnostic(severity, 'duplicate-name', _join(_join(path, i), key),
+                                          f"Duplicate name '{name}'"))
+        seen.add(name)
+
+
+def _parse_placeholder(value):
+    """
+    Get the (source, key) of a launch parameter placeholder, None if it is a plain value
+    """
+    if isinstance(value, dict) and len(value) == 1:
+        (text, empty), = value.items()
+        if empty is None and isinstance(text, str):
+            match = PLACEHOLDER_PATTERN.match('{' + text + '}')
+            return (match.group(1), match.group(2)) if match else (text, None)
+    if isinstance(value, str):
+        match = PLACEHOLDER_PATTERN.match(value.strip())
+        if match:
+            return match.group(1), match.group(2)
+    return None
+
+
+def _check_ros_modules(manifest: dict, diagnostics: list):
+    """
+    Check the references of the ROS modules to the rosParamMap,
+    staticFileMap and containerRegistry sections
+    """
+    param_map = {item['name']: item for _, item in _list_of_maps(manifest.get('rosParamMap'))
+                 if isinstance(item.get('name', None), str)}
+    static_files = {item['name'] for _, item in _list_of_maps(manifest.get('staticFileMap'))
+                    if isinstance(item.get('name', None), str)}
+    registries = None
+    if isinstance(manifest.get('containerRegistry', None), list):
+        registries = {item.get('name', None)
+                      for _, item in _list_of_maps(manifest['containerRegistry'])}
+
+    modules = _list_of_maps(manifest.get('rosModules'))
+    _check_duplicates(modules, 'rosModules', 'name', ERROR, diagnostics)
+    _check_duplicates(_list_of_maps(manifest.get('rosParamMap')),
+                      'rosParamMap', 'name', ERROR, diagnostics)
+
+    for i, module in modules:
+        path = _join('rosModules', i)
+
+        if isinstance(module.get('preference', None), list) and not module['preference']:
+            diagnostics.append(Diagnostic(ERROR, 'invalid-value', _join(path, 'preference'),
+                                          f"Empty preference, expected one or more of: "
+                                          f"{', '.join(PREFERENCES)}"))
+
+        registry = module.get('containerRegistryName', None)
+        if isinstance(registry, str) and registries is not None and registry not in registries:
+            diagnostics.append(Diagnostic(ERROR, 'unresolved-reference',
+                                          _join(path, 'containerRegistryName'),
+                                          f"Container registry '{registry}' is not defined "
+                                          "in containerRegistry"))
+
+        # rosParameters.valueFrom -> rosParamMap
+        ros_params = {}
+        for j, param in _list_of_maps(module.get('rosParameters')):
+            param_path = _join(_join(path, 'rosParameters'), j)
+            if isinstance(param.get('name', None), str):
+                ros_params[param['name']] = param
+            source = param.get('valueFrom', None)
+            if not isinstance(source, str):
+                continue
+            if source not in param_map:
+                diagnostics.append(Diagnostic(ERROR, 'unresolved-reference',
+                                              _join(param_path, 'valueFrom'),
+                                              f"'{source}' is not defined in rosParamMap"))
+            elif param.get('type', None) != param_map[source].get('type', None):
+                diagnostics.append(Diagnostic(ERROR, 'type-mismatch',
+                                              _join(param_path, 'type'),
+                                              f"Type '{param.get('type')}' does not match the "
+                                              f"type '{param_map[source].get('type')}' of "
+                                              f"rosParamMap entry '{source}'"))
+            if param.get('type', None) == 'yaml' and 'mountPath' not in param:
+                diagnostics.append(Diagnostic(ERROR, 'missing-field',
+                                              _join(param_path, 'mountPath'),
+                                              "Required field 'mountPath' of a yaml parameter "
+                                              "is missing"))
+
+        # staticFiles.valueFrom -> staticFileMap
+        for j, static_file in _list_of_maps(module.get('staticFiles')):
+            source = static_file.get('valueFrom', None)
+            if isinstance(source, str) and source not in static_files:
+                diagnostics.append(Diagnostic(ERROR, 'unresolved-reference',
+                                              _join(_join(_join(path, 'staticFiles'), j),
+                                                    'valueFrom'),
+                                              f"'{source}' is not defined in staticFileMap"))
+
+        # launchParameters placeholders -> rosParameters -> rosParamMap data
+        launch_params = module.get('launchParameters', None)
+        if not isinstance(launch_params, dict):
+            continue
+        peripherals = _map_of(module.get('requirements', None)).get('peripheral', None)
+        if not isinstance(peripherals, list):
+            peripherals = []
+        for name, value in launch_params.items():
+            placeholder = _parse_placeholder(value)
+            if placeholder is None:
+                continue
+            param_path = _join(_join(path, 'launchParameters'), name)
+            source, key = placeholder
+            if key is None:
+                diagnostics.append(Diagnostic(ERROR, 'invalid-value', param_path,
+                                              f"Invalid placeholder '{{{source}}}', expected "
+                                              "{<rosParameters name>.<key>}"))
+            elif source.isupper():
+                # hardware specific parameter, resolved from the peripheral device of the host
+                device = source.lower().replace('_', '-')
+                if device not in [str(peripheral).lower() for peripheral in peripherals]:
+                    diagnostics.append(Diagnostic(WARNING, 'unresolved-reference', param_path,
+                                                  f"Device '{device}' of '{{{source}.{key}}}' "
+                                                  "is not listed in requirements.peripheral"))
+            elif source not in ros_params:
+                diagnostics.append(Diagnostic(ERROR, 'unresolved-reference', param_path,
+                                              f"'{{{source}.{key}}}': '{source}' is not defined "
+                                              "in rosParameters of the module"))
+            else:
+                entry = param_map.get(ros_params[source].get('valueFrom', None), None)
+                data = entry.get('data', None) if entry is not None else None
+                if entry is not None and (not isinstance(data, dict) or key not in data):
+                    diagnostics.append(Diagnostic(ERROR, 'unresolved-reference', param_path,
+                                                  f"'{{{source}.{key}}}': '{key}' is not defined "
+                                                  f"in the data of rosParamMap entry "
+                                                  f"'{entry.get('name')}'"))
+
+    for i, item in _list_of_maps(manifest.get('rosParamMap')):
+        path = _join('rosParamMap', i)
+        if item.get('type', None) == 'yaml' and 'path' not in item:
+            diagnostics.append(Diagnostic(ERROR, 'missing-field', _join(path, 'path'),
+                                          "Required field 'path' of a yaml parameter "
+                                          "file is missing"))
+        elif item.get('type', None) == 'key-value' and not isinstance(item.get('data'), dict):
+            diagnostics.append(Diagnostic(ERROR, 'missing-field', _join(path, 'data'),
+                                          "Required field 'data' of key-value parameters "
+                                          "is missing"))
+
+
+def _check_name(manifest: dict, diagnostics: list):
+    name = _map_of(manifest.get('metadata', None)).get('name', None)
+    if isinstance(name, str) and not NAME_PATTERN.match(name):
+        diagnostics.append(Diagnostic(WARNING, 'invalid-name', 'metadata.name',
+                                      f"Name '{name}' is not a valid resource name "
+                                      "(lower case alphanumeric characters or '-')"))
+
+
+def _check_sweep(manifest: dict, diagnostics: list):
+    """
+    Check the sweep section of a batch job, see param_sweep
+    """
+    try:
+        parse_sweep(manifest)
+    except SweepError as exc:
+        diagnostics.append(Diagnostic(ERROR, 'invalid-sweep', exc.path, str(exc)))
+
+
+def _check_fleet(manifest: dict, diagnostics: list):
+    _check_duplicates(_list_of_maps(manifest.get('robot')), 'robot', 'name',
+                      ERROR, diagnostics)
+
+
+def _check_cluster_inventory(manifest: dict, diagnostics: list):
+    hosts = _list_of_maps(manifest.get('hosts'))
+    _check_duplicates(hosts, 'hosts', 'hostname', ERROR, diagnostics)
+    for i, host in hosts:
+        if host.get('kuberosRole', None) == 'onboard' and 'locatedInRobot' not in host:
+            diagnostics.append(Diagnostic(WARNING, 'missing-field',
+                                          _join(_join('hosts', i), 'locatedInRobot'),
+                                          "Onboard host without 'locatedInRobot'"))
+
+
+# checks of the cross-references, by kind
+CROSS_CHECKS = {
+    'ApplicationDeployment': [_check_name, _check_ros_modules],
+    'BatchJob': [_check_name, _check_ros_modules, _check_sweep],
+    'Fleet': [_check_fleet],
+    'ClusterInventory': [_check_cluster_inventory],
+}
+
+
+def validate_manifest(manifest, expected_kinds: list = None) -> list:
+    """
+    Validate a parsed manifest
+
+    Args:
+        manifest: the parsed yaml document
+        expected_kinds (list of str, optional): kinds accepted by the command
+
+    Returns:
+        list of Diagnostic, empty if the manifest is valid
+    """
+    if not isinstance(manifest, dict):
+        return [Diagnostic(ERROR, 'invalid-type', '',
+                           f'Expected a manifest mapping, got {_type_name(manifest)}')]
+
+    kind = manifest.get('kind', None)
+    if kind is None:
+        return [Diagnostic(ERROR, 'missing-field', 'kind', "Required field 'kind' is missing")]
+    if expected_kinds is not None and kind not in expected_kinds:
+        return [Diagnostic(ERROR, 'unexpected-kind', 'kind',
+                           f"Expected kind {' or '.join(expected_kinds)}, got '{kind}'")]
+    validator = get_validator(kind) if isinstance(kind, str) else None
+    if validator is None:
+        return [Diagnostic(ERROR, 'unknown-kind', 'kind',
+                           f"Unknown kind '{kind}', expected one of: "
+                           f"{', '.join(SUPPORTED_KINDS)}")]
+
+    diagnostics = []
+    validator(manifest, '', diagnostics)
+    for cross_check in CROSS_CHECKS.get(kind, []):
+        cross_check(manifest, diagnostics)
+    return diagnostics
+
+
+def has_errors(diagnostics: list) -> bool:
+    """
+    Check if any diagnostic is an error
+    """
+    return any(diagnostic.severity == ERROR for diagnostic in diagnostics)
+
+
+def format_diagnostic(file_path: str, diagnostic: Diagnostic) -> str:
+    """
+    Format a diagnostic as '<file>: <severity>: <path>: <message> [<code>]'
+    """
+    location = f'{diagnostic.path}: ' if diagnostic.path else ''
+    return (f'{file_path}: {diagnostic.severity}: {location}'
+            f'{diagnostic.message} [{diagnostic.code}]')
@@ -0,0 +1,137 @@
+"""
+Output formats of the command results
+ - table: default human readable tables of each command
+ - wide:  table with all fields of the response
+ - name:  resource names only, one per line
+ - json, jsonl, yaml, csv: machine readable, written directly from the
+   decoded response without building a table
+"""
+
+import sys
+import csv
+import json
+import yaml
+
+
+OUTPUT_FORMATS = ['table', 'wide', 'name', 'json', 'jsonl', 'yaml', 'csv']
+
+YamlDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def add_output_argument(parser):
+    """
+    Add the -o --output argument to a command parser
+    """
+    parser.add_argument('-o', '--output',
+                        choices=OUTPUT_FORMATS,
+                        default='table',
+                        help='Output format (default: table)')
+
+
+def _to_cell(value):
+    """
+    Convert a nested value to a single csv / table cell
+    """
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def write_records(records,
+                  output_format: str,
+                  name_field: str = 'name',
+                  stream=None):
+    """
+    Write a list of resources in a structured or the wide format.
+    Records are written one by one as they are consumed from the iterable.
+
+    Args:
+        records (iterable of dict): decoded resources from the API server
+        output_format (str): one of OUTPUT_FORMATS except 'table'
+        name_field (str): key of the resource name, for the 'name' format
+        stream (file, optional): defaults to sys.stdout
+    """
+    if stream is None:
+        stream = sys.stdout
+
+    if output_format == 'name':
+        for record in records:
+            if record.get(name_field, None) is not None:
+                stream.write(f'{record[name_field]}\n')
+
+    elif output_format == 'jsonl':
+        for record in records:
+            stream.write(json.dumps(record))
+            stream.write('\n')
+            stream.flush()
+
+    elif output_format == 'json':
+        # nothing is written if the first page of the records fails
+        is_empty = True
+        for record in records:
+            stream.write('[\n  ' if is_empty else ',\n  ')
+            stream.write(json.dumps(record))
+            is_empty = False
+        stream.write('[]\n' if is_empty else '\n]\n')
+
+    elif output_format == 'yaml':
+        is_empty = True
+        for record in records:
+            # each record is dumped as an item of the same sequence
+            stream.write(yaml.dump([record], Dumper=YamlDumper,
+                                   default_flow_style=False, sort_keys=False))
+            is_empty = False
+        if is_empty:
+            stream.write('[]\n')
+
+    elif output_format == 'csv':
+        writer = None
+        for record in records:
+            if writer is None:
+                writer = csv.DictWriter(stream,
+                                        fieldnames=list(record),
+                                        extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow({key: _to_cell(value) for key, value in record.items()})
+
+    elif output_format == 'wide':
+        # only the wide format needs tabulate, a slow import at start up
+        from tabulate import tabulate  # pylint: disable=import-outside-toplevel
+        data_to_display = [{key: _to_cell(value) for key, value in record.items()}
+                           for record in records]
+        stream.write(tabulate(data_to_display, headers="keys", tablefmt='plain'))
+        stream.write('\n')
+
+    else:
+        raise ValueError(f'Unsupported output format: {output_format}')
+
+
+def write_object(obj,
+                 output_format: str,
+                 name_field: str = 'name',
+                 stream=None):
+    """
+    Write a single resource or response in a structured or the wide format
+
+    Args:
+        obj: decoded response data
+        output_format (str): one of OUTPUT_FORMATS except 'table'
+        name_field (str): key of the resource name, for the 'name' format
+        stream (file, optional): defaults to sys.stdout
+    """
+    if stream is None:
+        stream = sys.stdout
+
+    if output_format == 'json':
+        stream.write(json.dumps(obj, indent=2))
+        stream.write('\n')
+    elif output_format == 'jsonl':
+        stream.write(json.dumps(obj))
+        stream.write('\n')
+    elif output_format == 'yaml':
+        stream.write(yaml.dump(obj, Dumper=YamlDumper,
+                               default_flow_style=False, sort_keys=False))
+    elif isinstance(obj, dict):
+        write_records([obj], output_format, name_field=name_field, stream=stream)
+    else:
+        stream.write(f'{obj}\n')
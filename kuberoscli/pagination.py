@@ -0,0 +1,165 @@
+"""
+Pagination of the list endpoints
+
+The API server may return a list in pages, in one of these forms:
+ - a link to the next page: {'results': [...], 'next': url}
+ - a cursor: {'results': [...], 'next_cursor': cursor}
+ - limit/offset with a total count: {'results': [...], 'count': n}
+The page can also be wrapped in the response envelope {'status': ..., 'data': ...}
+or carry the pagination fields in the envelope. A plain list is a single page,
+so servers without pagination are supported as well.
+"""
+
+from collections import namedtuple
+from urllib.parse import urljoin
+
+from .transport import KuberosTransport, ApiError
+
+
+# items of a page and the fields to request the next page
+Page = namedtuple('Page', ['items', 'next_url', 'next_cursor', 'count'])
+
+
+def parse_page(response) -> Page:
+    """
+    Get the items and pagination fields of a list response
+
+    Raises:
+        ApiError: the response status is not 'success'
+    """
+    container = response
+    items = response
+    if isinstance(response, dict) and 'status' in response:
+        if response['status'] != 'success':
+            raise ApiError(f"[Error] {response.get('errors', response)}")
+        items = response.get('data', None)
+    if isinstance(items, dict) and 'results' in items:
+        container = items
+        items = items['results']
+
+    if items is None:
+        items = []
+    if not isinstance(container, dict):
+        return Page(items, None, None, None)
+    # the count is only used for the offset if the server sends no next page
+    count = None
+    if 'next' not in container and 'next_cursor' not in container:
+        count = container.get('count', None)
+    return Page(items,
+                container.get('next', None),
+                container.get('next_cursor', None),
+                count)
+
+
+class Paginator:
+    """
+    Iterate over the items of a list endpoint, page by page.
+    The next page is requested while the items of the current page are
+    consumed, at most two pages are kept in memory.
+
+    Example:
+        for item in Paginator(url, headers=headers, limit=100):
+            ...
+    """
+
+    DEFAULT_PAGE_SIZE = 500
+
+    def __init__(self,
+                 url: str,
+                 headers: dict = None,
+                 page_size: int = None,
+                 limit: int = None,
+                 timeout: float = None,
+                 first_page=None) -> None:
+        """
+        Args:
+            url (str): url of the list endpoint
+            headers (dict, optional): request headers, e.g. the authorization
+            page_size (int, optional): number of items requested per page
+            limit (int, optional): max. number of items in total
+            timeout (float, optional): timeout of each request in seconds
+            first_page (optional): response of the first page, if already requested
+        """
+        self.url = url
+        self.headers = headers
+        self.page_size = page_size or self.DEFAULT_PAGE_SIZE
+        if limit is not None:
+            self.page_size = max(1, min(self.page_size, limit))
+        self.limit = limit
+        self.timeout = timeout
+        self.first_page = first_page
+
+    def get_first_params(self) -> dict:
+        """
+        Query parameters of the first page.
+        Both limit/offset and page size parameter names are sent, servers
+        without pagination ignore them.
+        """
+        return {'limit': self.page_size, 'page_size': self.page_size}
+
+    def fetch(self, url: str, params: dict = None) -> Page:
+        """
+        Request a single page
+        """
+        response = KuberosTransport.call_json('GET',
+                                              url,
+                                              params=params,
+                                              headers=self.headers,
+                                              timeout=self.timeout)
+        return parse_page(response)
+
+    def get_next_request(self, page: Page, offset: int):
+        """
+        Get the (url, params) of the page after the given page, None if it is the last one
+
+        Args:
+            page (Page): the current page
+            offset (int): number of items up to and including the current page
+        """
+        if not page.items:
+            return None
+        if page.next_url:
+            return urljoin(self.url, page.next_url), None
+        if page.next_cursor:
+            return self.url, {'cursor': page.next_cursor, 'page_size': self.page_size}
+        if page.count is not None and offset < page.count:
+            return self.url, {'offset': offset, 'limit': self.page_size}
+        return None
+
+    def pages(self):
+        """
+        Generator of the item lists of the pages, the next page is prefetched
+        """
+        if self.first_page is not None:
+            page = parse_page(self.first_page)
+        else:
+            page = self.fetch(self.url, self.get_first_params())
+
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            offset = 0
+            while True:
+                if self.limit is not None:
+                    page = page._replace(items=page.items[:self.limit - offset])
+                offset += len(page.items)
+                next_request = self.get_next_request(page, offset)
+                if self.limit is not None and offset >= self.limit:
+                    next_request = None
+                prefetch = None
+                if next_request is not None:
+                    prefetch = executor.submit(self.fetch, *next_request)
+
+                yield page.items
+
+                if prefetch is None:
+                    return
+                page = prefetch.result()
+        finally:
+            # don't wait for a prefetched page that is not needed anymore
+            executor.shutdown(wait=False)
+
+    def __iter__(self):
+        for items in self.pages():
+            yield from items
@@ -0,0 +1,215 @@
+"""
+Content-addressed upload of the ROS parameter files
+
+Instead of sending the full text of every parameter file with each
+deployment request, the client asks the API server which contents it
+lacks and uploads only those, then references the files by sha256 digest:
+
+    POST api/v1/param_blobs/missing/   {'digests': [...]} -> {'data': {'missing': [...]}}
+    POST api/v1/param_blobs/           {'blobs': [{'digest': ..., 'content': ...}]}
+                                       gzip compressed if large
+
+    rosparam_yamls: [{'name': 'param', 'type': 'yaml', 'content_sha256': {'param': digest}}]
+
+Servers without these endpoints get the full contents, as before. A
+server that answers missing/ with 404, 405 or 501, or with a 2xx response
+without the list of missing digests, is remembered for a day, so the check
+costs no extra request. Other errors fall back to the contents of this
+request only, e.g. a 503 while the server restarts.
+"""
+
+import os
+import json
+import gzip
+import time
+
+from .endpoints import Endpoints
+from .json_stream import loads
+from .transport import KuberosTransport, ApiError, CONNECTION_ERROR_MESSAGE
+
+
+class ParamBlobUploader:
+    """
+    Upload the parameter files missing on the API server
+
+    Example:
+        uploader = ParamBlobUploader(config['server'], config['token'])
+        rosparam_yamls = uploader.get_rosparam_yamls(param_files)
+    """
+
+    # uploads larger than this (bytes) are gzip compressed
+    GZIP_MIN_SIZE = 16 * 1024
+    # max. uncompressed size (bytes) of the contents uploaded in one request
+    MAX_UPLOAD_SIZE = 8 * 1024 * 1024
+    # seconds a server without the endpoints is not asked again
+    UNSUPPORTED_TTL = 24 * 3600
+    # http status of a server without the endpoints
+    UNSUPPORTED_STATUS = {404, 405, 501}
+
+    def __init__(self, server: str, auth_token: str, cache_dir: str = None) -> None:
+        """
+        Args:
+            server (str): url of the API server
+            auth_token (str): user token
+            cache_dir (str, optional): directory of the file that remembers the
+                servers without the endpoints, '' to always ask the server
+        """
+        self.server = server
+        self.headers = {'Authorization': 'Token ' + auth_token}
+        self.cache_dir = cache_dir
+        # statistics
+        self.num_uploaded = 0
+        self.bytes_uploaded = 0
+
+    def get_rosparam_yamls(self, param_files: list) -> list:
+        """
+        Upload the missing contents and get the 'rosparam_yamls' of the request,
+        referencing the contents by digest. Falls back to the full contents if
+        the server does not support it.
+
+        Args:
+            param_files (list of ParamFile): the loaded parameter files
+        """
+        if param_files and self.upload_missing(param_files):
+            return [{
+                'name': param_file.name,
+                'type': 'yaml',
+                'content_sha256': {
+                    param_file.name: param_file.digest,
+                },
+            } for param_file in param_files]
+
+        return [{
+            'name': param_file.name,
+            'type': 'yaml',
+            'content': {
+                param_file.name: param_file.content,
+            },
+        } for param_file in param_files]
+
+    def upload_missing(self, param_files: list) -> bool:
+        """
+        Upload the contents the API server lacks
+
+        Returns:
+            bool: False if the server does not support content references
+                or the upload failed
+        """
+        if self._is_unsupported():
+            return False
+
+        contents = {param_file.digest: param_file.content for param_file in param_files}
+        try:
+            missing = self._find_missing(list(contents))
+            if missing is None:
+                self._set_unsupported()
+                return False
+
+            batch, batch_size = [], 0
+            for digest in missing:
+                if digest not in contents:
+                    continue
+                batch.append({'digest': digest, 'content': contents[digest]})
+                batch_size += len(contents[digest])
+                if batch_size >= self.MAX_UPLOAD_SIZE:
+                    self._upload(batch)
+                    batch, batch_size = [], 0
+            if batch:
+                self._upload(batch)
+
+        except ApiError:
+            # e.g. a connection or server error, the server is asked again next time
+            return False
+        return True
+
+    def _find_missing(self, digests: list) -> list:
+        """
+        Ask the API server which contents it lacks
+
+        Returns:
+            list of str: digests of the missing contents, None if the server
+                does not support content references
+
+        Raises:
+            ApiError: the server can't be reached or answered with another error
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        try:
+            # a redirect, e.g. to a login page, is not followed
+            resp = KuberosTransport.request('POST',
+                                            f"{self.server}/{Endpoints.PARAM_BLOBS_MISSING}",
+                                            json={'digests': digests},
+                                            headers=self.headers,
+                                            allow_redirects=False)
+        except requests.exceptions.RequestException as exc:
+            raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+        if resp.status_code in self.UNSUPPORTED_STATUS:
+            return None
+        if not 200 <= resp.status_code < 300:
+            raise KuberosTransport.get_http_error(resp)
+        try:
+            response = loads(resp.content)
+            if response['status'] != 'success':
+                return None
+            return list(response['data']['missing'])
+        except (ValueError, KeyError, TypeError):
+            # unexpected response
+            return None
+
+    def _upload(self, blobs: list):
+        """
+        Upload a batch of contents, gzip compressed if large
+
+        Raises:
+            ApiError: the upload failed
+        """
+        body = json.dumps({'blobs': blobs}).encode('utf-8')
+        headers = dict(self.headers)
+        headers['Content-Type'] = 'application/json'
+        if len(body) >= self.GZIP_MIN_SIZE:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        response = KuberosTransport.call_json('POST',
+                                              f"{self.server}/{Endpoints.PARAM_BLOBS}",
+                                              data=body,
+                                              headers=headers)
+        if response.get('status', None) != 'success':
+            raise ApiError(f"[Error] {response.get('errors', response)}")
+        self.num_uploaded += len(blobs)
+        self.bytes_uploaded += len(body)
+
+    def _get_unsupported_path(self) -> str:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, 'unsupported_servers.json')
+
+    def _load_unsupported(self) -> dict:
+        path = self._get_unsupported_path()
+        if path is None:
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _is_unsupported(self) -> bool:
+        checked = self._load_unsupported().get(self.server, None)
+        return checked is not None and time.time() - checked < self.UNSUPPORTED_TTL
+
+    def _set_unsupported(self):
+        path = self._get_unsupported_path()
+        if path is None:
+            return
+        servers = self._load_unsupported()
+        servers[self.server] = time.time()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(servers, file)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the server is asked again next time
+            pass
@@ -0,0 +1,265 @@
+"""
+Loading of the ROS parameter files referenced in the rosParamMap of a manifest
+ - ParamFileLoader: reads the files concurrently, with content hashes and a local cache
+ - ParamFileError: a parameter file is missing or not specified
+
+Relative paths are resolved against the directory of the manifest file.
+The files are read with a thread pool, since manifests can reference
+hundreds of files on network filesystems. Each file is hashed (sha256) and
+its content is cached locally, keyed by path, mtime and size, so submitting
+the same manifest again only stats the files:
+
+    ~/.kuberos/cache/params/index.json      path -> mtime, size, digest
+    ~/.kuberos/cache/params/<digest>        file content
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import namedtuple
+
+from .kuberos_config import KuberosConfig
+
+
+# a loaded parameter file of the rosParamMap
+ParamFile = namedtuple('ParamFile', ['name', 'path', 'content', 'digest'])
+
+
+class ParamFileError(Exception):
+    """
+    A parameter file of the rosParamMap can't be loaded
+    """
+
+
+class ParamFileLoader:
+    """
+    Load the yaml files of a rosParamMap
+
+    Example:
+        files = ParamFileLoader().load(manifest, manifest_path='app/deploy.yaml')
+        rosparam_yamls = ParamFileLoader.to_rosparam_yamls(files)
+    """
+
+    # max. number of files read concurrently
+    MAX_WORKERS = 16
+    # max. number of cached files, least recently used are evicted
+    MAX_ENTRIES = 4096
+
+    def __init__(self, cache_dir: str = None, max_workers: int = None) -> None:
+        """
+        Args:
+            cache_dir (str, optional): defaults to the cache directory next to the
+                config file, '' disables the cache
+            max_workers (int, optional): max. number of files read concurrently
+        """
+        if cache_dir is None:
+            cache_dir = self.get_cache_dir()
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self._index = None
+        self._changed = False
+        # statistics
+        self.num_cached = 0
+        self.num_read = 0
+
+    @staticmethod
+    def get_cache_dir() -> str:
+        """
+        Get the directory of the parameter file cache
+        """
+        config_dir = os.path.dirname(KuberosConfig.get_config_path())
+        return os.path.join(config_dir, 'cache', 'params')
+
+    @staticmethod
+    def resolve_path(path: str, manifest_path: str = None) -> str:
+        """
+        Resolve the path of a parameter file, relative paths are relative
+        to the directory of the manifest (or the working directory)
+        """
+        path = os.path.expanduser(path)
+        if not os.path.isabs(path) and manifest_path:
+            path = os.path.join(os.path.dirname(manifest_path), path)
+        return os.path.abspath(path)
+
+    @staticmethod
+    def get_yaml_items(deploy_content: dict) -> list:
+        """
+        Get the entries of type yaml of the rosParamMap
+
+        Raises:
+            ParamFileError: the path of an entry is not specified
+        """
+        items = []
+        for item in deploy_content.get('rosParamMap', None) or []:
+            if item['type'] != 'yaml':
+                continue
+            if 'path' not in item:
+                raise ParamFileError(
+                    f"Parameter file path in {item['name']} is not specified.")
+            items.append(item)
+        return items
+
+    def load(self, deploy_content: dict, manifest_path: str = None) -> list:
+        """
+        Load the yaml files of the rosParamMap, in the order of the manifest
+
+        Args:
+            deploy_content (dict): deployment manifest
+            manifest_path (str, optional): path of the manifest file
+
+        Returns:
+            list of ParamFile
+
+        Raises:
+            ParamFileError: a file is missing or its path is not specified
+        """
+        items = self.get_yaml_items(deploy_content)
+        if not items:
+            return []
+        paths = [self.resolve_path(item['path'], manifest_path) for item in items]
+        # load the index before the files are read concurrently
+        self._get_index()
+
+        if len(items) == 1:
+            loaded = [self._load_file(paths[0], items[0]['path'])]
+        else:
+            # pylint: disable=import-outside-toplevel
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+                loaded = list(executor.map(self._load_file,
+                                           paths,
+                                           [item['path'] for item in items]))
+        self._save_index()
+        return [ParamFile(item['name'], path, content, digest)
+                for item, path, (content, digest) in zip(items, paths, loaded)]
+
+    @staticmethod
+    def to_rosparam_yamls(param_files: list) -> list:
+        """
+        Convert the loaded files to the 'rosparam_yamls' of the API request
+
+        Returns:
+            list of dict:
+                {
+                    'name': parameter map name,
+                    'type': 'yaml',
+                    'content': {
+                        'ros parameter file name': 'file content'
+                    }
+                }
+        """
+        return [{
+            'name': param_file.name,
+            'type': 'yaml',
+            'content': {
+                param_file.name: param_file.content,
+            },
+        } for param_file in param_files]
+
+    def _load_file(self, path: str, manifest_entry: str):
+        """
+        Get the (content, digest) of a file, from the cache if it did not change
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError as exc:
+            raise ParamFileError(f"Parameter file: {manifest_entry} not found.") from exc
+        except OSError as exc:
+            raise ParamFileError(f"Parameter file: {manifest_entry} can't be read: {exc}") from exc
+
+        entry = self._get_index().get(path, None)
+        if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            content = self._read_blob(entry['digest'])
+            if content is not None:
+                entry['used'] = time.time()
+                self._changed = True
+                self.num_cached += 1
+                return content, entry['digest']
+
+        try:
+            with open(path, 'r', encoding='utf-8') as yaml_file:
+                # read the file content, don't parse it to dict
+                content = yaml_file.read()
+        except FileNotFoundError as exc:
+            raise ParamFileError(f"Parameter file: {manifest_entry} not found.") from exc
+        except (OSError, UnicodeDecodeError) as exc:
+            raise ParamFileError(f"Parameter file: {manifest_entry} can't be read: {exc}") from exc
+        self.num_read += 1
+
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        self._write_blob(digest, content)
+        self._get_index()[path] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'digest': digest,
+            'used': time.time(),
+        }
+        self._changed = True
+        return content, digest
+
+    def _get_index(self) -> dict:
+        if self._index is None:
+            self._index = {}
+            if self.cache_dir:
+                try:
+                    with open(os.path.join(self.cache_dir, 'index.json'), 'r',
+                              encoding='utf-8') as file:
+                        self._index = json.load(file)
+                except (OSError, ValueError):
+                    pass
+        return self._index
+
+    def _read_blob(self, digest: str) -> str:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, digest), 'r', encoding='utf-8') as file:
+                return file.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _write_blob(self, digest: str, content: str):
+        if not self.cache_dir:
+            return
+        blob_path = os.path.join(self.cache_dir, digest)
+        if os.path.exists(blob_path):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{blob_path}.{os.getpid()}.{id(content)}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(content)
+            os.replace(tmp_path, blob_path)
+        except OSError:
+            # the cache is optional, the files are read again next time
+            pass
+
+    def _save_index(self):
+        """
+        Evict the least recently used files and write the index atomically
+        """
+        if not self.cache_dir or not self._changed:
+            return
+        index = self._get_index()
+        if len(index) > self.MAX_ENTRIES:
+            lru_paths = sorted(index, key=lambda path: index[path]['used'])
+            evicted = [index.pop(path) for path in lru_paths[:len(index) - self.MAX_ENTRIES]]
+            in_use = {entry['digest'] for entry in index.values()}
+            for entry in evicted:
+                if entry['digest'] not in in_use:
+                    try:
+                        os.remove(os.path.join(self.cache_dir, entry['digest']))
+                    except OSError:
+                        pass
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            index_path = os.path.join(self.cache_dir, 'index.json')
+            tmp_path = f'{index_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(index, file)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass
+        self._changed = False
@@ -0,0 +1,301 @@
+"""
+Parameter sweeps of batch jobs
+ - Sweep: lazily expand the sweep section of a manifest into variants
+ - SweepProgress: variants already submitted, to resume an interrupted campaign
+
+The sweep section of a BatchJob manifest lists the values of launch
+parameters and of the data of key-value rosParamMap entries:
+
+    sweep:
+      mode: cartesian      # or zip, default: cartesian
+      parameters:
+        launchParameters.planner.max_speed: [0.5, 1.0, 1.5]
+        rosParamMap.nav-params.inflation_radius: [0.2, 0.4]
+
+'cartesian' combines each value of a parameter with each value of the others
+(3 x 2 = 6 variants), 'zip' combines the n-th values of all parameters, the
+lists must have the same length. A list of such matrices expands to the
+variants of all matrices, in order. Nested keys of the rosParamMap data are
+separated by dots, e.g. rosParamMap.nav-params.controller.max_vel.
+
+Each variant is the manifest without the sweep section, with the swept
+values set and the name '<name>-<digest>', where digest is the start of the
+sha256 of the variant content. Variants with the same content are expanded
+once, and the name of a variant does not depend on its position, so it does
+not change when values are added to the sweep.
+"""
+
+import os
+import copy
+import math
+import json
+import hashlib
+import itertools
+from collections import namedtuple
+
+
+SWEEP_MODES = ['cartesian', 'zip']
+
+# number of hex digits of the digest in the variant name
+NAME_DIGEST_LENGTH = 8
+
+# name: name of the batch job, digest: sha256 of the variant content,
+# values: {parameter: value}, manifest: the batch job manifest
+Variant = namedtuple('Variant', ['name', 'digest', 'values', 'manifest'])
+
+# mode: 'cartesian' or 'zip', parameters: list of (parameter, list of values)
+Matrix = namedtuple('Matrix', ['mode', 'parameters'])
+
+
+class SweepError(Exception):
+    """
+    The sweep section of a manifest is invalid
+    """
+
+    def __init__(self, message: str, path: str = 'sweep') -> None:
+        """
+        Args:
+            message (str): description of the problem
+            path (str): location in the manifest, e.g. 'sweep.parameters'
+        """
+        super().__init__(message)
+        self.path = path
+
+
+def _find_by_name(items, name: str) -> dict:
+    for item in items or []:
+        if isinstance(item, dict) and item.get('name', None) == name:
+            return item
+    return None
+
+
+def resolve_parameter(manifest: dict, parameter: str, path: str = 'sweep'):
+    """
+    Find the value of a swept parameter in the manifest
+
+    Args:
+        manifest (dict): the batch job manifest
+        parameter (str): e.g. 'launchParameters.<module>.<name>' or 'rosParamMap.<entry>.<key>'
+        path (str): location of the parameter in the manifest, for the errors
+
+    Returns:
+        (dict, str): the mapping that contains the value and its key
+
+    Raises:
+        SweepError: the parameter is not defined in the manifest
+    """
+    section, _, rest = parameter.partition('.')
+    keys = rest.split('.') if rest else []
+    if section == 'launchParameters':
+        if len(keys) != 2:
+            raise SweepError(f"Invalid parameter '{parameter}', expected "
+                             "'launchParameters.<module>.<parameter>'", path)
+        module = _find_by_name(manifest.get('rosModules', None), keys[0])
+        if module is None:
+            raise SweepError(f"ROS module '{keys[0]}' is not defined in rosModules", path)
+        container = module.get('launchParameters', None)
+    elif section == 'rosParamMap':
+        if len(keys) < 2:
+            raise SweepError(f"Invalid parameter '{parameter}', expected "
+                             "'rosParamMap.<entry>.<key>'", path)
+        entry = _find_by_name(manifest.get('rosParamMap', None), keys[0])
+        if entry is None:
+            raise SweepError(f"'{keys[0]}' is not defined in rosParamMap", path)
+        if entry.get('type', None) == 'yaml':
+            raise SweepError(f"rosParamMap entry '{keys[0]}' is a yaml file, "
+                             "only the data of key-value entries can be swept", path)
+        container = entry.get('data', None)
+    else:
+        raise SweepError(f"Invalid parameter '{parameter}', expected "
+                         "'launchParameters.<module>.<parameter>' or "
+                         "'rosParamMap.<entry>.<key>'", path)
+
+    keys = keys[1:]
+    for key in keys[:-1]:
+        container = container.get(key, None) if isinstance(container, dict) else None
+    # a new key would be ignored by the module, most likely a typo
+    if not isinstance(container, dict) or keys[-1] not in container:
+        raise SweepError(f"Parameter '{parameter}' is not defined in the manifest", path)
+    return container, keys[-1]
+
+
+def parse_sweep(manifest: dict) -> list:
+    """
+    Parse and check the sweep section of a manifest
+
+    Returns:
+        list of Matrix: empty if the manifest has no sweep section
+
+    Raises:
+        SweepError: the sweep section is invalid
+    """
+    sweep = manifest.get('sweep', None)
+    if sweep is None:
+        return []
+    items = sweep if isinstance(sweep, list) else [sweep]
+    if not items:
+        raise SweepError('Expected a sweep matrix or a list of matrices')
+
+    matrices = []
+    for i, item in enumerate(items):
+        path = f'sweep[{i}]' if isinstance(sweep, list) else 'sweep'
+        if not isinstance(item, dict):
+            raise SweepError('Expected a mapping with mode and parameters', path)
+        unknown = sorted(str(key) for key in item if key not in ('mode', 'parameters'))
+        if unknown:
+            raise SweepError(f"Unknown field '{unknown[0]}'", path)
+        mode = item.get('mode', 'cartesian')
+        if mode not in SWEEP_MODES:
+            raise SweepError(f"Invalid mode '{mode}', expected one of: "
+                             f"{', '.join(SWEEP_MODES)}", f'{path}.mode')
+        parameters = item.get('parameters', None)
+        if not isinstance(parameters, dict) or not parameters:
+            raise SweepError('Expected a mapping of parameters to lists of values',
+                             f'{path}.parameters')
+
+        matrix = Matrix(mode, [])
+        for parameter, values in parameters.items():
+            parameter_path = f'{path}.parameters.{parameter}'
+            if not isinstance(values, list) or not values:
+                raise SweepError('Expected a non-empty list of values', parameter_path)
+            resolve_parameter(manifest, str(parameter), parameter_path)
+            matrix.parameters.append((str(parameter), values))
+        if mode == 'zip' and len({len(values) for _, values in matrix.parameters}) > 1:
+            raise SweepError('The value lists of a zip sweep must have the same length',
+                             f'{path}.parameters')
+        matrices.append(matrix)
+    return matrices
+
+
+def get_variant_digest(manifest: dict) -> str:
+    """
+    sha256 of the canonical json of a manifest
+    """
+    content = json.dumps(manifest, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class Sweep:
+    """
+    Variants of a batch job manifest with a sweep section
+
+    The variants are expanded while they are iterated, a sweep of thousands
+    of variants does not keep their manifests in memory.
+
+    Example:
+        sweep = Sweep(manifest)
+        for variant in sweep:
+            submit(variant.manifest)
+        print(sweep.num_duplicates)
+    """
+
+    def __init__(self, manifest: dict) -> None:
+        """
+        Raises:
+            SweepError: the sweep section is invalid
+        """
+        self.matrices = parse_sweep(manifest)
+        self.base = {key: value for key, value in manifest.items() if key != 'sweep'}
+        self.name = self.base['metadata']['name']
+        # variants skipped because an earlier variant has the same content
+        self.num_duplicates = 0
+
+    def get_num_combinations(self) -> int:
+        """
+        Number of value combinations of all matrices, including the duplicates
+        """
+        num = 0
+        for matrix in self.matrices:
+            lengths = [len(values) for _, values in matrix.parameters]
+            if matrix.mode == 'zip':
+                num += lengths[0]
+            else:
+                num += math.prod(lengths)
+        return num
+
+    def iter_values(self):
+        """
+        Yield the {parameter: value} of each combination, in order
+        """
+        for matrix in self.matrices:
+            parameters = [parameter for parameter, _ in matrix.parameters]
+            value_lists = [values for _, values in matrix.parameters]
+            combine = zip if matrix.mode == 'zip' else itertools.product
+            for combination in combine(*value_lists):
+                yield dict(zip(parameters, combination))
+
+    def __iter__(self):
+        """
+        Yield each Variant with a distinct content
+        """
+        seen = set()
+        self.num_duplicates = 0
+        for values in self.iter_values():
+            manifest = copy.deepcopy(self.base)
+            for parameter, value in values.items():
+                container, key = resolve_parameter(manifest, parameter)
+                container[key] = value
+            digest = get_variant_digest(manifest)
+            if digest in seen:
+                self.num_duplicates += 1
+                continue
+            seen.add(digest)
+            manifest['metadata']['name'] = f'{self.name}-{digest[:NAME_DIGEST_LENGTH]}'
+            yield Variant(manifest['metadata']['name'], digest, values, manifest)
+
+
+class SweepProgress:
+    """
+    Variants of a sweep submitted so far, by digest, in a json file.
+    A campaign started again skips the variants in the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path of the progress file, see get_default_path
+        """
+        self.path = path
+        # digest -> {'name', 'values'}
+        self.submitted = {}
+
+    @staticmethod
+    def get_default_path(manifest_path: str) -> str:
+        """
+        Progress file of a manifest: '<manifest>.progress.json' next to it
+        """
+        return f'{manifest_path}.progress.json'
+
+    def load(self):
+        """
+        Load the progress file, a missing or broken file starts a new campaign
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.submitted = json.load(file).get('submitted', {})
+        except (OSError, ValueError, AttributeError):
+            self.submitted = {}
+
+    def is_submitted(self, variant: Variant) -> bool:
+        """
+        Check if a variant was submitted before
+        """
+        return variant.digest in self.submitted
+
+    def add(self, variant: Variant):
+        """
+        Record a submitted variant, written by the next save()
+        """
+        self.submitted[variant.digest] = {'name': variant.name, 'values': variant.values}
+
+    def save(self):
+        """
+        Write the progress file atomically
+
+        Raises:
+            OSError: the file can't be written
+        """
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'submitted': self.submitted}, file, indent=1, default=str)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,184 @@
+"""
+Track the rollout of a deployment until its jobs reach a target phase
+ - RolloutTracker: phase history and timing of each deployment job
+ - wait_for_rollout: poll a deployment until it is ready, failed or timed out
+"""
+
+import time
+
+from .transport import ApiError
+from .watch import ConditionalPoller
+
+
+# job phases (lower case) in which a job counts as ready, by target phase
+READY_PHASES = {
+    'running': {'running', 'succeeded', 'success', 'completed'},
+    'succeeded': {'succeeded', 'success', 'completed'},
+}
+
+# job phases (lower case) in which a job will not become ready anymore
+FAILED_PHASES = {'failed', 'error'}
+
+
+class RolloutTracker:
+    """
+    Phase history of the jobs of a deployment, by robot name
+    """
+
+    def __init__(self, until: str = 'running', start: float = None, robots: list = None) -> None:
+        """
+        Args:
+            until (str): target phase of the jobs, 'running' or 'succeeded'
+            start (float, optional): time.monotonic() of the deployment request
+            robots (list of str, optional): robots that must have a job to be
+                ready, e.g. the robots added by a wave that are not listed yet
+        """
+        self.until = until
+        self.robots = set(robots or [])
+        self.start = start if start is not None else time.monotonic()
+        self.timed_out = False
+        self.end = None
+        # robot name -> list of (phase, seconds since start)
+        self.phases = {}
+
+    def get_elapsed(self, now: float = None) -> float:
+        """
+        Seconds since the start
+        """
+        if now is None:
+            now = time.monotonic()
+        return now - self.start
+
+    def update(self, data: dict, now: float = None) -> list:
+        """
+        Update the phases from the deployment data
+
+        Returns:
+            list of (robot_name, old_phase, new_phase, elapsed): phase changes
+        """
+        elapsed = self.get_elapsed(now)
+        changes = []
+        for job in data['deployment_job_set']:
+            history = self.phases.setdefault(job['robot_name'], [])
+            old_phase = history[-1][0] if history else None
+            if job['job_phase'] != old_phase:
+                history.append((job['job_phase'], elapsed))
+                changes.append((job['robot_name'], old_phase, job['job_phase'], elapsed))
+        if self.get_result() is not None and self.end is None:
+            self.end = elapsed
+        return changes
+
+    def get_ready_after(self, robot_name: str) -> float:
+        """
+        Seconds until the job of the robot reached the target phase, None if not ready
+        """
+        history = self.phases[robot_name]
+        if str(history[-1][0]).lower() not in READY_PHASES[self.until]:
+            return None
+        # time of the first phase of the final ready streak
+        ready_after = history[-1][1]
+        for phase, elapsed in reversed(history):
+            if str(phase).lower() not in READY_PHASES[self.until]:
+                break
+            ready_after = elapsed
+        return ready_after
+
+    def get_result(self) -> str:
+        """
+        Result of the rollout: 'ready', 'failed', 'timeout' or None while in progress
+        """
+        final_phases = [str(history[-1][0]).lower() for history in self.phases.values()]
+        if any(phase in FAILED_PHASES for phase in final_phases):
+            return 'failed'
+        if final_phases and all(phase in READY_PHASES[self.until] for phase in final_phases) \
+                and self.robots.issubset(self.phases):
+            return 'ready'
+        if self.timed_out:
+            return 'timeout'
+        return None
+
+    def get_report(self) -> dict:
+        """
+        Result and per-robot timing of the rollout
+        """
+        def seconds(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            'result': self.get_result(),
+            'until': self.until,
+            'time_to_ready': seconds(self.end) if self.get_result() == 'ready' else None,
+            'elapsed': seconds(self.end if self.end is not None else self.get_elapsed()),
+            'jobs': [{
+                'robot_name': robot_name,
+                'phase': history[-1][0],
+                'ready_after': seconds(self.get_ready_after(robot_name)),
+                'phases': [{'phase': phase, 'after': round(elapsed, 3)}
+                           for phase, elapsed in history],
+            } for robot_name, history in self.phases.items()],
+        }
+
+
+def wait_for_rollout(url: str,
+                     headers: dict = None,
+                     until: str = 'running',
+                     timeout: float = 300,
+                     start: float = None,
+                     robots: list = None,
+                     on_change=None,
+                     min_interval: float = 0.5,
+                     max_interval: float = 5.0) -> RolloutTracker:
+    """
+    Poll a deployment until all its jobs reached the target phase, a job
+    failed or the timeout expired. The polling interval grows
+    exponentially and is reset when a job changed its phase.
+
+    Args:
+        url (str): url of the deployment
+        headers (dict, optional): request headers, e.g. the authorization
+        until (str): target phase of the jobs, 'running' or 'succeeded'
+        timeout (float): seconds since start until the rollout times out
+        start (float, optional): time.monotonic() of the deployment request
+        robots (list of str, optional): robots that must have a job, see RolloutTracker
+        on_change (callable, optional): called with each phase change
+            (robot_name, old_phase, new_phase, elapsed)
+
+    Returns:
+        RolloutTracker: the phase history, see get_result()
+
+    Raises:
+        ApiError: the API server rejected the request, e.g. 401
+    """
+    tracker = RolloutTracker(until, start, robots=robots)
+    poller = ConditionalPoller(url,
+                               headers=headers,
+                               min_interval=min_interval,
+                               max_interval=max_interval)
+    deadline = tracker.start + timeout
+    is_visible = False
+    while True:
+        changed = False
+        try:
+            changed, response = poller.poll()
+            is_visible = True
+        except ApiError as exc:
+            # the deployment might not be visible right after the request,
+            # connection errors are retried until the timeout
+            if exc.status_code is not None and (is_visible or exc.status_code != 404):
+                raise
+
+        if changed:
+            if response['status'] != 'success':
+                raise ApiError(f"[Error] {response.get('errors', response)}")
+            for change in tracker.update(response['data']):
+                if on_change is not None:
+                    on_change(*change)
+
+        if tracker.get_result() is not None:
+            return tracker
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            tracker.timed_out = True
+            return tracker
+        time.sleep(min(poller.next_interval(changed), remaining))
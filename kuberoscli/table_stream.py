@@ -0,0 +1,226 @@
+"""
+Streaming table renderer for large command outputs
+ - StreamingTable: plain table written row by row with fixed column widths
+ - deferred_section: spooled buffer for sections printed after the streamed one
+ - open_pager: pipe the output through a pager on interactive terminals
+
+The column widths are fixed from a bounded sample of the first rows, or
+given upfront by the caller. Afterwards each row is written as soon as it
+is added, so the time to the first line and the memory do not grow with
+the number of rows. Cells wider than their column are not truncated, they
+shift the rest of the row.
+"""
+
+import os
+import sys
+import shlex
+import tempfile
+import subprocess
+import contextlib
+
+
+class StreamingTable:
+    """
+    Plain table in the style of tabulate(..., headers="keys", tablefmt='plain'),
+    written incrementally.
+
+    Example:
+        table = StreamingTable(['HOSTNAME', 'IS_ALIVE'])
+        for node in nodes:
+            table.add_row({'HOSTNAME': node['hostname'], 'IS_ALIVE': node['is_alive']})
+        table.close()
+    """
+
+    # number of rows used to fix the column widths
+    SAMPLE_SIZE = 100
+    # rows written between two flushes of the stream
+    FLUSH_ROWS = 100
+    # space between two columns
+    SEPARATOR = '  '
+    # min. padding of the headers, as in tabulate
+    MIN_PADDING = 2
+
+    def __init__(self,
+                 headers: list = None,
+                 stream=None,
+                 widths: list = None,
+                 sample_size: int = None) -> None:
+        """
+        Args:
+            headers (list of str, optional): column names, also the keys of the rows.
+                Defaults to the keys of the first row.
+            stream (file, optional): defaults to sys.stdout
+            widths (list of int, optional): fixed column widths, skips the sampling
+            sample_size (int, optional): number of rows used to fix the widths
+        """
+        self.headers = list(headers) if headers is not None else None
+        self.stream = stream if stream is not None else sys.stdout
+        self.sample_size = sample_size or self.SAMPLE_SIZE
+        self.widths = list(widths) if widths is not None else None
+        self.right_aligned = [False] * len(headers or [])
+        self.num_rows = 0
+        self._sample = []
+        if self.widths is not None:
+            self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _to_cell(value) -> str:
+        if value is None:
+            return ''
+        return str(value)
+
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    def _fix_widths(self):
+        """
+        Fix the widths and alignments from the sampled rows and write them
+        """
+        self.widths = [len(header) + self.MIN_PADDING for header in self.headers]
+        for i, header in enumerate(self.headers):
+            values = [row.get(header, None) for row in self._sample]
+            values = [value for value in values if value is not None]
+            # numeric columns are right aligned like in tabulate
+            self.right_aligned[i] = bool(values) and all(self._is_number(value)
+                                                         for value in values)
+            for value in values:
+                self.widths[i] = max(self.widths[i], len(self._to_cell(value)))
+
+        self._write_header()
+        for row in self._sample:
+            self._write_row(row)
+        self._sample = []
+        self.stream.flush()
+
+    def _format_line(self, cells: list) -> str:
+        formatted = []
+        for cell, width, right in zip(cells, self.widths, self.right_aligned):
+            formatted.append(cell.rjust(width) if right else cell.ljust(width))
+        return self.SEPARATOR.join(formatted).rstrip() + '\n'
+
+    def _write_header(self):
+        self.stream.write(self._format_line(self.headers))
+
+    def _write_row(self, row: dict):
+        self.stream.write(self._format_line(
+            [self._to_cell(row.get(header, None)) for header in self.headers]))
+
+    def add_row(self, row: dict):
+        """
+        Add a row, written immediately once the column widths are fixed
+        """
+        self.num_rows += 1
+        if self.headers is None:
+            self.headers = list(row)
+            self.right_aligned = [False] * len(self.headers)
+        if self.widths is None:
+            self._sample.append(row)
+            if len(self._sample) >= self.sample_size:
+                self._fix_widths()
+            return
+
+        self._write_row(row)
+        if self.num_rows % self.FLUSH_ROWS == 0:
+            self.stream.flush()
+
+    def close(self):
+        """
+        Write the remaining rows. An empty sampled table is printed as an
+        empty line, as print(tabulate([])) does.
+        """
+        if self.widths is None:
+            if self._sample:
+                self._fix_widths()
+            else:
+                self.stream.write('\n')
+                # don't print the empty line again if closed twice
+                self.widths = []
+        self.stream.flush()
+
+
+def deferred_section():
+    """
+    Buffer for an output section that is rendered during the same pass as
+    the streamed section, but printed after it. The buffer is moved to a
+    temporary file when it gets large.
+    """
+    return tempfile.SpooledTemporaryFile(max_size=1024 * 1024,
+                                         mode='w+',
+                                         encoding='utf-8')
+
+
+def write_deferred_section(section, stream=None):
+    """
+    Copy a deferred section to the output and close it
+    """
+    if stream is None:
+        stream = sys.stdout
+    section.seek(0)
+    for chunk in iter(lambda: section.read(64 * 1024), ''):
+        stream.write(chunk)
+    section.close()
+    stream.flush()
+
+
+def get_pager_command() -> list:
+    """
+    Get the pager command, None if the output is not paged.
+    The pager is used on interactive terminals only and can be set with
+    KUBEROS_PAGER or PAGER, an empty value or 'cat' disables it.
+    """
+    if not sys.stdout.isatty():
+        return None
+    pager = os.environ.get('KUBEROS_PAGER', os.environ.get('PAGER', 'less -FRX'))
+    command = shlex.split(pager)
+    if not command or command == ['cat']:
+        return None
+    return command
+
+
+@contextlib.contextmanager
+def open_pager(enabled: bool = True):
+    """
+    Yield the stream to write a long output to: the stdin of the pager,
+    or sys.stdout if no pager is used. Lines written and flushed are shown
+    immediately, the pager does not wait for the whole output.
+
+    Args:
+        enabled (bool): False to write to sys.stdout, e.g. for --no-pager
+    """
+    command = get_pager_command() if enabled else None
+    pager = None
+    if command is not None:
+        try:
+            env = dict(os.environ)
+            env.setdefault('LESS', 'FRX')
+            pager = subprocess.Popen(command,
+                                     stdin=subprocess.PIPE,
+                                     env=env,
+                                     universal_newlines=True,
+                                     encoding='utf-8')
+        except OSError:
+            # the pager is not installed
+            pager = None
+
+    if pager is None:
+        yield sys.stdout
+        return
+
+    try:
+        yield pager.stdin
+    except BrokenPipeError:
+        # the pager was closed before the end of the output
+        pass
+    finally:
+        try:
+            pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        pager.wait()
@@ -0,0 +1,291 @@
+"""
+Shared HTTP transport for the KubeROS CLI
+ - one pooled keep-alive requests.Session per API server
+ - retry policy for idempotent requests
+ - per-endpoint timeouts
+"""
+
+import os
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from .endpoints import Endpoints
+from .json_stream import StreamingJsonParser, StreamedObject, loads
+
+# requests is imported on first use, it is the most expensive import
+# of the CLI and not needed e.g. for the config commands.
+
+
+HTTP_ERROR_MESSAGES = {
+    400: "[Bad Request '400'] Please check the request parameters.",
+    401: "[Unauthorized '401'] Login is required. The cached token is expired.",
+    404: "[Not Found '404'] Check the resource name and try again.",
+    500: "[Internal Server Error '500'] Please contact the administrator.",
+}
+
+CONNECTION_ERROR_MESSAGE = "[ConnectionError] Can not connect to the API server. \
+Please check your network and kuberos config."
+
+
+# a single call in a bulk request
+#   key: identifier of the call in the results, e.g. the resource name
+#   kwargs: passed to KuberosTransport.request (json, data, headers, ...)
+ApiCall = namedtuple('ApiCall', ['key', 'method', 'url', 'kwargs'])
+
+# result of a single call
+#   elapsed: wall time of the call in seconds
+ApiResult = namedtuple('ApiResult', ['key', 'success', 'data', 'error', 'elapsed'])
+
+# error of the calls of a bulk request not sent after stop_when matched a result
+CANCELLED_ERROR = '[Cancelled] Not sent, a previous call failed'
+
+
+class ApiError(Exception):
+    """
+    Error raised when a request to the API server failed
+    """
+
+    def __init__(self, message: str, status_code: int = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment
+    """
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment
+    """
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class KuberosTransport:
+    """
+    Process-wide pool of HTTP sessions, one session per API server.
+
+    All command groups and completers send their requests through this class,
+    so several calls to the same server within one invocation reuse the
+    TCP/TLS connection instead of opening a new one for every request.
+
+    Settings can be tuned with environment variables:
+        KUBEROS_HTTP_POOL_SIZE   max. connections kept per server (default: 10)
+        KUBEROS_HTTP_KEEPALIVE   0 to close the connection after each request
+        KUBEROS_HTTP_RETRIES     retries of idempotent requests (default: 2)
+        KUBEROS_HTTP_BACKOFF     backoff factor between retries (default: 0.2)
+        KUBEROS_HTTP_TIMEOUT     overrides all the timeouts below (seconds)
+    """
+
+    POOL_SIZE = 10
+    RETRIES = 2
+    BACKOFF_FACTOR = 0.2
+    RETRY_STATUS_CODES = (502, 503, 504)
+
+    # chunk size of streamed responses in bytes
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # timeouts in seconds
+    DEFAULT_TIMEOUT = 5
+    COMPLETION_TIMEOUT = 3
+    ENDPOINT_TIMEOUTS = {
+        Endpoints.LOGIN: 2,
+        Endpoints.LOGOUT: 2,
+        Endpoints.REGISTER: 2,
+        Endpoints.DEPLOYING: 30,
+        Endpoints.BATCH_JOB: 30,
+        Endpoints.BATCH_DATA: 30,
+        Endpoints.CLUSTER_INVENTORY: 30,
+    }
+
+    _sessions = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_server_key(url: str) -> str:
+        """
+        Get the key of the session pool (scheme://host:port) from a url
+        """
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    @classmethod
+    def create_session(cls) -> 'requests.Session':
+        """
+        Create a new session with connection pool and retry policy
+        """
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        pool_size = _env_int('KUBEROS_HTTP_POOL_SIZE', cls.POOL_SIZE)
+        retry = Retry(total=_env_int('KUBEROS_HTTP_RETRIES', cls.RETRIES),
+                      backoff_factor=_env_float('KUBEROS_HTTP_BACKOFF',
+                                                cls.BACKOFF_FACTOR),
+                      status_forcelist=cls.RETRY_STATUS_CODES,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=pool_size,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not _env_int('KUBEROS_HTTP_KEEPALIVE', 1):
+            session.headers['Connection'] = 'close'
+        return session
+
+    @classmethod
+    def get_session(cls, url: str) -> 'requests.Session':
+        """
+        Get the pooled session of the API server that serves the url
+        """
+        key = cls.get_server_key(url)
+        with cls._lock:
+            session = cls._sessions.get(key, None)
+            if session is None:
+                session = cls.create_session()
+                cls._sessions[key] = session
+        return session
+
+    @classmethod
+    def get_timeout(cls, url: str) -> float:
+        """
+        Get the timeout for the endpoint of the url
+        """
+        if 'KUBEROS_HTTP_TIMEOUT' in os.environ:
+            return _env_float('KUBEROS_HTTP_TIMEOUT', cls.DEFAULT_TIMEOUT)
+
+        path = urlsplit(url).path
+        for endpoint, endpoint_timeout in cls.ENDPOINT_TIMEOUTS.items():
+            if endpoint in path:
+                return endpoint_timeout
+        return cls.DEFAULT_TIMEOUT
+
+    @classmethod
+    def request(cls,
+                method: str,
+                url: str,
+                timeout: float = None,
+                **kwargs) -> 'requests.Response':
+        """
+        Send a request over the pooled session of the API server
+
+        Args:
+            method (str): http method
+            url (str): full url of the request
+            timeout (float, optional): timeout in seconds.
+                Defaults to the timeout of the endpoint.
+            kwargs: passed to requests.Session.request
+
+        Returns:
+            requests.Response: response of the API server
+        """
+        if timeout is None:
+            timeout = cls.get_timeout(url)
+        session = cls.get_session(url)
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    @classmethod
+    def call_json(cls,
+                  method: str,
+                  url: str,
+                  timeout: float = None,
+                  **kwargs):
+        """
+        Send a request and decode the json response
+
+        Returns:
+            decoded response data
+
+        Raises:
+            ApiError: http error status, connection error or invalid response
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        try:
+            resp = cls.request(method, url, timeout=timeout, **kwargs)
+            resp.raise_for_status()
+            return loads(resp.content)
+
+        except requests.exceptions.HTTPError as exc:
+            raise cls.get_http_error(exc.response) from exc
+
+        except ValueError as exc:
+            # response is not valid json
+            raise ApiError(f"[Invalid Response] {exc}") from exc
+
+        except requests.exceptions.RequestException as exc:
+            raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+
+    @staticmethod
+    def get_http_error(resp: 'requests.Response') -> ApiError:
+        """
+        Get the ApiError of an http error status
+        """
+        status_code = resp.status_code
+        message = HTTP_ERROR_MESSAGES.get(
+            status_code, f"[HTTP Error '{status_code}'] {resp.reason}")
+        return ApiError(message, status_code=status_code)
+
+    @classmethod
+    def stream_json(cls,
+                    method: str,
+                    url: str,
+                    path: list,
+                    timeout: float = None,
+                    **kwargs) -> StreamedObject:
+        """
+        Send a request and decode the json response incrementally.
+        The array at the path is decoded element by element while it is
+        iterated, before the whole response is received.
+
+        Args:
+            path (list of str): keys of the array to stream, e.g. ['data', 'cluster_node_set']
+
+        Returns:
+            StreamedObject: the response object, decoded on access.
+                Reading it raises ApiError if the connection fails and
+                json.JSONDecodeError if the response is not valid json.
+
+        Raises:
+            ApiError: http error status or connection error
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        try:
+            resp = cls.request(method, url, timeout=timeout, stream=True, **kwargs)
+        except requests.exceptions.RequestException as exc:
+            raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+
+        if resp.status_code >= 400:
+            resp.close()
+            raise cls.get_http_error(resp)
+
+        def iter_chunks():
+            try:
+                yield from resp.iter_content(chunk_size=cls.STREAM_CHUNK_SIZE)
+            except requests.exceptions.RequestException as exc:
+                raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+
+        return StreamingJsonParser(iter_chunks(), path, on_close=resp.close).root
+
+    @classmethod
+    def close_all(cls):
+        """
+        Close all pooled sessions
+        """
+        with cls._lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions.clear()
@@ -0,0 +1,192 @@
+"""
+Watch a resource by polling the API server
+ - ConditionalPoller: polls with conditional requests and adaptive intervals
+ - LiveView: redraws only the changed lines of the output
+"""
+
+import sys
+import time
+import shutil
+import hashlib
+
+from .transport import KuberosTransport, ApiError, CONNECTION_ERROR_MESSAGE
+from .json_stream import loads
+
+
+class ConditionalPoller:
+    """
+    Poll a resource over the pooled session of the API server.
+
+    The ETag and Last-Modified headers of the last response are sent back
+    as If-None-Match and If-Modified-Since, so a server supporting
+    conditional requests answers with an empty '304 Not Modified'.
+    Otherwise unchanged responses are detected by their digest and not
+    decoded again.
+
+    The interval is reset to the min. interval while the resource is
+    changing and increased up to the max. interval once it is stable.
+    """
+
+    BACKOFF_FACTOR = 1.5
+
+    def __init__(self,
+                 url: str,
+                 headers: dict = None,
+                 min_interval: float = 1.0,
+                 max_interval: float = 15.0) -> None:
+        self.url = url
+        self.headers = headers
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self._etag = None
+        self._last_modified = None
+        self._digest = None
+        # statistics
+        self.num_requests = 0
+        self.num_not_modified = 0
+        self.bytes_received = 0
+
+    def poll(self):
+        """
+        Request the resource
+
+        Returns:
+            changed (bool): False if the resource did not change since the last poll
+            data: decoded response, None if not changed
+
+        Raises:
+            ApiError: http error status, connection error or invalid response
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        headers = dict(self.headers or {})
+        if self._etag is not None:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified is not None:
+            headers['If-Modified-Since'] = self._last_modified
+
+        try:
+            resp = KuberosTransport.request('GET', self.url, headers=headers)
+            content = resp.content
+        except requests.exceptions.RequestException as exc:
+            raise ApiError(CONNECTION_ERROR_MESSAGE) from exc
+
+        self.num_requests += 1
+        self.bytes_received += len(content)
+        if resp.status_code == 304:
+            self.num_not_modified += 1
+            return False, None
+        if resp.status_code >= 400:
+            raise KuberosTransport.get_http_error(resp)
+
+        self._etag = resp.headers.get('ETag', None)
+        self._last_modified = resp.headers.get('Last-Modified', None)
+        digest = hashlib.sha1(content).digest()
+        if digest == self._digest:
+            return False, None
+        self._digest = digest
+
+        try:
+            return True, loads(content)
+        except ValueError as exc:
+            raise ApiError(f"[Invalid Response] {exc}") from exc
+
+    def next_interval(self, active: bool) -> float:
+        """
+        Adapt the interval to the activity of the resource
+
+        Args:
+            active (bool): True while the resource is changing
+        """
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.BACKOFF_FACTOR, self.max_interval)
+        return self.interval
+
+
+class LiveView:
+    """
+    Output of a watched resource as a block of lines.
+
+    On a terminal, the block is drawn once and only the changed lines are
+    redrawn in place. Otherwise (e.g. piped to a file) only the changed
+    lines are printed again, without the status line.
+    """
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream if stream is not None else sys.stdout
+        self.is_tty = self.stream.isatty()
+        self._lines = []
+        self._widths = {}
+
+    def format_table(self, key: str, headers: list, rows: list) -> list:
+        """
+        Format rows as plain table lines. The column widths only grow between
+        updates, so a changed row does not change the other lines.
+
+        Args:
+            key (str): identifier of the table, keeps its widths
+            headers (list of str): column names, also the keys of the rows
+            rows (list of dict): table rows
+        """
+        widths = self._widths.get(key, [len(header) + 2 for header in headers])
+        cells = [[str(row.get(header, '')) for header in headers] for row in rows]
+        for row_cells in cells:
+            widths = [max(width, len(cell)) for width, cell in zip(widths, row_cells)]
+        self._widths[key] = widths
+        return ['  '.join(cell.ljust(width) for cell, width in zip(row_cells, widths)).rstrip()
+                for row_cells in [headers] + cells]
+
+    def update(self, lines: list, status: str = None):
+        """
+        Show the new lines, redraw only the lines that changed
+
+        Args:
+            lines (list of str): content of the block
+            status (str, optional): status line below the block, terminal only
+        """
+        if not self.is_tty:
+            self._print_changes(lines)
+            return
+
+        size = shutil.get_terminal_size()
+        if status is not None:
+            lines = lines + [status]
+        # lines must not wrap, the redraw counts terminal lines
+        lines = [line[:size.columns - 1] for line in lines]
+
+        old_lines = self._lines
+        if max(len(lines), len(old_lines)) >= size.lines:
+            # the cursor can't move up to the first line, redraw the screen
+            if lines != old_lines:
+                self.stream.write('\x1b[H\x1b[J')
+                self.stream.write(''.join(f'{line}\n' for line in lines))
+        elif len(lines) != len(old_lines):
+            # the layout changed, redraw the block
+            if old_lines:
+                self.stream.write(f'\x1b[{len(old_lines)}F\x1b[J')
+            self.stream.write(''.join(f'{line}\n' for line in lines))
+        else:
+            num_lines = len(lines)
+            for i, (line, old_line) in enumerate(zip(lines, old_lines)):
+                if line != old_line:
+                    # move up to the line, rewrite it and move back below the block
+                    up = num_lines - i
+                    self.stream.write(f'\x1b[{up}F\x1b[2K{line}\x1b[{up}E')
+        self.stream.flush()
+        self._lines = lines
+
+    def _print_changes(self, lines: list):
+        old_lines = self._lines
+        if len(lines) != len(old_lines):
+            changed = lines
+        else:
+            changed = [line for line, old_line in zip(lines, old_lines) if line != old_line]
+        if changed:
+            if old_lines:
+                self.stream.write(f"--- {time.strftime('%H:%M:%S')}\n")
+            self.stream.write(''.join(f'{line}\n' for line in changed))
+            self.stream.flush()
+        self._lines = lines
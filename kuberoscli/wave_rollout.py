@@ -0,0 +1,256 @@
+"""
+Staged rollout of deployments in waves of robots
+ - split_waves: split the targetRobots of a manifest into cumulative waves
+ - WaveRollout: create a deployment for the first wave, expand it wave by wave
+
+Each wave adds robots to the targetRobots of the deployment. The first wave
+creates the deployment, the following waves send the changed metadata only,
+as `deploy upgrade` does. Before the next wave, all jobs of the deployment
+must reach the target phase, a failed job or a timeout stops the rollout:
+
+    --waves 1,10%,50%,100%   100 robots -> 1, 10, 50, 100 robots
+
+A deployment that was already rolled out to some of the robots from this
+machine is expanded from its last-applied manifest, the waves it covers
+are skipped. The parameter files of a deployment are uploaded right before
+its first wave, a deployment that is never started uploads nothing.
+"""
+
+import copy
+import math
+import time
+
+from .endpoints import Endpoints
+from .transport import KuberosTransport, ApiError
+from .param_files import ParamFileError
+from .rollout import wait_for_rollout
+from .manifest_diff import LastApplied, DeploymentDiff, get_param_digests
+
+
+def parse_waves(spec: str) -> list:
+    """
+    Parse a wave specification, e.g. '1,10%,50%,100%'
+
+    Returns:
+        list of (float, bool): size of each wave, True if it is a percentage
+
+    Raises:
+        ValueError: the specification is not a list of positive counts and percentages
+    """
+    waves = []
+    for item in spec.split(','):
+        item = item.strip()
+        is_percent = item.endswith('%')
+        try:
+            value = float(item[:-1]) if is_percent else int(item)
+        except ValueError as exc:
+            raise ValueError(f"Invalid wave '{item}', expected a count or a percentage") from exc
+        if value <= 0 or (is_percent and value > 100):
+            raise ValueError(f"Invalid wave '{item}', expected a count > 0 "
+                             f"or a percentage in (0%, 100%]")
+        waves.append((value, is_percent))
+    if not waves:
+        raise ValueError('No waves specified')
+    return waves
+
+
+def split_waves(robots: list, waves: list) -> list:
+    """
+    Split the robots into cumulative waves, the last wave contains all robots
+
+    Args:
+        robots (list of str): targetRobots in rollout order
+        waves (list of (float, bool)): see parse_waves
+
+    Returns:
+        list of list of str: robots of the deployment after each wave,
+            waves that add no robots are dropped
+    """
+    counts = []
+    for value, is_percent in waves:
+        count = math.ceil(len(robots) * value / 100) if is_percent else int(value)
+        count = min(max(count, counts[-1] if counts else 0), len(robots))
+        if count > 0 and (not counts or count > counts[-1]):
+            counts.append(count)
+    if not counts or counts[-1] < len(robots):
+        counts.append(len(robots))
+    return [robots[:count] for count in counts]
+
+
+class WaveRollout:
+    """
+    Rollout of a single deployment in waves
+
+    The events of the rollout are passed to on_event(deployment_name, message),
+    the commands print them.
+    """
+
+    def __init__(self,
+                 config: dict,
+                 manifest: dict,
+                 load_params,
+                 waves: list,
+                 until: str = 'running',
+                 timeout: float = 300,
+                 on_event=None) -> None:
+        """
+        Args:
+            config (dict): context of the API server
+            manifest (dict): the deployment manifest with all targetRobots
+            load_params (callable): returns the 'rosparam_yamls' of the requests,
+                called before the first wave, may upload the parameter files
+            waves (list of (float, bool)): see parse_waves
+            until (str): target phase of the jobs before the next wave
+            timeout (float): max. seconds to wait for each wave
+            on_event (callable, optional): called with (deployment_name, message)
+
+        Raises:
+            ValueError: metadata.name or metadata.targetRobots of the manifest is invalid
+        """
+        metadata = manifest.get('metadata', None) if isinstance(manifest, dict) else None
+        if not isinstance(metadata, dict) or not isinstance(metadata.get('name', None), str) \
+                or not metadata['name']:
+            raise ValueError('metadata.name is missing')
+        robots = metadata.get('targetRobots', None) or []
+        if not isinstance(robots, list) or not all(isinstance(robot, str) for robot in robots):
+            raise ValueError('metadata.targetRobots must be a list of robot names')
+
+        self.config = config
+        self.manifest = manifest
+        self.load_params = load_params
+        self.rosparam_yamls = None
+        self.until = until
+        self.timeout = timeout
+        self.on_event = on_event
+        self.name = metadata['name']
+        self.headers = {'Authorization': 'Token ' + config['token']}
+
+        # rollout order: robots of an earlier rollout first
+        robots = list(robots)
+        self.last_applied = LastApplied.load(config['name'], self.name)
+        deployed = []
+        if self.last_applied is not None:
+            deployed = self.last_applied['manifest']['metadata'].get('targetRobots', None) or []
+        robots = [robot for robot in robots if robot in deployed] \
+            + [robot for robot in robots if robot not in deployed]
+        num_deployed = sum(1 for robot in robots if robot in deployed)
+        all_waves = split_waves(robots, waves)
+        self.waves = [wave for wave in all_waves if len(wave) > num_deployed]
+        self.num_skipped = len(all_waves) - len(self.waves)
+
+        # progress
+        self.num_done = 0
+        self.result = None
+        self.message = ''
+        self.elapsed = 0.0
+
+    def emit(self, message: str):
+        """
+        Pass an event of the rollout to the callback
+        """
+        if self.on_event is not None:
+            self.on_event(self.name, message)
+
+    def get_num_robots(self) -> int:
+        """
+        Number of robots the deployment is rolled out to
+        """
+        if self.last_applied is None:
+            return 0
+        return len(self.last_applied['manifest']['metadata'].get('targetRobots', None) or [])
+
+    def get_wave_manifest(self, robots: list) -> dict:
+        """
+        Get the manifest of the deployment with the robots of a wave
+        """
+        manifest = copy.deepcopy(self.manifest)
+        manifest['metadata']['targetRobots'] = robots
+        return manifest
+
+    def run(self) -> str:
+        """
+        Roll out the waves in order, stops at the first wave that is not ready
+
+        Returns:
+            str: 'ready', 'failed', 'timeout' or 'error' (request failed)
+        """
+        start = time.monotonic()
+        if self.num_skipped:
+            self.emit(f'{self.num_skipped} wave(s) already sent, continuing from the '
+                      f'last-applied manifest')
+        if self.waves:
+            try:
+                self.rosparam_yamls = self.load_params()
+            except (ParamFileError, ApiError) as exc:
+                self.result, self.message = 'error', str(exc)
+                self.elapsed = time.monotonic() - start
+                return self.result
+        for i, robots in enumerate(self.waves):
+            wave_start = time.monotonic()
+            try:
+                self.send_wave(robots)
+                self.emit(f'wave {i + 1}/{len(self.waves)}: {len(robots)} robot(s), '
+                          f'waiting until {self.until}')
+                tracker = wait_for_rollout(
+                    f"{self.config['server']}/{Endpoints.DEPLOYMENT}{self.name}/",
+                    headers=self.headers,
+                    until=self.until,
+                    timeout=self.timeout,
+                    start=wave_start,
+                    robots=robots)
+            except ApiError as exc:
+                self.result, self.message = 'error', str(exc)
+                break
+
+            self.result = tracker.get_result()
+            report = tracker.get_report()
+            if self.result != 'ready':
+                not_ready = [job['robot_name'] for job in report['jobs']
+                             if job['ready_after'] is None]
+                not_ready += [robot for robot in robots if robot not in tracker.phases]
+                self.message = f"wave {i + 1}: not {self.until}: {', '.join(not_ready)}"
+                break
+            self.num_done = i + 1
+            self.emit(f'wave {i + 1}/{len(self.waves)} {self.until} '
+                      f"after {report['time_to_ready']:.1f}s")
+
+        if not self.waves:
+            self.result = 'ready'
+        self.elapsed = time.monotonic() - start
+        return self.result
+
+    def send_wave(self, robots: list):
+        """
+        Create the deployment with the robots of the first wave, or add the
+        robots of the next wave to it
+
+        Raises:
+            ApiError: the API server rejected the request
+        """
+        manifest = self.get_wave_manifest(robots)
+        param_digests = get_param_digests(self.rosparam_yamls)
+        if self.last_applied is None:
+            response = KuberosTransport.call_json(
+                'POST',
+                f"{self.config['server']}/{Endpoints.DEPLOYING}",
+                json={
+                    'deployment_manifest': manifest,
+                    'rosparam_yamls': self.rosparam_yamls,
+                },
+                headers=self.headers)
+        else:
+            diff = DeploymentDiff(self.last_applied['manifest'], manifest,
+                                  self.last_applied['param_digests'], param_digests)
+            changed_params = set(diff.get_changed_params())
+            response = KuberosTransport.call_json(
+                'PATCH',
+                f"{self.config['server']}/{Endpoints.DEPLOYING}{self.name}/",
+                json=diff.get_patch([item for item in self.rosparam_yamls
+                                     if item['name'] in changed_params]),
+                headers=self.headers)
+
+        if not isinstance(response, dict) or response.get('status', None) != 'success':
+            errors = response.get('errors', response) if isinstance(response, dict) else response
+            raise ApiError(f'[Error] {errors}')
+        LastApplied.save(self.config['name'], manifest, param_digests)
+        self.last_applied = {'manifest': manifest, 'param_digests': param_digests}
@@ -0,0 +1,71 @@
+"""
+Shared fixtures of the kuberoscli tests
+"""
+
+import os
+import sys
+import pathlib
+
+import pytest
+import yaml
+
+from kuberoscli.kuberos_config import KuberosConfig
+
+from stand_in_server import StandInServer
+
+
+def write_config(path, server: str):
+    path.write_text(yaml.safe_dump({
+        'current-context': 'test',
+        'contexts': [{'name': 'test', 'server': server, 'user': 'u', 'token': 't'}],
+    }))
+
+
+@pytest.fixture
+def kuberos_config(tmp_path, monkeypatch):
+    """
+    Config file with a single context 'test' of an unreachable API server,
+    the caches are written next to it in tmp_path
+    """
+    path = tmp_path / 'config'
+    write_config(path, 'http://127.0.0.1:9')
+    monkeypatch.setenv('KUBEROS_CONFIG', str(path))
+    assert KuberosConfig.get_config_path() == str(path)
+    return str(path)
+
+
+@pytest.fixture
+def api_server(kuberos_config):
+    """
+    Stand-in API server, the context 'test' of the config points to it
+    """
+    server = StandInServer()
+    server.start()
+    write_config(pathlib.Path(kuberos_config), server.url)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def run_cli(monkeypatch):
+    """
+    Run the kuberos command line with the given arguments
+
+    Returns:
+        callable: run_cli(*args) -> exit code
+    """
+    def run(*args):
+        # pylint: disable=import-outside-toplevel
+        from kuberoscli.kuberoscli import KuberosCli
+        monkeypatch.setattr(sys, 'argv', ['kuberos', *args])
+        try:
+            KuberosCli()
+        except SystemExit as exc:
+            return exc.code
+        return 0
+
+    return run
+
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'manifest_templates')
@@ -0,0 +1,112 @@
+"""
+Local stand-in of the KubeROS API server for the tests
+"""
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+
+class Request:
+    """
+    A request received by the stand-in server
+    """
+
+    def __init__(self,
+                 method: str,
+                 path: str,
+                 headers: dict,
+                 body: bytes,
+                 client_address: tuple = None) -> None:
+        url = urlsplit(path)
+        self.method = method
+        self.path = url.path
+        self.query = dict(parse_qsl(url.query))
+        self.headers = headers
+        self.body = body
+        # (host, port) of the connection, a reused connection keeps its port
+        self.client_address = client_address
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StandInServer:
+    """
+    HTTP server on a free local port, answering the requests with the routes
+
+    A route is called with the Request and returns (status, payload) or
+    (status, payload, headers), a dict or list payload is sent as json,
+    bytes are sent as they are. A Content-Length header larger than the
+    payload cuts the response off, like a dropped connection.
+
+    Example:
+        server = StandInServer()
+        server.routes[('GET', '/api/v1/fleets/')] = lambda request: (200, {'status': 'success'})
+        server.start()
+    """
+
+    def __init__(self) -> None:
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def get_requests(self, method: str = None, path: str = None) -> list:
+        """
+        Get the received requests, optionally filtered
+        """
+        with self._lock:
+            return [request for request in self.requests
+                    if (method is None or request.method == method)
+                    and (path is None or request.path == path)]
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length', None) or 0)
+                request = Request(self.command, self.path, dict(self.headers),
+                                  self.rfile.read(length) if length else b'',
+                                  self.client_address)
+                with server._lock:  # pylint: disable=protected-access
+                    server.requests.append(request)
+                route = server.routes.get((request.method, request.path), None)
+                if route is None:
+                    status, payload, headers = 404, {'detail': 'Not found.'}, {}
+                else:
+                    status, payload, *rest = route(request)
+                    headers = rest[0] if rest else {}
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if 'Content-Type' not in headers:
+                    self.send_header('Content-Type', 'application/json')
+                if 'Content-Length' not in headers:
+                    self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                if int(headers.get('Content-Length', len(data))) != len(data):
+                    self.close_connection = True
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_request
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
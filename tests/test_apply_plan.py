@@ -0,0 +1,84 @@
+"""
+Tests of the manifest loading and ordering of `kuberos apply`
+"""
+
+import shutil
+
+from kuberoscli.apply_plan import load_documents, Resource, plan_levels
+
+from conftest import TEMPLATES_DIR
+
+
+PARAMS = 'controller:\n  max_vel: 1.0\nkind_of_robot: amr\n'
+
+
+def make_tree(tmp_path):
+    """
+    Directory with the manifest templates and ROS parameter files next to them
+    """
+    tree = tmp_path / 'tree'
+    shutil.copytree(TEMPLATES_DIR, tree)
+    (tree / 'params.yaml').write_text(PARAMS)
+    (tree / 'config').mkdir()
+    (tree / 'config' / 'nav.yml').write_text('kind: not-a-manifest\n')
+    return tree
+
+
+def test_directory_skips_parameter_files(tmp_path):
+    tree = make_tree(tmp_path)
+    documents = load_documents([str(tree)])
+
+    paths = {document.path for document in documents}
+    assert str(tree / 'params.yaml') not in paths
+    assert str(tree / 'config' / 'nav.yml') not in paths
+    assert sorted(document.manifest['kind'] for document in documents) == [
+        'ApplicationDeployment', 'ClusterInventory', 'ClusterRegistration',
+        'Fleet', 'RegistryToken']
+
+
+def test_glob_skips_parameter_files(tmp_path):
+    tree = make_tree(tmp_path)
+    documents = load_documents([str(tree / '*.yaml')])
+    assert all(document.manifest.get('kind', None) for document in documents)
+    assert len(documents) == 5
+
+
+def test_explicit_file_is_always_loaded(tmp_path):
+    tree = make_tree(tmp_path)
+    documents = load_documents([str(tree / 'params.yaml')])
+    assert [document.manifest['controller'] for document in documents] == [{'max_vel': 1.0}]
+
+
+def test_multi_document_file_in_directory(tmp_path):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    (tree / 'params.yaml').write_text(PARAMS)
+    (tree / 'stack.yaml').write_text(
+        'apiVersion: v1alpha\nkind: RegistryToken\nmetadata:\n  name: token\n'
+        '---\n'
+        'apiVersion: v1alpha\nkind: Fleet\nmetadata:\n  name: fleet\n')
+    documents = load_documents([str(tree)])
+    assert [(document.index, document.manifest['kind']) for document in documents] == [
+        (0, 'RegistryToken'), (1, 'Fleet')]
+
+
+def test_plan_of_directory(tmp_path):
+    levels = plan_levels([Resource(document)
+                          for document in load_documents([str(make_tree(tmp_path))])])
+    assert [resource.kind for resource in levels[1]] == ['Fleet']
+
+
+def test_apply_dry_run_of_directory(tmp_path, kuberos_config, run_cli, capsys):
+    tree = make_tree(tmp_path)
+    assert run_cli('apply', '-f', str(tree), '--dry-run') == 0
+    assert run_cli('apply', '-f', str(tree), '--dry-run', '--no-validate') == 0
+    output = capsys.readouterr().out
+    assert 'params.yaml' not in output
+    assert 'Fleet/mini-fleet' in output
+
+
+def test_apply_without_manifests(tmp_path, kuberos_config, run_cli, capsys):
+    (tmp_path / 'params.yaml').write_text(PARAMS)
+    assert run_cli('apply', '-f', str(tmp_path)) == 1
+    assert run_cli('apply', '-f', str(tmp_path / '*.yml'), '--dry-run') == 1
+    assert f'No manifest found in {tmp_path}' in capsys.readouterr().out
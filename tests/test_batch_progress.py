@@ -0,0 +1,35 @@
+"""
+Tests of the batch job progress shown by `kuberos job watch`
+"""
+
+from kuberoscli.batch_progress import ProgressMonitor, count_jobs
+from kuberoscli.endpoints import Endpoints
+
+
+def test_is_finished():
+    monitor = ProgressMonitor()
+    assert not monitor.is_finished()
+    monitor.add_sample(count_jobs([{'exec_cluster': 'c1', 'status': 'Running'},
+                                   {'exec_cluster': 'c1', 'status': 'Succeeded'}]))
+    assert not monitor.is_finished()
+    monitor.add_sample(count_jobs([{'exec_cluster': 'c1', 'status': 'Failed'},
+                                   {'exec_cluster': 'c1', 'status': 'Succeeded'}]))
+    assert monitor.is_finished()
+
+
+def test_batch_job_without_jobs_is_finished():
+    monitor = ProgressMonitor()
+    monitor.add_sample(count_jobs([]))
+    assert monitor.is_finished()
+
+
+def test_watch_batch_job_without_jobs(api_server, run_cli, capsys):
+    api_server.routes[('GET', f'/{Endpoints.BATCH_JOB}empty/')] = lambda request: (200, {
+        'status': 'success',
+        'data': {'name': 'empty', 'status': 'completed', 'started_since': '1m',
+                 'batch_job_set': []},
+    })
+
+    assert run_cli('job', 'watch', 'empty', '--interval', '0.1') == 0
+    assert "Batch job 'empty' has no jobs" in capsys.readouterr().out
+    assert len(api_server.requests) == 1
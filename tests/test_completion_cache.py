@@ -0,0 +1,107 @@
+"""
+Tests of the completion cache: fresh, stale and expired entries, context changes
+"""
+
+import time
+
+import pytest
+
+from kuberoscli import completion_cache
+from kuberoscli.completion_cache import CompletionCache
+from kuberoscli.command_group.cluster import ClusterCompleter
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.kuberos_config import KuberosConfig
+
+
+RESOURCE_URL = Endpoints.CLUSTER
+
+
+@pytest.fixture
+def clusters(api_server):
+    """
+    Cluster list of the stand-in server, the names can be changed by the test
+    """
+    names = ['cluster-a', 'cluster-b']
+    api_server.routes[('GET', f'/{RESOURCE_URL}')] = lambda request: (200, {
+        'status': 'success',
+        'data': [{'cluster_name': name} for name in names],
+    })
+    return names
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    """
+    Background refreshes started by the cache, not run
+    """
+    started = []
+    monkeypatch.setattr(completion_cache.subprocess, 'Popen',
+                        lambda args, **kwargs: started.append(args[-3:]))
+    return started
+
+
+def age_entries(seconds: float):
+    cache = CompletionCache()
+    for entry in cache.load()['entries'].values():
+        entry['updated'] -= seconds
+        entry['used'] -= seconds
+    cache.save()
+
+
+def test_warm_completion_sends_no_request(api_server, clusters):
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b']
+    assert len(api_server.requests) == 1
+    clusters.append('cluster-c')
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b']
+    assert len(api_server.requests) == 1
+
+
+def test_stale_entry_is_served_and_refreshed_once(api_server, clusters, refreshes):
+    ClusterCompleter(RESOURCE_URL)()
+    age_entries(CompletionCache.TTL + 1)
+    clusters.append('cluster-c')
+
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b']
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b']
+    assert refreshes == [['test', RESOURCE_URL, 'cluster_name']]
+    assert len(api_server.requests) == 1
+
+    # the refresh process updates the entry
+    completion_cache.refresh('test', RESOURCE_URL, 'cluster_name')
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b', 'cluster-c']
+
+
+def test_expired_entry_is_fetched_again(api_server, clusters, refreshes):
+    ClusterCompleter(RESOURCE_URL)()
+    age_entries(CompletionCache.MAX_STALE + 1)
+    clusters.append('cluster-c')
+
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b', 'cluster-c']
+    assert len(api_server.requests) == 2
+    assert refreshes == []
+
+
+def test_context_change_invalidates(api_server, clusters):
+    ClusterCompleter(RESOURCE_URL)()
+    context = dict(KuberosConfig.get_context_by_name('test'), name='other')
+    KuberosConfig.update_config(context=context, current_context='other')
+
+    assert CompletionCache().get_current_context() == 'other'
+    assert ClusterCompleter(RESOURCE_URL)() == ['cluster-a', 'cluster-b']
+    # the names of each context are cached separately
+    assert len(api_server.requests) == 2
+
+
+def test_least_recently_used_are_evicted(kuberos_config, monkeypatch):
+    monkeypatch.setattr(CompletionCache, 'MAX_ENTRIES', 2)
+    cache = CompletionCache()
+    cache.put('test', 'a/', ['a'])
+    cache.put('test', 'b/', ['b'])
+    # 'a/' is used again after the TTL, 'b/' becomes the least recently used
+    cache.load()['entries'][cache.get_key('test', 'a/')]['used'] = time.time() - 2 * cache.TTL
+    cache.load()['entries'][cache.get_key('test', 'b/')]['used'] = time.time() - cache.TTL
+    cache.get('test', 'a/')
+    cache.put('test', 'c/', ['c'])
+
+    entries = CompletionCache().load()['entries']
+    assert sorted(entries) == [cache.get_key('test', 'a/'), cache.get_key('test', 'c/')]
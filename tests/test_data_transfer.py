@@ -0,0 +1,122 @@
+"""
+Tests of the chunked download: resume after an interruption, chunk checksums
+"""
+
+import os
+import json
+import hashlib
+
+import pytest
+
+from kuberoscli.data_transfer import DataTransfer, TransferError
+
+
+CHUNK_SIZE = 1024
+DATA = bytes(range(256)) * 20 + b'tail'   # 6 chunks, the last one is short
+FILES_PATH = '/api/v1/batch_jobs/data_management/sim/files/'
+
+
+class RangeFiles:
+    """
+    files/ endpoint of the stand-in server: the file info and range requests
+
+    cut_chunks: chunks whose response is cut off in the middle
+    corrupt_chunks: {chunk: number of responses with a flipped byte}
+    """
+
+    def __init__(self) -> None:
+        self.cut_chunks = set()
+        self.corrupt_chunks = {}
+        self.fetched = []
+
+    def __call__(self, request):
+        if 'Range' not in request.headers:
+            chunks = [hashlib.sha256(DATA[offset:offset + CHUNK_SIZE]).hexdigest()
+                      for offset in range(0, len(DATA), CHUNK_SIZE)]
+            return 200, {'status': 'success', 'data': {
+                'size': len(DATA),
+                'sha256': hashlib.sha256(DATA).hexdigest(),
+                'chunk_size': int(request.query['chunk_size']),
+                'chunks': chunks,
+            }}
+        first, last = request.headers['Range'][len('bytes='):].split('-')
+        first, last = int(first), int(last)
+        index = first // CHUNK_SIZE
+        self.fetched.append(index)
+        data = DATA[first:last + 1]
+        headers = {'Content-Type': 'application/octet-stream',
+                   'Content-Range': f'bytes {first}-{last}/{len(DATA)}'}
+        if index in self.cut_chunks:
+            return 206, data[:len(data) // 2], dict(headers, **{'Content-Length': str(len(data))})
+        if self.corrupt_chunks.get(index, 0) > 0:
+            self.corrupt_chunks[index] -= 1
+            data = bytes([data[0] ^ 0xff]) + data[1:]
+        return 206, data, headers
+
+
+@pytest.fixture
+def files(api_server):
+    route = RangeFiles()
+    api_server.routes[('GET', FILES_PATH)] = route
+    return route
+
+
+def get_transfer(api_server) -> DataTransfer:
+    return DataTransfer(api_server.url, 't', 'sim', parallel=1, chunk_size=CHUNK_SIZE)
+
+
+def test_resume_interrupted_download(api_server, files, tmp_path):
+    local_path = str(tmp_path / 'run-1.bag')
+
+    # the connection drops in the middle of chunk 3, in each attempt
+    files.cut_chunks = {3}
+    with pytest.raises(TransferError, match='Chunk 3 failed: .*connect'):
+        get_transfer(api_server).download('bags/run-1.bag', local_path)
+    assert not os.path.exists(local_path)
+    assert files.fetched[:6] == [0, 1, 2] + [3] * DataTransfer.CHUNK_ATTEMPTS
+    with open(f'{local_path}.part.json', 'r', encoding='utf-8') as file:
+        done = json.load(file)['done']
+    # the chunk after it may have started before the download stopped
+    assert done[:3] == [0, 1, 2] and 3 not in done
+    missing = [index for index in range(6) if index not in done]
+
+    # the first response of chunk 3 fails the checksum and is fetched again
+    files.cut_chunks = set()
+    files.corrupt_chunks = {3: 1}
+    files.fetched = []
+    num_bytes = get_transfer(api_server).download('bags/run-1.bag', local_path)
+
+    assert files.fetched == [3] + missing
+    assert num_bytes == sum(len(DATA[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE])
+                            for index in missing)
+    with open(local_path, 'rb') as file:
+        assert file.read() == DATA
+    assert not os.path.exists(f'{local_path}.part')
+    assert not os.path.exists(f'{local_path}.part.json')
+
+
+def test_checksum_mismatch(api_server, files, tmp_path):
+    local_path = str(tmp_path / 'run-1.bag')
+    files.corrupt_chunks = {1: DataTransfer.CHUNK_ATTEMPTS}
+
+    with pytest.raises(TransferError, match='Checksum mismatch of chunk 1'):
+        get_transfer(api_server).download('bags/run-1.bag', local_path)
+    assert not os.path.exists(local_path)
+    with open(f'{local_path}.part.json', 'r', encoding='utf-8') as file:
+        done = json.load(file)['done']
+    assert 0 in done and 1 not in done
+
+
+def test_restart_changed_file(api_server, files, tmp_path):
+    local_path = str(tmp_path / 'run-1.bag')
+    # state of a download of another version of the file
+    with open(f'{local_path}.part', 'wb') as file:
+        file.write(b'\0' * len(DATA))
+    with open(f'{local_path}.part.json', 'w', encoding='utf-8') as file:
+        json.dump({'sha256': '0' * 64, 'chunk_size': CHUNK_SIZE, 'done': [0, 1, 2]}, file)
+
+    get_transfer(api_server).download('bags/run-1.bag', local_path)
+
+    assert files.fetched == [0, 1, 2, 3, 4, 5]
+    with open(local_path, 'rb') as file:
+        assert file.read() == DATA
@@ -0,0 +1,120 @@
+"""
+Tests of the config file: concurrent kuberos processes updating it
+"""
+
+import os
+import sys
+import subprocess
+
+import yaml
+
+from kuberoscli.kuberos_config import KuberosConfig
+
+
+NUM_PROCESSES = 8
+NUM_UPDATES = 20
+
+# each process adds its own contexts and reads the file back after each update
+WRITER = """
+import sys
+import yaml
+from kuberoscli.kuberos_config import KuberosConfig
+
+worker, num_updates = sys.argv[1], int(sys.argv[2])
+for i in range(num_updates):
+    name = f'{worker}-{i}'
+    KuberosConfig.update_config(
+        context={'name': name, 'server': 'http://127.0.0.1:9', 'user': worker, 'token': 't'},
+        current_context=name)
+    with open(KuberosConfig.get_config_path(), 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file)
+    if not isinstance(config, dict) or not isinstance(config.get('contexts'), list):
+        sys.exit(f'torn config file: {config!r}')
+"""
+
+
+def test_concurrent_writers(kuberos_config):
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, KUBEROS_CONFIG=kuberos_config,
+               PYTHONPATH=os.pathsep.join([repo_dir, os.environ.get('PYTHONPATH', '')]))
+    workers = [f'w{i}' for i in range(NUM_PROCESSES)]
+    processes = [subprocess.Popen([sys.executable, '-c', WRITER, worker, str(NUM_UPDATES)],
+                                  env=env, stderr=subprocess.PIPE, text=True)
+                 for worker in workers]
+    for process in processes:
+        _, stderr = process.communicate(timeout=120)
+        assert process.returncode == 0, stderr
+
+    # no update is lost
+    with open(kuberos_config, 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file)
+    names = [con['name'] for con in config['contexts']]
+    expected = ['test'] + [f'{worker}-{i}' for worker in workers for i in range(NUM_UPDATES)]
+    assert sorted(names) == sorted(expected)
+    assert config['current-context'] in expected
+
+    # no temporary file is left next to the config
+    config_dir = os.path.dirname(kuberos_config)
+    assert not [name for name in os.listdir(config_dir) if name.endswith('.tmp')]
+
+
+def test_store_reloads_replaced_file(kuberos_config):
+    store = KuberosConfig.get_store()
+    assert store.get_context_names() == ['test']
+
+    # written by another process: the file is replaced, not modified in place
+    tmp_path = kuberos_config + '.new'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        yaml.safe_dump({'current-context': 'other',
+                        'contexts': [{'name': 'other', 'server': 's', 'user': 'u', 'token': 't'}]},
+                       file)
+    os.replace(tmp_path, kuberos_config)
+
+    assert store.get_context_names() == ['other']
+    assert store.get_context('test') is None
+
+
+def test_store_parses_unchanged_file_once(kuberos_config, monkeypatch):
+    parsed = []
+    load = yaml.load
+
+    def counting_load(*args, **kwargs):
+        parsed.append(1)
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(yaml, 'load', counting_load)
+
+    for _ in range(10):
+        assert KuberosConfig.get_current_config()['name'] == 'test'
+        assert KuberosConfig.get_context_names() == ['test']
+    assert len(parsed) == 1
+
+
+def test_store_reloads_file_edited_in_place(kuberos_config):
+    store = KuberosConfig.get_store()
+    assert store.get_context('test')['user'] == 'u'
+    stamp = store.get_stamp()
+
+    # edited with a text editor: same inode, other size
+    with open(kuberos_config, 'r+', encoding='utf-8') as file:
+        content = file.read().replace('user: u', 'user: someone')
+        file.seek(0)
+        file.write(content)
+    assert store.get_stamp()[0] == stamp[0]
+
+    assert store.get_context('test')['user'] == 'someone'
+
+
+def test_context_copy_does_not_change_the_store(kuberos_config):
+    context = KuberosConfig.get_context_by_name('test')
+    context['token'] = 'changed'
+    assert KuberosConfig.get_context_by_name('test')['token'] == 't'
+
+
+def test_first_write_of_fresh_install(tmp_path, monkeypatch):
+    config_path = tmp_path / 'home' / '.kuberos' / 'config'
+    monkeypatch.setenv('KUBEROS_CONFIG', str(config_path))
+
+    with KuberosConfig.locked():
+        KuberosConfig.write_config({'current-context': '', 'contexts': []})
+    assert KuberosConfig.get_context_names() == []
@@ -0,0 +1,48 @@
+"""
+Tests of the last-applied manifests used by `deploy upgrade` and `deploy rollout`
+"""
+
+import os
+
+import yaml
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.manifest_diff import LastApplied
+
+
+MANIFEST = {
+    'apiVersion': 'v1alpha',
+    'kind': 'ApplicationDeployment',
+    'metadata': {'name': 'hello', 'targetFleet': 'fleet'},
+    'rosModules': [{'name': 'talker', 'image': 'ros:humble'}],
+}
+
+
+def test_save_load_delete(kuberos_config):
+    assert LastApplied.load('test', 'hello') is None
+    LastApplied.save('test', MANIFEST, {})
+    assert LastApplied.load('test', 'hello')['manifest'] == MANIFEST
+    LastApplied.delete('test', 'hello')
+    assert LastApplied.load('test', 'hello') is None
+    # deleting a deployment that was not created from this machine
+    LastApplied.delete('test', 'hello')
+
+
+def test_deploy_delete_removes_last_applied(api_server, run_cli):
+    LastApplied.save('test', MANIFEST, {})
+    LastApplied.save('test', dict(MANIFEST, metadata={'name': 'other'}), {})
+    api_server.routes[('DELETE', f'/{Endpoints.DEPLOYING}hello/')] = \
+        lambda request: (200, {'status': 'success', 'msg': 'deleted'})
+
+    assert run_cli('deploy', 'delete', 'hello', 'other') == 1
+    assert LastApplied.load('test', 'hello') is None
+    # the deletion of 'other' failed (404), its manifest is kept
+    assert LastApplied.load('test', 'other') is not None
+
+
+def test_upgrade_without_name(kuberos_config, run_cli, tmp_path, capsys):
+    path = tmp_path / 'deployment.yaml'
+    path.write_text(yaml.safe_dump(dict(MANIFEST, metadata={'targetFleet': 'fleet'})))
+    assert run_cli('deploy', 'upgrade', '-f', str(path), '--no-validate') == 1
+    assert f'{path}: metadata.name is missing' in capsys.readouterr().out
+    assert not os.path.exists(os.path.join(tmp_path, 'last-applied'))
@@ -0,0 +1,52 @@
+"""
+Tests of `kuberos lint` on manifest trees and multi-document files
+"""
+
+import os
+
+from kuberoscli.manifest_lint import ManifestLinter, lint_content, is_manifest
+
+from conftest import TEMPLATES_DIR
+
+
+with open(os.path.join(TEMPLATES_DIR, 'registry_token.yaml'), 'r', encoding='utf-8') as _file:
+    TOKEN = _file.read().rstrip('\n') + '\n'
+FLEET = ('apiVersion: v1alpha\nkind: Fleet\nmetadata:\n  name: fleet\n  mainCluster: c\n'
+         'robot:\n  - name: bot-1\n')
+
+
+def test_multi_document_file_is_valid():
+    content = f'{TOKEN}---\n{FLEET}'.encode()
+    assert lint_content(content) == []
+
+
+def test_diagnostics_of_later_documents_are_prefixed():
+    fleet_without_name = FLEET.replace('  name: fleet\n', '')
+    content = f'{TOKEN}---\n{fleet_without_name}'
+    diagnostics = lint_content(content.encode())
+    assert [(diagnostic.path, diagnostic.code) for diagnostic in diagnostics] == [
+        ('#1:metadata.name', 'missing-field')]
+
+
+def test_empty_documents_are_skipped():
+    assert lint_content(f'---\n{TOKEN}---\n'.encode()) == []
+    assert [diagnostic.code for diagnostic in lint_content(b'')] == ['invalid-type']
+
+
+def test_is_manifest_checks_all_documents():
+    assert is_manifest(f'kind: Params\n---\n{FLEET}'.encode())
+    assert not is_manifest(b'controller:\n  kind: Fleet\n')
+
+
+def test_lint_tree(tmp_path):
+    (tmp_path / 'stack.yaml').write_text(f'{TOKEN}---\n{FLEET}')
+    (tmp_path / 'params.yaml').write_text('controller:\n  max_vel: 1.0\n')
+    linter = ManifestLinter(jobs=1, cache_path=str(tmp_path / 'cache' / 'lint.json'))
+    results, missing = linter.lint([str(tmp_path)])
+    assert missing == []
+    assert results == [(str(tmp_path / 'stack.yaml'), [])]
+
+    # unchanged files are served from the cache
+    linter = ManifestLinter(jobs=1, cache_path=str(tmp_path / 'cache' / 'lint.json'))
+    assert linter.lint([str(tmp_path)])[0] == results
+    assert (linter.num_cached, linter.num_validated) == (1, 0)
@@ -0,0 +1,56 @@
+"""
+Tests of the manifest validation shared by lint, apply and the create commands
+"""
+
+import os
+
+import pytest
+import yaml
+
+from kuberoscli.manifest_lint import ManifestLinter
+from kuberoscli.manifest_validation import validate_manifest
+
+
+DEPLOYMENT = {
+    'apiVersion': 'v1alpha',
+    'kind': 'ApplicationDeployment',
+    # sections of the wrong type, e.g. a '-' too much
+    'metadata': [{'name': 'hello'}],
+    'rosModules': [{
+        'name': 'talker',
+        'image': 'ros:humble',
+        'requirements': ['gpu'],
+        'launchParameters': {'device': '{CAMERA.device}'},
+    }],
+}
+
+
+@pytest.mark.parametrize('kind', ['ApplicationDeployment', 'BatchJob'])
+def test_sections_of_the_wrong_type(kind):
+    diagnostics = validate_manifest(dict(DEPLOYMENT, kind=kind))
+    assert [(diagnostic.path, diagnostic.code) for diagnostic in diagnostics
+            if diagnostic.severity == 'error'] == [
+                ('metadata', 'invalid-type'),
+                ('rosModules[0].requirements', 'invalid-type')]
+
+
+def test_lint_tree_with_invalid_sections(tmp_path):
+    (tmp_path / 'bad.yaml').write_text(yaml.safe_dump(DEPLOYMENT))
+    (tmp_path / 'other.yaml').write_text(yaml.safe_dump(dict(DEPLOYMENT, metadata={'name': 'hi'})))
+    # one worker process per file
+    results, _ = ManifestLinter(jobs=2, cache_path='').lint([str(tmp_path)])
+    codes = {os.path.basename(path): [diagnostic.code for diagnostic in diagnostics
+                                      if diagnostic.severity == 'error']
+             for path, diagnostics in results}
+    # the other file is still linted
+    assert sorted(codes) == ['bad.yaml', 'other.yaml']
+    assert codes['bad.yaml'] == ['invalid-type', 'invalid-type']
+
+
+def test_apply_dry_run_with_invalid_sections(tmp_path, kuberos_config, run_cli, capsys):
+    path = tmp_path / 'bad.yaml'
+    path.write_text(yaml.safe_dump(DEPLOYMENT))
+    assert run_cli('apply', '-f', str(path), '--dry-run') == 1
+    assert 'metadata: Expected a mapping, got list' in capsys.readouterr().err
+    # sent anyway, without a name
+    assert run_cli('apply', '-f', str(path), '--dry-run', '--no-validate') == 0
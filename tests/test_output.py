@@ -0,0 +1,94 @@
+"""
+Tests of the -o/--output formats
+"""
+
+import io
+import csv
+import json
+
+import pytest
+import yaml
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.output import write_records, write_object
+
+
+RECORDS = [
+    {'name': 'fleet-1', 'robots': ['r1', 'r2'], 'healthy': True},
+    {'name': 'fleet-2', 'robots': [], 'healthy': False},
+]
+
+
+def write(records, output_format: str, **kwargs) -> str:
+    stream = io.StringIO()
+    write_records(records, output_format, stream=stream, **kwargs)
+    return stream.getvalue()
+
+
+def test_json():
+    assert json.loads(write(RECORDS, 'json')) == RECORDS
+    assert json.loads(write([], 'json')) == []
+
+
+def test_jsonl():
+    assert [json.loads(line) for line in write(RECORDS, 'jsonl').splitlines()] == RECORDS
+
+
+def test_yaml():
+    assert yaml.safe_load(write(RECORDS, 'yaml')) == RECORDS
+    assert yaml.safe_load(write([], 'yaml')) == []
+
+
+def test_csv():
+    rows = list(csv.DictReader(io.StringIO(write(RECORDS, 'csv'))))
+    assert rows == [
+        {'name': 'fleet-1', 'robots': '["r1","r2"]', 'healthy': 'True'},
+        {'name': 'fleet-2', 'robots': '[]', 'healthy': 'False'},
+    ]
+
+
+def test_name():
+    assert write(RECORDS, 'name') == 'fleet-1\nfleet-2\n'
+    assert write([{'cluster_name': 'c1'}, {}], 'name', name_field='cluster_name') == 'c1\n'
+
+
+def test_wide():
+    lines = write(RECORDS, 'wide').splitlines()
+    assert lines[0].split() == ['name', 'robots', 'healthy']
+    assert lines[1].split() == ['fleet-1', '["r1","r2"]', 'True']
+
+
+def test_records_are_written_while_consumed():
+    stream = io.StringIO()
+
+    def records():
+        yield RECORDS[0]
+        # the first record is written before the next one is produced
+        assert json.loads(stream.getvalue()) == RECORDS[0]
+        yield RECORDS[1]
+
+    write_records(records(), 'jsonl', stream=stream)
+
+
+def test_write_object():
+    stream = io.StringIO()
+    write_object({'status': 'success', 'data': RECORDS}, 'json', stream=stream)
+    assert json.loads(stream.getvalue()) == {'status': 'success', 'data': RECORDS}
+    with pytest.raises(ValueError):
+        write_records(RECORDS, 'xml')
+
+
+@pytest.mark.parametrize('output_format', ['json', 'jsonl', 'yaml', 'csv', 'name'])
+def test_config_list_hides_tokens(kuberos_config, run_cli, capsys, output_format):
+    assert run_cli('config', 'list', '-o', output_format) == 0
+    output = capsys.readouterr().out
+    assert 'test' in output
+    assert "'t'" not in output and '"t"' not in output and 'token' not in output
+
+
+def test_errors_go_to_stderr(api_server, run_cli, capsys):
+    api_server.routes[('GET', f'/{Endpoints.FLEET}')] = lambda request: (500, {})
+    assert run_cli('fleet', 'list', '-o', 'json') == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'Internal Server Error' in captured.err
@@ -0,0 +1,88 @@
+"""
+Tests of the upload of the parameter files missing on the API server
+"""
+
+import pytest
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.param_blobs import ParamBlobUploader
+from kuberoscli.param_files import ParamFile
+
+
+PARAM_FILES = [
+    ParamFile('nav', 'nav.yaml', 'speed: 1.0\n', 'a' * 64),
+    ParamFile('map', 'map.yaml', 'size: 20\n', 'b' * 64),
+]
+MISSING_PATH = f'/{Endpoints.PARAM_BLOBS_MISSING}'
+BLOBS_PATH = f'/{Endpoints.PARAM_BLOBS}'
+
+INLINE = [{'name': param_file.name, 'type': 'yaml',
+           'content': {param_file.name: param_file.content}} for param_file in PARAM_FILES]
+
+
+def get_uploader(server_url: str, tmp_path) -> ParamBlobUploader:
+    return ParamBlobUploader(server_url, 't', cache_dir=str(tmp_path))
+
+
+def test_upload_missing(api_server, tmp_path):
+    api_server.routes[('POST', MISSING_PATH)] = \
+        lambda request: (200, {'status': 'success', 'data': {'missing': ['b' * 64]}})
+    api_server.routes[('POST', BLOBS_PATH)] = lambda request: (201, {'status': 'success'})
+
+    rosparam_yamls = get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES)
+
+    assert rosparam_yamls == [{'name': param_file.name, 'type': 'yaml',
+                               'content_sha256': {param_file.name: param_file.digest}}
+                              for param_file in PARAM_FILES]
+    uploads = api_server.get_requests('POST', BLOBS_PATH)
+    assert [upload.json() for upload in uploads] == \
+        [{'blobs': [{'digest': 'b' * 64, 'content': 'size: 20\n'}]}]
+
+
+@pytest.mark.parametrize('status', [404, 405, 501])
+def test_missing_endpoint_is_unsupported(api_server, tmp_path, status):
+    api_server.routes[('POST', MISSING_PATH)] = lambda request: (status, {'detail': 'error'})
+
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    # the server is not asked again
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    assert len(api_server.get_requests('POST', MISSING_PATH)) == 1
+    assert not api_server.get_requests('POST', BLOBS_PATH)
+
+
+@pytest.mark.parametrize('payload', [b'<html>login</html>', {'status': 'success'}, []])
+def test_unusable_response_is_unsupported(api_server, tmp_path, payload):
+    api_server.routes[('POST', MISSING_PATH)] = lambda request: (200, payload)
+
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    assert len(api_server.get_requests('POST', MISSING_PATH)) == 1
+
+
+@pytest.mark.parametrize('status', [301, 400, 401, 403, 500, 502, 503])
+def test_error_status_falls_back_once(api_server, tmp_path, status):
+    api_server.routes[('POST', MISSING_PATH)] = \
+        lambda request: (status, {'detail': 'error'}, {'Location': '/login/'})
+
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    # the server is asked again by the next request
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    assert len(api_server.get_requests('POST', MISSING_PATH)) == 2
+    assert not api_server.get_requests('POST', BLOBS_PATH)
+
+
+def test_failed_upload_falls_back(api_server, tmp_path):
+    api_server.routes[('POST', MISSING_PATH)] = \
+        lambda request: (200, {'status': 'success', 'data': {'missing': ['a' * 64]}})
+    api_server.routes[('POST', BLOBS_PATH)] = lambda request: (500, {'detail': 'error'})
+
+    assert get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES) == INLINE
+    # the server supports the endpoints, it is asked again
+    get_uploader(api_server.url, tmp_path).get_rosparam_yamls(PARAM_FILES)
+    assert len(api_server.get_requests('POST', MISSING_PATH)) == 2
+
+
+def test_unreachable_server_falls_back(tmp_path):
+    uploader = get_uploader('http://127.0.0.1:9', tmp_path)
+    assert uploader.get_rosparam_yamls(PARAM_FILES) == INLINE
+    assert not uploader._is_unsupported()  # pylint: disable=protected-access
@@ -0,0 +1,71 @@
+"""
+Tests of `kuberos job create` with a sweep section against a stand-in API server
+"""
+
+import json
+import time
+import _thread
+
+import yaml
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.param_sweep import SweepProgress
+
+
+MANIFEST = {
+    'apiVersion': 'v1alpha',
+    'kind': 'BatchJob',
+    'metadata': {'name': 'nav-sweep'},
+    'rosModules': [{'name': 'planner', 'image': 'img',
+                    'launchParameters': {'max_speed': 1.0}}],
+    'sweep': {'parameters': {'launchParameters.planner.max_speed': [0.5, 1.0, 1.5, 2.0, 2.5]}},
+}
+
+
+def write_manifest(tmp_path) -> str:
+    path = tmp_path / 'sweep.yaml'
+    path.write_text(yaml.safe_dump(MANIFEST))
+    return str(path)
+
+
+def load_progress(manifest_path: str) -> dict:
+    with open(SweepProgress.get_default_path(manifest_path), 'r', encoding='utf-8') as file:
+        return json.load(file)['submitted']
+
+
+def test_sweep_is_resumed(api_server, run_cli, tmp_path):
+    api_server.routes[('POST', f'/{Endpoints.BATCH_JOB}')] = \
+        lambda request: (200, {'status': 'success', 'msg': 'created'})
+    path = write_manifest(tmp_path)
+
+    assert run_cli('job', 'create', '-f', path, '--rate', '0') == 0
+    assert len(api_server.requests) == 5
+    assert len(load_progress(path)) == 5
+
+    assert run_cli('job', 'create', '-f', path, '--rate', '0') == 0
+    assert len(api_server.requests) == 5
+
+
+def test_interrupted_sweep_keeps_accepted_variants(api_server, run_cli, tmp_path):
+    def create(request):
+        if len(api_server.get_requests('POST', f'/{Endpoints.BATCH_JOB}')) == 3:
+            # Ctrl-C while the third variant is sent, the first two were accepted
+            _thread.interrupt_main()
+            time.sleep(0.5)
+        return 200, {'status': 'success', 'msg': 'created'}
+
+    api_server.routes[('POST', f'/{Endpoints.BATCH_JOB}')] = create
+    path = write_manifest(tmp_path)
+
+    assert run_cli('job', 'create', '-f', path, '--rate', '0', '-p', '1') == 130
+    accepted = [request.json()['deployment_manifest']['metadata']['name']
+                for request in api_server.requests[:2]]
+    assert sorted(item['name'] for item in load_progress(path).values()) == sorted(accepted)
+
+    # the campaign continues with the variants not accepted yet
+    api_server.routes[('POST', f'/{Endpoints.BATCH_JOB}')] = \
+        lambda request: (200, {'status': 'success', 'msg': 'created'})
+    assert run_cli('job', 'create', '-f', path, '--rate', '0') == 0
+    names = [request.json()['deployment_manifest']['metadata']['name']
+             for request in api_server.requests[3:]]
+    assert len(names) == 3 and not set(names) & set(accepted)
@@ -0,0 +1,92 @@
+"""
+Tests of the pooled sessions of KuberosTransport: keep-alive, retries, timeouts
+"""
+
+import time
+
+import pytest
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.transport import KuberosTransport, ApiError, CONNECTION_ERROR_MESSAGE
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setenv('KUBEROS_HTTP_BACKOFF', '0')
+
+
+def ok(request):
+    return 200, {'status': 'success', 'data': []}
+
+
+def test_session_per_server():
+    session = KuberosTransport.get_session('http://127.0.0.1:8000/api/v1/fleets/')
+    assert KuberosTransport.get_session('http://127.0.0.1:8000/api/v1/clusters/') is session
+    assert KuberosTransport.get_session('http://127.0.0.1:8001/api/v1/fleets/') is not session
+
+
+def test_connection_is_reused(api_server):
+    api_server.routes[('GET', '/api/v1/fleets/')] = ok
+    for _ in range(5):
+        KuberosTransport.call_json('GET', f'{api_server.url}/api/v1/fleets/')
+    assert len({request.client_address for request in api_server.requests}) == 1
+
+
+def test_keepalive_disabled(api_server, monkeypatch):
+    monkeypatch.setenv('KUBEROS_HTTP_KEEPALIVE', '0')
+    api_server.routes[('GET', '/api/v1/fleets/')] = ok
+    for _ in range(3):
+        KuberosTransport.call_json('GET', f'{api_server.url}/api/v1/fleets/')
+    assert len({request.client_address for request in api_server.requests}) == 3
+
+
+def test_idempotent_request_is_retried(api_server):
+    statuses = [503, 502, 200]
+    api_server.routes[('GET', '/api/v1/fleets/')] = \
+        lambda request: (statuses.pop(0), {'status': 'success', 'data': []})
+
+    assert KuberosTransport.call_json('GET', f'{api_server.url}/api/v1/fleets/') == \
+        {'status': 'success', 'data': []}
+    assert len(api_server.requests) == 3
+
+
+def test_retries_are_limited(api_server):
+    api_server.routes[('GET', '/api/v1/fleets/')] = lambda request: (503, {})
+    with pytest.raises(ApiError) as exc_info:
+        KuberosTransport.call_json('GET', f'{api_server.url}/api/v1/fleets/')
+    assert exc_info.value.status_code == 503
+    assert len(api_server.requests) == 1 + KuberosTransport.RETRIES
+
+
+def test_post_is_not_retried(api_server):
+    api_server.routes[('POST', '/api/v1/fleets/')] = lambda request: (503, {})
+    with pytest.raises(ApiError) as exc_info:
+        KuberosTransport.call_json('POST', f'{api_server.url}/api/v1/fleets/', json={})
+    assert exc_info.value.status_code == 503
+    assert len(api_server.requests) == 1
+
+
+def test_timeout(api_server, monkeypatch):
+    monkeypatch.setenv('KUBEROS_HTTP_TIMEOUT', '0.2')
+
+    def slow(request):
+        time.sleep(1)
+        return ok(request)
+
+    api_server.routes[('POST', '/api/v1/fleets/')] = slow
+    start = time.monotonic()
+    with pytest.raises(ApiError, match=r'\[ConnectionError\]') as exc_info:
+        KuberosTransport.call_json('POST', f'{api_server.url}/api/v1/fleets/', json={})
+    assert str(exc_info.value) == CONNECTION_ERROR_MESSAGE
+    assert time.monotonic() - start < 0.9
+
+
+def test_endpoint_timeouts(monkeypatch):
+    monkeypatch.delenv('KUBEROS_HTTP_TIMEOUT', raising=False)
+    server = 'http://127.0.0.1:8000'
+    assert KuberosTransport.get_timeout(f'{server}/{Endpoints.LOGIN}') == 2
+    assert KuberosTransport.get_timeout(f'{server}/{Endpoints.DEPLOYING}hello/') == 30
+    assert KuberosTransport.get_timeout(f'{server}/api/v1/other/') == \
+        KuberosTransport.DEFAULT_TIMEOUT
+    monkeypatch.setenv('KUBEROS_HTTP_TIMEOUT', '7.5')
+    assert KuberosTransport.get_timeout(f'{server}/{Endpoints.DEPLOYING}') == 7.5
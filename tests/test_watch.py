@@ -0,0 +1,88 @@
+"""
+Tests of the conditional polling and the live view of the watch commands
+"""
+
+import io
+
+import pytest
+
+from kuberoscli.transport import ApiError
+from kuberoscli.watch import ConditionalPoller, LiveView
+
+
+PATH = '/api/v1/deploying/hello/'
+
+
+class Resource:
+    """
+    Watched resource of the stand-in server, with or without ETag support
+    """
+
+    def __init__(self, etag: bool) -> None:
+        self.etag = etag
+        self.version = 1
+
+    def __call__(self, request):
+        payload = {'status': 'success', 'data': {'version': self.version}}
+        if not self.etag:
+            return 200, payload
+        etag = f'"v{self.version}"'
+        if request.headers.get('If-None-Match', None) == etag:
+            return 304, b'', {'ETag': etag}
+        return 200, payload, {'ETag': etag}
+
+
+@pytest.mark.parametrize('etag', [True, False])
+def test_unchanged_resource(api_server, etag):
+    resource = Resource(etag)
+    api_server.routes[('GET', PATH)] = resource
+    poller = ConditionalPoller(f'{api_server.url}{PATH}')
+
+    assert poller.poll() == (True, {'status': 'success', 'data': {'version': 1}})
+    assert poller.poll() == (False, None)
+    resource.version = 2
+    assert poller.poll() == (True, {'status': 'success', 'data': {'version': 2}})
+    assert poller.poll() == (False, None)
+
+    assert poller.num_requests == 4
+    assert poller.num_not_modified == (2 if etag else 0)
+    if etag:
+        assert [request.headers.get('If-None-Match', None)
+                for request in api_server.requests] == [None, '"v1"', '"v1"', '"v2"']
+
+
+def test_http_error(api_server):
+    api_server.routes[('GET', PATH)] = lambda request: (404, {'detail': 'Not found.'})
+    with pytest.raises(ApiError) as exc_info:
+        ConditionalPoller(f'{api_server.url}{PATH}').poll()
+    assert exc_info.value.status_code == 404
+
+
+def test_adaptive_interval():
+    poller = ConditionalPoller('http://127.0.0.1:9/', min_interval=1.0, max_interval=3.0)
+    assert poller.next_interval(active=False) == 1.5
+    assert poller.next_interval(active=False) == 2.25
+    assert poller.next_interval(active=False) == 3.0
+    assert poller.next_interval(active=False) == 3.0
+    assert poller.next_interval(active=True) == 1.0
+
+
+def test_live_view_prints_changed_lines_when_piped():
+    stream = io.StringIO()
+    view = LiveView(stream)
+    view.update(['Deployment: hello', 'job-1  running'])
+    view.update(['Deployment: hello', 'job-1  running'])
+    first = stream.getvalue()
+    view.update(['Deployment: hello', 'job-1  succeeded'])
+    changes = stream.getvalue()[len(first):]
+
+    assert 'job-1  running' in first
+    assert 'job-1  succeeded' in changes
+    assert 'Deployment: hello' not in changes
+
+
+def test_table_columns_only_grow():
+    view = LiveView(io.StringIO())
+    wide = view.format_table('jobs', ['Job', 'Phase'], [{'Job': 'job-1', 'Phase': 'Pending'}])
+    narrow = view.format_table('jobs', ['Job', 'Phase'], [{'Job': 'job-1', 'Phase': 'Up'}])
+    assert narrow[0] == wide[0]
@@ -0,0 +1,100 @@
+"""
+Tests of `kuberos deploy rollout` against a stand-in API server
+"""
+
+import pytest
+import yaml
+
+from kuberoscli.endpoints import Endpoints
+from kuberoscli.wave_rollout import WaveRollout, parse_waves, split_waves
+
+
+def make_manifest(name: str, robots: list, param_path: str) -> dict:
+    return {
+        'apiVersion': 'v1alpha',
+        'kind': 'ApplicationDeployment',
+        'metadata': {'name': name, 'targetFleet': 'fleet', 'targetRobots': robots},
+        'rosModules': [{
+            'name': 'talker',
+            'image': 'ros:humble',
+            'rosParameters': [{'name': 'params', 'type': 'yaml', 'valueFrom': 'params',
+                               'mountPath': '/params'}],
+        }],
+        'rosParamMap': [{'name': 'params', 'type': 'yaml', 'path': param_path}],
+    }
+
+
+def serve_deployments(api_server, failed_robots=()):
+    """
+    Deployments are created by POST, their jobs are running at once,
+    except the jobs of the failed robots
+    """
+    deployments = {}
+
+    def create(request):
+        manifest = request.json()['deployment_manifest']
+        deployments[manifest['metadata']['name']] = manifest['metadata']['targetRobots']
+        api_server.routes[('GET', f"/{Endpoints.DEPLOYMENT}{manifest['metadata']['name']}/")] = \
+            lambda _: get(manifest['metadata']['name'])
+        return 200, {'status': 'success', 'msg': 'created'}
+
+    def get(name):
+        return 200, {'status': 'success', 'data': {'deployment_job_set': [
+            {'robot_name': robot, 'job_phase': 'failed' if robot in failed_robots else 'running'}
+            for robot in deployments[name]]}}
+
+    api_server.routes[('POST', f'/{Endpoints.DEPLOYING}')] = create
+    api_server.routes[('POST', f'/{Endpoints.PARAM_BLOBS_MISSING}')] = \
+        lambda request: (200, {'status': 'success', 'data': {'missing': []}})
+    return deployments
+
+
+def test_split_waves():
+    robots = [f'r{i}' for i in range(10)]
+    waves = split_waves(robots, parse_waves('1,10%,50%,100%'))
+    assert [len(wave) for wave in waves] == [1, 5, 10]
+
+
+def test_params_uploaded_before_first_wave(api_server, run_cli, tmp_path):
+    (tmp_path / 'a.yaml').write_text('a: 1\n')
+    (tmp_path / 'b.yaml').write_text('b: 2\n')
+    path = tmp_path / 'deployments.yaml'
+    path.write_text(yaml.safe_dump_all([make_manifest('first', ['r1'], 'a.yaml'),
+                                        make_manifest('second', ['r2'], 'b.yaml')]))
+    deployments = serve_deployments(api_server, failed_robots={'r1'})
+
+    assert run_cli('deploy', 'rollout', '-f', str(path), '--waves', '100%',
+                   '--timeout', '5') == 2
+    assert list(deployments) == ['first']
+    # the failed first deployment stopped the fleet, the files of the second
+    # deployment were not sent
+    requests = [request.path for request in api_server.requests]
+    assert requests[:2] == [f'/{Endpoints.PARAM_BLOBS_MISSING}', f'/{Endpoints.DEPLOYING}']
+    assert len(api_server.get_requests(path=f'/{Endpoints.PARAM_BLOBS_MISSING}')) == 1
+
+
+def test_missing_name_without_validation(api_server, run_cli, tmp_path, capsys):
+    (tmp_path / 'a.yaml').write_text('a: 1\n')
+    manifest = make_manifest('first', ['r1'], 'a.yaml')
+    del manifest['metadata']['name']
+    path = tmp_path / 'deployment.yaml'
+    path.write_text(yaml.safe_dump(manifest))
+
+    assert run_cli('deploy', 'rollout', '-f', str(path), '--no-validate') == 1
+    assert f'{path}: metadata.name is missing' in capsys.readouterr().out
+    assert api_server.requests == []
+
+
+def test_invalid_metadata(kuberos_config):
+    config = {'name': 'test', 'server': 'http://127.0.0.1:9', 'token': 't'}
+    with pytest.raises(ValueError, match='targetRobots'):
+        WaveRollout(config, make_manifest('first', 'r1', 'a.yaml'), list, parse_waves('100%'))
+    with pytest.raises(ValueError, match='metadata.name'):
+        WaveRollout(config, {'metadata': None}, list, parse_waves('100%'))
+
+
+def test_no_manifest(api_server, run_cli, tmp_path, capsys):
+    (tmp_path / 'params.yaml').write_text('a: 1\n')
+    assert run_cli('deploy', 'rollout', '-f', str(tmp_path)) == 1
+    assert f'No manifest found in {tmp_path}' in capsys.readouterr().out
+    assert api_server.requests == []